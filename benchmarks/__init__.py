@@ -0,0 +1 @@
+"""Benchmarks reproducibles del sistema de scraping."""
@@ -0,0 +1,246 @@
+"""Benchmark end-to-end offline del pipeline de workers.
+
+Levanta sustitutos locales de Tor, sitios, OpenRouter, Supabase y Redis,
+ejecuta el ``Worker`` real contra ellos con distintos números de corrutinas
+y escribe throughput y percentiles por etapa en JSON para comparar corridas.
+
+Uso:
+    python -m benchmarks.e2e --workers 1,4,12 --sites 200 --output bench.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import tempfile
+import time
+from dataclasses import asdict
+from datetime import datetime
+
+from benchmarks.standins import StandinConfig, Standins, site_url
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_redis(standins: Standins):
+    """Arranca un redis-server efímero si existe; si no, fakeredis por TCP.
+
+    Devuelve la URL y el proceso (None con fakeredis).
+    """
+    port = _free_port()
+    binary = shutil.which("redis-server")
+    if binary:
+        proc = subprocess.Popen(
+            [binary, "--port", str(port), "--save", "", "--appendonly", "no"],
+            stdout=subprocess.DEVNULL,
+        )
+        time.sleep(0.3)
+        return f"redis://127.0.0.1:{port}/0", proc
+
+    standins.start_fake_redis(port)
+    url = f"redis://127.0.0.1:{port}/0"
+    _preload_scripts(url)
+    return url, None
+
+
+def _preload_scripts(redis_url: str):
+    """Carga los scripts Lua por adelantado.
+
+    El servidor TCP de fakeredis cierra la conexión tras cualquier respuesta de
+    error, incluido el NOSCRIPT que redis-py espera recibir la primera vez que
+    ejecuta un script registrado.
+    """
+    import redis as sync_redis
+
+    from src.utils.task_queue import (
+        ENQUEUE_SCRIPT, INTAKE_SCRIPT, POP_SCRIPT, PROMOTE_SCRIPT, TAKE_SCRIPT,
+    )
+
+    client = sync_redis.Redis.from_url(redis_url)
+    for script in (ENQUEUE_SCRIPT, PROMOTE_SCRIPT, INTAKE_SCRIPT, POP_SCRIPT, TAKE_SCRIPT):
+        client.script_load(script)
+    client.close()
+
+
+def configure_env(standins: Standins, redis_url: str):
+    """Apunta la configuración del sistema a los sustitutos (antes de get_config)."""
+    os.environ.update({
+        "SUPABASE_URL": f"http://127.0.0.1:{standins.ports['postgrest']}",
+        "SUPABASE_KEY": "bench-key",
+        "OPENROUTER_API_KEY": "bench-key",
+        "OPENROUTER_BASE_URL": f"http://127.0.0.1:{standins.ports['openrouter']}/api/v1",
+        "REDIS_URL": redis_url,
+        "TOR_SOCKS_PORT": str(standins.ports["socks"]),
+        "TOR_CONTROL_PORT": str(standins.ports["control"]),
+        "METRICS_PORT": "0",
+        "HTTP_CACHE_MAX_MB": "0",  # Cada corrida mide fetches reales
+        "FEATURE_DIR": tempfile.mkdtemp(prefix="bench-features-"),
+        "MACHINE_ID": "bench",
+    })
+
+
+def _quantiles(histogram, **labels) -> dict:
+    result = {"count": histogram.count(**labels)}
+    for q in QUANTILES:
+        value = histogram.quantile(q, **labels)
+        result[f"p{int(q * 100)}"] = round(value, 4) if value is not None else None
+    return result
+
+
+async def run_once(num_workers: int, standins: Standins, timeout: float) -> dict:
+    """Ejecuta una corrida completa con N workers y devuelve sus resultados."""
+    import redis.asyncio as redis
+
+    from src.config import get_config
+    from src.utils.metrics import (
+        AI_REQUEST_SECONDS, AI_TOKENS, FETCHED_BYTES, REGISTRY, STAGE_SECONDS,
+        TASKS_TOTAL, WORKERS_ACTIVE,
+    )
+    from src.utils.concurrency import get_limiter
+    from src.components import Components
+    from src.utils.task_queue import TaskQueue
+    from src.worker import Worker
+
+    cfg = get_config()
+    client = redis.from_url(cfg.REDIS_URL)
+    await client.flushdb()
+    REGISTRY.reset()
+    get_limiter.cache_clear()  # Cada corrida arranca con límites nuevos en su propio loop
+    standins.reset()
+
+    # Encolar antes de arrancar: un worker que encuentra la cola vacía duerme 5 s
+    total = standins.config.num_sites
+    await TaskQueue(client).enqueue_batch([site_url(i) for i in range(total)], nivel=0)
+
+    components = Components(num_workers)
+    workers = [Worker(components) for _ in range(num_workers)]
+    tasks = [asyncio.create_task(w.start()) for w in workers]
+
+    # El reloj arranca cuando todos pasaron el check_ip inicial
+    while WORKERS_ACTIVE.get() < num_workers:
+        await asyncio.sleep(0.01)
+    start = time.perf_counter()
+
+    done = 0
+    while time.perf_counter() - start < timeout:
+        # Un reintento programado no es una tarea terminada
+        done = int(sum(
+            v for k, v in TASKS_TOTAL.values().items() if k[0] != "retry_scheduled"
+        ))
+        if done >= total:
+            break
+        await asyncio.sleep(0.05)
+    elapsed = time.perf_counter() - start
+
+    for w in workers:
+        w.running = False
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await components.close()
+    await client.aclose()
+
+    stages = {key[0]: _quantiles(STAGE_SECONDS, stage=key[0]) for key in STAGE_SECONDS.series()}
+    ai_models = {
+        f"{model}:{outcome}": _quantiles(AI_REQUEST_SECONDS, model=model, outcome=outcome)
+        for model, outcome in AI_REQUEST_SECONDS.series()
+    }
+    return {
+        "workers": num_workers,
+        "tasks": total,
+        "completed": done,
+        "timed_out": done < total,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_tps": round(done / elapsed, 3) if elapsed else None,
+        "outcomes": {key[0]: value for key, value in TASKS_TOTAL.values().items()},
+        "fetched_bytes": FETCHED_BYTES.get(),
+        "ai_tokens": {key[0]: value for key, value in AI_TOKENS.values().items()},
+        "stages": stages,
+        "ai_requests": ai_models,
+        "standins": {
+            "site_requests": standins.stats.site_requests,
+            "ai_requests": standins.stats.ai_requests,
+            "ai_failures": standins.stats.ai_failures,
+            "upserts": standins.stats.upserts,
+        },
+    }
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark end-to-end offline")
+    parser.add_argument("--workers", default="1,4,12", help="Lista de corrutinas por corrida")
+    parser.add_argument("--sites", type=int, default=200, help="Tareas por corrida")
+    parser.add_argument("--site-latency", type=float, default=0.05)
+    parser.add_argument("--page-kb", type=int, default=40)
+    parser.add_argument("--tor-latency", type=float, default=0.2)
+    parser.add_argument("--ai-latency", type=float, default=0.5)
+    parser.add_argument("--ai-failure-rate", type=float, default=0.05)
+    parser.add_argument("--db-latency", type=float, default=0.01)
+    parser.add_argument(
+        "--redis-url", default=None,
+        help="Redis existente; por defecto redis-server efímero o fakeredis TCP",
+    )
+    parser.add_argument("--timeout", type=float, default=600.0, help="Máximo por corrida (s)")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--seed", type=int, default=42)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    config = StandinConfig(
+        site_latency=args.site_latency,
+        page_kb=args.page_kb,
+        tor_latency=args.tor_latency,
+        ai_latency=args.ai_latency,
+        ai_failure_rate=args.ai_failure_rate,
+        db_latency=args.db_latency,
+        num_sites=args.sites,
+        seed=args.seed,
+    )
+
+    standins = Standins(config)
+    standins.start()
+    redis_url, redis_proc = args.redis_url, None
+    if redis_url is None:
+        redis_url, redis_proc = start_redis(standins)
+    configure_env(standins, redis_url)
+
+    from src.config import get_config
+    get_config()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    runs = []
+    try:
+        for num_workers in (int(n) for n in args.workers.split(",")):
+            result = asyncio.run(run_once(num_workers, standins, args.timeout))
+            runs.append(result)
+            print(f"[{num_workers:>3} workers] {result['completed']}/{result['tasks']} tareas "
+                  f"en {result['elapsed_s']}s -> {result['throughput_tps']} tareas/s")
+    finally:
+        standins.stop()
+        if redis_proc:
+            redis_proc.terminate()
+
+    report = {
+        "created_at": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": asdict(config),
+        "runs": runs,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"Resultados: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
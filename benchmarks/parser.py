@@ -0,0 +1,189 @@
+"""Micro-benchmark de Scraper y Scorer sobre el corpus de páginas.
+
+Mide tiempo (mediana y mínimo) y memoria pico por función extractora, por
+página y por backend de parseo, y compara contra una línea base guardada
+para detectar regresiones.
+
+Uso:
+    python -m benchmarks.parser --save-baseline baseline.json
+    python -m benchmarks.parser --baseline baseline.json --threshold 0.2
+"""
+import argparse
+import inspect
+import json
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from bs4 import BeautifulSoup, FeatureNotFound
+
+from src.scoring import Scorer
+from src.scraper import Scraper
+
+CORPUS_DIR = Path(__file__).parent / "corpus"
+BACKENDS = ("lxml", "html.parser", "html5lib")
+
+# Análisis IA representativo para medir el scoring completo
+SAMPLE_AI = {
+    "sector": "ong",
+    "tamaño_estimado": "mediana",
+    "pain_points": ["sin seguimiento de medios", "comunicación manual"],
+    "indicadores_calidad": {"tiene_sala_prensa": True, "activo_comunicacion": True},
+}
+
+
+def load_corpus(directory: Path = CORPUS_DIR) -> Dict[str, str]:
+    """Carga las páginas HTML del corpus, ordenadas por nombre."""
+    return {
+        path.stem: path.read_text(encoding="utf-8")
+        for path in sorted(directory.glob("*.html"))
+    }
+
+
+def available_backends(requested=BACKENDS) -> List[str]:
+    """Backends de BeautifulSoup instalados."""
+    found = []
+    for backend in requested:
+        try:
+            BeautifulSoup("<p></p>", backend)
+            found.append(backend)
+        except FeatureNotFound:
+            continue
+    return found
+
+
+def extractors(scraper: Scraper) -> Dict[str, Callable]:
+    """Métodos ``_extract_*`` del Scraper, adaptados a la firma (soup, url)."""
+    found = {}
+    for name, method in inspect.getmembers(scraper, inspect.ismethod):
+        if not name.startswith("_extract_"):
+            continue
+        params = list(inspect.signature(method).parameters)
+        if "base_url" in params:
+            found[name] = lambda soup, url, m=method: m(soup, url)
+        else:
+            found[name] = lambda soup, url, m=method: m(soup)
+    return found
+
+
+def _measure(setup: Callable, func: Callable, repeats: int) -> dict:
+    """Tiempo por repetición (setup fuera de la medición) y memoria pico."""
+    timings = []
+    for _ in range(repeats):
+        arg = setup()
+        start = time.perf_counter()
+        func(arg)
+        timings.append(time.perf_counter() - start)
+
+    arg = setup()
+    tracemalloc.start()
+    func(arg)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "median_ms": round(statistics.median(timings) * 1000, 4),
+        "min_ms": round(min(timings) * 1000, 4),
+        "peak_kb": round(peak / 1024, 1),
+    }
+
+
+def run(corpus: Dict[str, str], backends: List[str], repeats: int) -> List[dict]:
+    """Ejecuta todas las mediciones y devuelve un registro por (página, backend, función)."""
+    scorer = Scorer()
+    results = []
+
+    for page, html in corpus.items():
+        url = f"https://www.{page}.example/"
+        for backend in backends:
+            scraper = Scraper(parser=backend)
+            cases = {"soup": (lambda: html, lambda h: BeautifulSoup(h, backend))}
+            for name, func in extractors(scraper).items():
+                cases[name] = (lambda: BeautifulSoup(html, backend), lambda s, f=func: f(s, url))
+            cases["parse"] = (lambda: html, lambda h: scraper.parse(h, url))
+            scraped = scraper.parse(html, url)
+            cases["score"] = (lambda: scraped, lambda d: scorer.calculate(d, SAMPLE_AI))
+
+            for name, (setup, func) in cases.items():
+                record = {"page": page, "backend": backend, "function": name, "bytes": len(html)}
+                record.update(_measure(setup, func, repeats))
+                results.append(record)
+
+    return results
+
+
+def _key(record: dict) -> str:
+    return f"{record['page']}|{record['backend']}|{record['function']}"
+
+
+def compare(results: List[dict], baseline: List[dict], threshold: float,
+            memory_threshold: Optional[float] = None) -> List[dict]:
+    """Registros cuya mediana (o memoria pico) empeoró más que el umbral relativo."""
+    previous = {_key(r): r for r in baseline}
+    regressions = []
+    for record in results:
+        base = previous.get(_key(record))
+        if base is None:
+            continue
+        checks = [("median_ms", threshold)]
+        if memory_threshold is not None:
+            checks.append(("peak_kb", memory_threshold))
+        for metric, limit in checks:
+            if base[metric] > 0 and record[metric] > base[metric] * (1 + limit):
+                regressions.append({
+                    "key": _key(record),
+                    "metric": metric,
+                    "baseline": base[metric],
+                    "current": record[metric],
+                    "ratio": round(record[metric] / base[metric], 3),
+                })
+    return regressions
+
+
+def _print_table(results: List[dict]):
+    print(f"{'página':<28} {'backend':<12} {'función':<28} {'mediana ms':>11} {'pico KB':>9}")
+    print("-" * 92)
+    for r in results:
+        print(f"{r['page']:<28} {r['backend']:<12} {r['function']:<28} "
+              f"{r['median_ms']:>11.3f} {r['peak_kb']:>9.1f}")
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Micro-benchmark del parser")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--backends", default=",".join(BACKENDS))
+    parser.add_argument("--corpus", type=Path, default=CORPUS_DIR)
+    parser.add_argument("--output", type=Path, default=None, help="JSON con los resultados")
+    parser.add_argument("--save-baseline", type=Path, default=None)
+    parser.add_argument("--baseline", type=Path, default=None, help="Compara contra esta línea base")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Regresión de tiempo tolerada (0.2 = 20%%)")
+    parser.add_argument("--memory-threshold", type=float, default=None, help="Regresión de memoria tolerada")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    backends = available_backends(args.backends.split(","))
+    results = run(load_corpus(args.corpus), backends, args.repeats)
+    _print_table(results)
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            path.write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        regressions = compare(results, baseline, args.threshold, args.memory_threshold)
+        for r in regressions:
+            print(f"[REGRESIÓN] {r['key']} {r['metric']}: {r['baseline']} -> {r['current']} (x{r['ratio']})")
+        if regressions:
+            return 1
+        print("Sin regresiones respecto a la línea base")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,302 @@
+"""Sustitutos locales de Tor, sitios web, OpenRouter, Supabase y Redis.
+
+Todos los servicios corren en un event loop propio dentro de un hilo aparte,
+de modo que ni la carga de los sustitutos ni las llamadas bloqueantes del
+cliente Supabase (síncrono) interfieren con el loop de los workers medidos.
+"""
+import asyncio
+import json
+import random
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+from aiohttp import web
+
+# Todos los hosts con este sufijo se resuelven hacia el servidor de sitios sintéticos
+BENCH_TLD = ".bench"
+
+CANARIAS_TEXT = (
+    "Asociación sin ánimo de lucro con sede en Santa Cruz de Tenerife, Canarias. "
+    "Trabajamos con voluntarios en proyectos de educación ambiental y cultura. "
+)
+FILLER_TEXT = (
+    "Memoria anual de actividades, transparencia, subvenciones del Cabildo y "
+    "colaboraciones con fundaciones locales para el desarrollo comunitario. "
+)
+
+AI_RESPONSE = {
+    "conocimiento_profundo": {
+        "sector": "ONG ambiental",
+        "actividades_principales": ["Educación ambiental"],
+        "retos_objetivos": ["Alcance"],
+        "estructura_interna": ["Voluntarios"],
+        "financiacion": ["Subvenciones"],
+        "colaboradores": ["Cabildo"],
+        "particularidades": [],
+    },
+    "oportunidades_detectadas": {
+        "productos_encajan": ["Automatizaciones"],
+        "productos_no_encajan": [],
+    },
+}
+
+
+@dataclass
+class StandinConfig:
+    """Parámetros de los servicios simulados."""
+    site_latency: float = 0.05        # Segundos por respuesta de sitio
+    page_kb: int = 40                 # Tamaño aproximado de cada página
+    canarias_ratio: float = 0.8       # Fracción de sitios que pasan el filtro geográfico
+    tor_latency: float = 0.2          # Retardo de establecimiento de circuito
+    ai_latency: float = 0.5           # Latencia media del LLM
+    ai_failure_rate: float = 0.05     # Fracción de respuestas 429/500
+    db_latency: float = 0.01          # Latencia de PostgREST
+    num_sites: int = 200
+    seed: int = 42
+
+
+@dataclass
+class StandinStats:
+    """Contadores de lo que vieron los sustitutos."""
+    site_requests: int = 0
+    ai_requests: int = 0
+    ai_failures: int = 0
+    upserts: int = 0
+    rows: Dict[str, dict] = field(default_factory=dict)
+
+
+def site_url(index: int) -> str:
+    return f"http://org{index}{BENCH_TLD}/"
+
+
+class Standins:
+    """Levanta y detiene todos los sustitutos en un hilo de fondo."""
+
+    def __init__(self, config: StandinConfig):
+        self.config = config
+        self.stats = StandinStats()
+        self.rng = random.Random(config.seed)
+        self.ports: Dict[str, int] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._runners = []
+        self._servers = []
+        self._ready = threading.Event()
+        self._redis_server = None
+
+    # --- Ciclo de vida ---
+
+    def start(self):
+        """Arranca los servicios y bloquea hasta que escuchan."""
+        self._thread = threading.Thread(target=self._run_loop, daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def stop(self):
+        if self._loop:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+        if self._redis_server:
+            self._redis_server.shutdown()
+            self._redis_server.server_close()
+
+    def reset(self):
+        """Limpia la base simulada entre corridas."""
+        self.stats = StandinStats()
+
+    def _run_loop(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_until_complete(self._startup())
+        self._ready.set()
+        self._loop.run_forever()
+
+    async def _startup(self):
+        self.ports["site"] = await self._serve(self._site_app())
+        self.ports["openrouter"] = await self._serve(self._openrouter_app())
+        self.ports["postgrest"] = await self._serve(self._postgrest_app())
+        self.ports["socks"] = await self._listen(self._handle_socks)
+        self.ports["control"] = await self._listen(self._handle_control)
+
+    async def _shutdown(self):
+        for server in self._servers:
+            server.close()
+            await server.wait_closed()
+        for runner in self._runners:
+            await runner.cleanup()
+
+    async def _serve(self, app: web.Application) -> int:
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        self._runners.append(runner)
+        return site._server.sockets[0].getsockname()[1]
+
+    async def _listen(self, handler) -> int:
+        server = await asyncio.start_server(handler, "127.0.0.1", 0)
+        self._servers.append(server)
+        return server.sockets[0].getsockname()[1]
+
+    def start_fake_redis(self, port: int):
+        """Servidor fakeredis en TCP (alternativa sin redis-server instalado)."""
+        from fakeredis import TcpFakeServer
+
+        self._redis_server = TcpFakeServer(("127.0.0.1", port), server_type="redis")
+        self._redis_server.daemon_threads = True
+        threading.Thread(target=self._redis_server.serve_forever, daemon=True).start()
+
+    # --- Sitios sintéticos ---
+
+    def _site_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/{tail:.*}", self._handle_site)
+        return app
+
+    async def _handle_site(self, request: web.Request) -> web.Response:
+        self.stats.site_requests += 1
+        await asyncio.sleep(self.config.site_latency)
+        if request.path == "/robots.txt" or request.path.startswith("/sitemap"):
+            raise web.HTTPNotFound()  # Como la mayoría de sitios pequeños
+        host = request.host.split(":")[0]
+        index = int(host[3:-len(BENCH_TLD)]) if host.startswith("org") else 0
+        return web.Response(text=self._render_page(index), content_type="text/html")
+
+    def _render_page(self, index: int) -> str:
+        rng = random.Random(self.config.seed + index)
+        is_canarias = rng.random() < self.config.canarias_ratio
+        body_text = CANARIAS_TEXT if is_canarias else FILLER_TEXT.replace("Cabildo", "Ayuntamiento")
+        paragraphs = []
+        size = 0
+        while size < self.config.page_kb * 1024:
+            p = f"<p>{body_text}{FILLER_TEXT}</p>"
+            paragraphs.append(p)
+            size += len(p)
+        # Enlaces a otros sitios del mismo conjunto: ejercitan la deduplicación
+        links = "".join(
+            f'<a href="{site_url(rng.randrange(self.config.num_sites))}">Socio</a>'
+            for _ in range(8)
+        )
+        return (
+            f"<html><head><title>Organización {index}</title>"
+            f'<meta name="description" content="Entidad {index}"></head><body>'
+            f"<nav>Inicio Quiénes somos Contacto</nav>{''.join(paragraphs)}"
+            f'<p>Contacto: info@org{index}.bench Tel. 922 123 456</p>'
+            f'<a href="https://facebook.com/org{index}">Facebook</a>{links}'
+            f"</body></html>"
+        )
+
+    # --- Tor: proxy SOCKS5 mínimo y puerto de control ---
+
+    async def _handle_socks(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            header = await reader.readexactly(2)
+            await reader.readexactly(header[1])
+            writer.write(b"\x05\x00")  # Sin autenticación
+
+            _, _, _, atyp = await reader.readexactly(4)
+            if atyp == 1:
+                host = ".".join(str(b) for b in await reader.readexactly(4))
+            elif atyp == 3:
+                host = (await reader.readexactly((await reader.readexactly(1))[0])).decode()
+            else:
+                await reader.readexactly(16)
+                host = ""
+            await reader.readexactly(2)  # Puerto destino: siempre el servidor de sitios
+
+            if not host.endswith(BENCH_TLD):
+                # Fuera del entorno offline: host inalcanzable
+                writer.write(b"\x05\x04\x00\x01\x00\x00\x00\x00\x00\x00")
+                await writer.drain()
+                return
+
+            await asyncio.sleep(self.config.tor_latency)
+            up_reader, up_writer = await asyncio.open_connection("127.0.0.1", self.ports["site"])
+            writer.write(b"\x05\x00\x00\x01\x00\x00\x00\x00\x00\x00")
+            await writer.drain()
+            await asyncio.gather(
+                self._pipe(reader, up_writer), self._pipe(up_reader, writer),
+            )
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _pipe(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while data := await reader.read(65536):
+                writer.write(data)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _handle_control(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while await reader.readline():
+                writer.write(b"250 OK\r\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    # --- OpenRouter ---
+
+    def _openrouter_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/api/v1/chat/completions", self._handle_completion)
+        return app
+
+    async def _handle_completion(self, request: web.Request) -> web.Response:
+        payload = await request.json()
+        self.stats.ai_requests += 1
+        await asyncio.sleep(self.rng.expovariate(1 / self.config.ai_latency))
+
+        if self.rng.random() < self.config.ai_failure_rate:
+            self.stats.ai_failures += 1
+            status = self.rng.choice([429, 500])
+            return web.json_response({"error": {"message": "simulated", "code": status}}, status=status)
+
+        return web.json_response({
+            "id": "bench",
+            "object": "chat.completion",
+            "created": 0,
+            "model": payload.get("model", "bench"),
+            "choices": [{
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": json.dumps(AI_RESPONSE)},
+            }],
+            "usage": {"prompt_tokens": 900, "completion_tokens": 300, "total_tokens": 1200},
+        })
+
+    # --- PostgREST (Supabase) ---
+
+    def _postgrest_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/rest/v1/{table}", self._handle_select)
+        app.router.add_post("/rest/v1/{table}", self._handle_insert)
+        return app
+
+    async def _handle_select(self, request: web.Request) -> web.Response:
+        await asyncio.sleep(self.config.db_latency)
+        dominio = request.query.get("dominio", "")
+        if dominio.startswith("eq."):
+            row = self.stats.rows.get(dominio[3:])
+            return web.json_response([{"dominio": row["dominio"]}] if row else [])
+        return web.json_response(list(self.stats.rows.values()))
+
+    async def _handle_insert(self, request: web.Request) -> web.Response:
+        await asyncio.sleep(self.config.db_latency)
+        payload = await request.json()
+        rows = payload if isinstance(payload, list) else [payload]
+        if request.match_info["table"] == "organizaciones":
+            for row in rows:
+                self.stats.rows[row["dominio"]] = row
+                self.stats.upserts += 1
+        return web.json_response(rows, status=201)
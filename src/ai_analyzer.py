@@ -1,12 +1,14 @@
 """Analizador IA con fallback multi-modelo para detección de prospectos de gabinete de prensa."""
 import json
 import logging
+import time
 from typing import Optional
 
-from openai import AsyncOpenAI
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 
 from src.config import get_config
+from src.utils.metrics import AI_REQUEST_SECONDS, AI_TOKENS
+from src.utils.concurrency import get_limiter
 
 logger = logging.getLogger(__name__)
 
@@ -63,54 +65,88 @@ Responde SOLO con el JSON válido."""
 class AIAnalyzer:
     """Cliente OpenRouter con fallback automático entre modelos."""
 
-    def __init__(self):
+    def __init__(self, max_connections: Optional[int] = None):
         cfg = get_config()
-        self.client = AsyncOpenAI(
-            api_key=cfg.OPENROUTER_API_KEY,
-            base_url="https://openrouter.ai/api/v1"
-        )
+        self.api_key = cfg.OPENROUTER_API_KEY
+        self.base_url = cfg.OPENROUTER_BASE_URL
+        self.max_connections = max_connections
+        self._client = None
         self.timeout = cfg.AI_TIMEOUT
         self.total_tokens = 0
+        self.limiter = get_limiter("ai")
+
+    @property
+    def client(self):
+        """Cliente OpenAI; el SDK (lento de importar) se carga en el primer uso."""
+        if self._client is None:
+            import httpx
+            from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+            # Pool HTTP dimensionado para la concurrencia del proceso (por defecto el de openai)
+            http_client = None
+            if self.max_connections:
+                http_client = DefaultAsyncHttpxClient(limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ))
+            self._client = AsyncOpenAI(
+                api_key=self.api_key, base_url=self.base_url, http_client=http_client,
+            )
+        return self._client
 
     @retry(
         stop=stop_after_attempt(3),
         wait=wait_exponential(multiplier=1, min=2, max=10),
         retry=retry_if_exception_type((TimeoutError, ConnectionError)),
     )
-    async def analyze(self, text_content: str, meta: dict) -> Optional[dict]:
-        """Analiza contenido con fallback entre modelos."""
-        user_prompt = self._build_prompt(text_content, meta)
+    async def analyze(self, text_content: str, meta: dict, documents: str = "") -> Optional[dict]:
+        """Analiza contenido con fallback entre modelos (y el texto de sus documentos enlazados)."""
+        user_prompt = self._build_prompt(text_content, meta, documents)
         
         for model in MODELS:
             try:
-                response = await self.client.chat.completions.create(
-                    model=model,
-                    messages=[
-                        {"role": "system", "content": SYSTEM_PROMPT},
-                        {"role": "user", "content": user_prompt}
-                    ],
-                    max_tokens=1000,
-                    temperature=0.1,
-                )
+                async with self.limiter.slot():
+                    # El reloj empieza con el slot: la espera por concurrencia no es latencia del modelo
+                    start = time.perf_counter()
+                    response = await self.client.chat.completions.create(
+                        model=model,
+                        messages=[
+                            {"role": "system", "content": SYSTEM_PROMPT},
+                            {"role": "user", "content": user_prompt}
+                        ],
+                        max_tokens=1000,
+                        temperature=0.1,
+                    )
                 
                 content = response.choices[0].message.content
-                self.total_tokens += response.usage.total_tokens if response.usage else 0
+                tokens = response.usage.total_tokens if response.usage else 0
+                self.total_tokens += tokens
+                AI_TOKENS.inc(tokens, model=model)
                 
                 # Parsear JSON
                 result = self._parse_json(content)
+                outcome = "ok" if result else "invalid_json"
+                AI_REQUEST_SECONDS.observe(time.perf_counter() - start, model=model, outcome=outcome)
                 if result:
-                    logger.info(f"Análisis exitoso con {model}")
+                    logger.info("Análisis exitoso con %s", model)
                     return result
                     
             except Exception as e:
-                logger.warning(f"Error con {model}: {e}")
+                AI_REQUEST_SECONDS.observe(time.perf_counter() - start, model=model, outcome="error")
+                logger.warning("Error con %s: %s", model, e)
                 continue
         
         logger.error("Todos los modelos fallaron")
         return None
 
-    def _build_prompt(self, text: str, meta: dict) -> str:
+    def _build_prompt(self, text: str, meta: dict, documents: str = "") -> str:
         """Construye el prompt para el análisis."""
+        documents_block = ""
+        if documents:
+            documents_block = f"""
+DOCUMENTOS ENLAZADOS (memorias, cuentas, transparencia):
+{documents[:3000]}
+"""
         return f"""Analiza esta organización para identificar si es prospecto para servicios de gabinete de prensa:
 
 TÍTULO: {meta.get('title', 'Sin título')}
@@ -118,7 +154,7 @@ DESCRIPCIÓN: {meta.get('description', 'Sin descripción')}
 
 CONTENIDO DE LA WEB:
 {text[:4000]}
-
+{documents_block}
 Extrae la información en formato JSON. Presta especial atención a:
 1. Si están ubicados en Canarias (prioridad máxima)
 2. Si tienen sala de prensa, notas de prensa, o sección de noticias
@@ -137,9 +173,14 @@ Extrae la información en formato JSON. Presta especial atención a:
         try:
             return json.loads(content)
         except json.JSONDecodeError as e:
-            logger.warning(f"Error parseando JSON: {e}")
+            logger.warning("Error parseando JSON: %s", e)
             return None
 
     def get_token_count(self) -> int:
         """Retorna total de tokens consumidos."""
         return self.total_tokens
+
+    async def close(self):
+        """Cierra el pool HTTP del cliente (si llegó a crearse)."""
+        if self._client is not None:
+            await self._client.close()
@@ -0,0 +1,199 @@
+"""Scoring por lotes con NumPy: mismo resultado que ``Scorer.calculate``, por columnas.
+
+Cada fila se reduce una sola vez a unas pocas columnas numéricas (clase
+geográfica, email corporativo, redes, tamaño, sector, pain points...) y el
+score y el tier de todo el lote salen de expresiones vectorizadas. Las
+sumas siguen el mismo orden que el scorer fila a fila y el redondeo usa
+``round`` de Python sobre los valores distintos, así que el resultado es
+idéntico bit a bit, no solo aproximado.
+"""
+import asyncio
+import logging
+import re
+from collections import Counter
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+from src.scoring import (
+    CANARIAS_KEYWORDS, FREE_EMAIL_PROVIDERS, HIGH_PRIORITY_SECTORS, MEDIUM_PRIORITY_SECTORS,
+    SIZE_MULTIPLIERS, SPAIN_KEYWORDS, WEIGHTS,
+)
+
+logger = logging.getLogger(__name__)
+
+# Columnas que lee rescore: las entradas del scorer salen del feature store
+RESCORE_COLUMNS = "dominio,url,score,tier"
+
+_CANARIAS = re.compile("|".join(map(re.escape, CANARIAS_KEYWORDS)))
+_SPAIN = re.compile("|".join(map(re.escape, SPAIN_KEYWORDS)))
+_FREE_EMAIL = re.compile("|".join(map(re.escape, FREE_EMAIL_PROVIDERS)))
+
+GEO_OTHER, GEO_SPAIN, GEO_CANARIAS = 0, 1, 2
+SECTOR_OTHER, SECTOR_MEDIUM, SECTOR_HIGH = 0, 1, 2
+SIZE_CLASSES = list(SIZE_MULTIPLIERS)
+_SIZE_INDEX = {name: i for i, name in enumerate(SIZE_CLASSES)}
+_UNKNOWN_SIZE = _SIZE_INDEX["desconocido"]
+
+TIERS = np.array(["D", "C", "B", "A"])
+TIER_THRESHOLDS = np.array([4.0, 6.0, 8.0])
+
+FEATURES = ("geo", "corporate_email", "phone", "social", "has_ai", "pain_points",
+            "press_room", "active_comms", "size", "sector")
+FLAG_FEATURES = {"corporate_email", "phone", "has_ai", "press_room", "active_comms"}
+
+
+def _geo_class(scraped: dict, ai: Optional[dict]) -> int:
+    meta = scraped.get("meta", {})
+    text = f" {meta.get('title', '')} {meta.get('description', '')}"
+    if ai:
+        text += f" {ai.get('ambito_geografico', '')} {ai.get('ubicacion', '')}"
+    text = text.lower()
+    if _CANARIAS.search(text):
+        return GEO_CANARIAS
+    if _SPAIN.search(text):
+        return GEO_SPAIN
+    return GEO_OTHER
+
+
+def _sector_class(sector: str) -> int:
+    if sector in HIGH_PRIORITY_SECTORS:
+        return SECTOR_HIGH
+    if sector in MEDIUM_PRIORITY_SECTORS:
+        return SECTOR_MEDIUM
+    return SECTOR_OTHER
+
+
+def feature_row(scraped: dict, ai: Optional[dict]) -> tuple:
+    """Features de scoring de una entidad, en el orden de ``FEATURES``."""
+    emails = scraped.get("emails", [])
+    analysis = ai or {}
+    indicators = analysis.get("indicadores_calidad", {}) or {}
+    size = (analysis.get("tamaño_estimado", "desconocido") or "desconocido").lower()
+    return (
+        _geo_class(scraped, ai),
+        any(not _FREE_EMAIL.search(e) for e in emails),
+        bool(scraped.get("phones")),
+        len(scraped.get("social", {})),
+        bool(ai),
+        len(analysis.get("pain_points", []) or []),
+        bool(indicators.get("tiene_sala_prensa")),
+        bool(indicators.get("activo_comunicacion")),
+        _SIZE_INDEX.get(size, _UNKNOWN_SIZE),
+        _sector_class((analysis.get("sector", "") or "").lower()),
+    )
+
+
+def extract_features(rows: Iterable[Tuple[dict, Optional[dict]]]) -> Dict[str, np.ndarray]:
+    """Columnas de features de pares ``(scraped_data, ai_analysis)`` como los de ``calculate``."""
+    table = [feature_row(scraped, ai) for scraped, ai in rows]
+    columns = zip(*table) if table else [()] * len(FEATURES)
+    return {
+        name: np.asarray(values, dtype=bool if name in FLAG_FEATURES else np.int32)
+        for name, values in zip(FEATURES, columns)
+    }
+
+
+def _lookup_tables(weights: Dict[str, float]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    geo = np.array([0.5, weights["ubicacion_espana"], weights["ubicacion_canarias"]])
+    size = np.array([weights["tamaño_organizacion"] * SIZE_MULTIPLIERS[s] for s in SIZE_CLASSES])
+    sector = np.array([
+        weights["sector_priority"] * 0.2, weights["sector_priority"] * 0.5, weights["sector_priority"],
+    ])
+    return geo, size, sector
+
+
+def score_features(features: Dict[str, np.ndarray],
+                   weights: Optional[Dict[str, float]] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Scores (0-10, un decimal) y tiers de un lote de features.
+
+    ``weights`` sustituye a los pesos de ``WEIGHTS`` que incluya (experimentos
+    de scoring sobre el feature store sin tocar el scorer).
+    """
+    weights = {**WEIGHTS, **(weights or {})}
+    geo_points, size_points, sector_points = _lookup_tables(weights)
+    presence_max = weights["presencia_digital"]
+    activity_max = weights["actividad_comunicativa"]
+    social = features["social"]
+
+    # Mismo orden de sumas que Scorer.calculate (sumar 0.0 no altera ningún float)
+    presence = 0.0 + np.where(features["corporate_email"], presence_max * 0.3, 0.0)
+    presence = presence + np.where(features["phone"], presence_max * 0.2, 0.0)
+    presence = presence + np.select(
+        [social >= 2, social == 1], [presence_max * 0.5, presence_max * 0.25], 0.0
+    )
+
+    pain_score = np.minimum(features["pain_points"] / 3, 1.0)
+    activity = 0.0 + activity_max * 0.6 * pain_score
+    activity = activity + np.where(features["press_room"], activity_max * 0.2, 0.0)
+    activity = activity + np.where(features["active_comms"], activity_max * 0.2, 0.0)
+
+    score = geo_points[features["geo"]] + presence
+    has_ai = features["has_ai"]
+    score = score + np.where(has_ai, activity, 0.0)
+    score = score + np.where(has_ai, size_points[features["size"]], 0.0)
+    score = score + np.where(has_ai, sector_points[features["sector"]], 0.0)
+    score = np.minimum(10.0, score)
+
+    # round() de Python sobre los pocos valores distintos: np.round difiere en los empates
+    unique, inverse = np.unique(score, return_inverse=True)
+    rounded = np.array([round(float(v), 1) for v in unique])[inverse]
+    tiers = TIERS[np.searchsorted(TIER_THRESHOLDS, rounded, side="right")]
+    return rounded, tiers
+
+
+def score_batch(rows: Iterable[Tuple[dict, Optional[dict]]]) -> Tuple[np.ndarray, np.ndarray]:
+    """Atajo: features + scoring de pares ``(scraped_data, ai_analysis)``."""
+    return score_features(extract_features(rows))
+
+
+def scoring_columns(records: np.ndarray) -> Dict[str, np.ndarray]:
+    """Columnas de ``score_features`` a partir de registros con un campo por feature."""
+    return {
+        name: records[name] if name in FLAG_FEATURES else records[name].astype(np.int32)
+        for name in FEATURES
+    }
+
+
+async def rescore(db, features: np.ndarray, batch_size: int = 1000, dry_run: bool = False,
+                  weights: Optional[Dict[str, float]] = None) -> Counter:
+    """Recalcula score y tier de toda la tabla desde el feature store, escribiendo solo cambios.
+
+    ``features`` son los registros vigentes del store ordenados por dominio
+    (``feature_store.load``): las mismas entradas que usó el worker. Las
+    columnas de ``organizaciones`` no bastan (no guardan indicadores de
+    calidad ni ámbito geográfico), así que las filas sin registro en el
+    store se omiten en vez de sobrescribirse con un score incompleto.
+
+    La lectura de la página siguiente se solapa con el scoring y la escritura
+    de la actual; la memoria queda acotada a dos páginas.
+    """
+    stats: Counter = Counter()
+    keys = features["dominio"]
+    page = await asyncio.to_thread(db.fetch_page, RESCORE_COLUMNS, None, batch_size)
+    while page:
+        next_page = asyncio.create_task(
+            asyncio.to_thread(db.fetch_page, RESCORE_COLUMNS, page[-1]["dominio"], batch_size)
+        )
+        domains = np.array([row["dominio"].encode("utf-8") for row in page], dtype=keys.dtype)
+        index = np.minimum(np.searchsorted(keys, domains), max(len(keys) - 1, 0))
+        found = (keys[index] == domains) if len(keys) else np.zeros(len(page), dtype=bool)
+        rows = [row for row, hit in zip(page, found) if hit]
+
+        scores, tiers = score_features(scoring_columns(features[index[found]]), weights)
+        changed = [
+            {"dominio": row["dominio"], "url": row["url"], "score": float(score), "tier": str(tier)}
+            for row, score, tier in zip(rows, scores, tiers)
+            if row.get("score") != float(score) or row.get("tier") != tier
+        ]
+        stats["rows"] += len(page)
+        stats["skipped"] += len(page) - len(rows)
+        stats["changed"] += len(changed)
+        stats.update(f"tier_{t}" for t in tiers)
+        if changed and not dry_run:
+            await asyncio.to_thread(db.upsert_rows, changed)
+        page = await next_page
+        if stats["rows"] % (batch_size * 50) < batch_size:
+            logger.info("Rescoring: %s filas, %s cambios, %s sin features",
+                        stats["rows"], stats["changed"], stats["skipped"])
+    return stats
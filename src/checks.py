@@ -0,0 +1,116 @@
+"""Comprobaciones de arranque (``--check``): configuración y conectividad en paralelo.
+
+Sirve como sonda de disponibilidad del contenedor y como arranque en
+caliente: mientras se esperan las respuestas de red se importa el stack del
+worker, de modo que el primer arranque real encuentra los módulos ya
+compilados y en la caché de páginas del sistema.
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from importlib import import_module
+from typing import Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+TOR_CHECK_URL = "https://check.torproject.org/api/ip"
+
+
+@dataclass
+class CheckResult:
+    """Resultado de una comprobación; ``ok`` también es True si se omitió."""
+    name: str
+    ok: bool
+    seconds: float
+    detail: str = ""
+
+
+async def check_redis(cfg) -> str:
+    import redis.asyncio as redis
+
+    client = redis.from_url(cfg.REDIS_URL)
+    try:
+        await client.ping()
+        return f"{await client.llen('scraping_queue')} tareas en scraping_queue"
+    finally:
+        await client.aclose()
+
+
+async def check_supabase(cfg) -> str:
+    def query():
+        from supabase import create_client
+
+        client = create_client(cfg.SUPABASE_URL, cfg.SUPABASE_KEY)
+        # Pedir las columnas de dirección falla aquí, y no en cada upsert, si faltan en la tabla
+        client.table("organizaciones").select("dominio,direccion,codigo_postal").limit(1).execute()
+        return "tabla organizaciones accesible (con direccion y codigo_postal)"
+
+    # El SDK es síncrono: en un hilo para no bloquear las demás comprobaciones
+    return await asyncio.to_thread(query)
+
+
+async def check_egress(cfg) -> Optional[str]:
+    if cfg.EGRESS_MODE == "direct":
+        return None
+
+    import aiohttp
+    from aiohttp_socks import ProxyConnector
+
+    connector = ProxyConnector.from_url(f"socks5://127.0.0.1:{cfg.TOR_SOCKS_PORT}")
+    timeout = aiohttp.ClientTimeout(total=cfg.REQUEST_TIMEOUT)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        async with session.get(TOR_CHECK_URL) as response:
+            response.raise_for_status()
+            data = await response.json(content_type=None)
+    return f"IP de salida Tor {data.get('IP', 'desconocida')}"
+
+
+async def check_ai(cfg) -> Optional[str]:
+    if not cfg.OPENROUTER_API_KEY:
+        return None
+
+    from src.ai_analyzer import AIAnalyzer
+
+    analyzer = AIAnalyzer(max_connections=1)
+    try:
+        models = await analyzer.client.models.list()
+        return f"{len(models.data)} modelos disponibles"
+    finally:
+        await analyzer.close()
+
+
+async def warm_imports(cfg) -> str:
+    start = time.perf_counter()
+    await asyncio.to_thread(import_module, "src.worker")
+    return f"stack del worker importado en {time.perf_counter() - start:.2f}s"
+
+
+CHECKS: Dict[str, Callable[[object], Awaitable[Optional[str]]]] = {
+    "redis": check_redis,
+    "supabase": check_supabase,
+    "egress": check_egress,
+    "openrouter": check_ai,
+    "imports": warm_imports,
+}
+
+
+async def _timed(name: str, check: Callable, cfg, timeout: float) -> CheckResult:
+    start = time.perf_counter()
+    try:
+        detail = await asyncio.wait_for(check(cfg), timeout=timeout)
+    except asyncio.TimeoutError:
+        return CheckResult(name, False, time.perf_counter() - start, f"sin respuesta en {timeout:g}s")
+    except Exception as e:
+        return CheckResult(name, False, time.perf_counter() - start, f"{type(e).__name__}: {e}")
+    return CheckResult(name, True, time.perf_counter() - start, detail or "omitido")
+
+
+async def run_checks(cfg, timeout: Optional[float] = None,
+                     checks: Optional[Dict[str, Callable]] = None) -> List[CheckResult]:
+    """Ejecuta todas las comprobaciones a la vez; el tiempo total es el de la más lenta."""
+    checks = CHECKS if checks is None else checks
+    timeout = timeout or float(cfg.REQUEST_TIMEOUT)
+    return list(await asyncio.gather(*(
+        _timed(name, check, cfg, timeout) for name, check in checks.items()
+    )))
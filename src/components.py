@@ -0,0 +1,155 @@
+"""Componentes compartidos por todos los workers de un proceso.
+
+Scraper, IA, base de datos, Redis y clientes HTTP se crean una sola vez, con
+pools dimensionados para la concurrencia total del proceso, y los workers
+son corrutinas ligeras que los usan. El registro es dueño de su ciclo de
+vida: ``start`` abre las conexiones y ``close`` las cierra al final.
+"""
+import asyncio
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Optional
+
+import redis.asyncio as redis
+
+from src.config import STARTED_AT, get_config
+from src.scraper import Scraper
+from src.ai_analyzer import AIAnalyzer
+from src.scoring import Scorer
+from src.feature_store import FeatureStore
+from src.utils.egress import EgressRouter, PacedClient
+from src.utils.supabase_client import SupabaseClient
+from src.utils.task_queue import TaskQueue
+from src.utils.circuit_breaker import HostCircuitBreaker
+from src.utils.recrawl import RecrawlScheduler
+from src.utils.discovery import SiteDiscovery
+from src.utils.documents import DocumentIngestor
+from src.utils.concurrency import get_limiter
+from src.utils.metrics import COLD_START_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Rotar la IP de Tor cada N tareas terminadas en el proceso
+ROTATE_EVERY = 10
+# Conexiones extra sobre la concurrencia (promoción de reintentos, rotaciones en curso...)
+POOL_HEADROOM = 4
+
+
+class Components:
+    """Registro de clientes del proceso para ``concurrency`` workers."""
+
+    def __init__(self, concurrency: int = 1):
+        self.cfg = get_config()
+        self.concurrency = max(1, concurrency)
+        self.pool_size = self.concurrency + POOL_HEADROOM
+
+        # Sin conexiones: se pueden usar antes de start (reproceso de WARC)
+        self.scraper = Scraper()
+        self.ai = AIAnalyzer(max_connections=self.pool_size)
+        self.scorer = Scorer()
+        self.features: Optional[FeatureStore] = None
+        if self.cfg.FEATURE_DIR:
+            self.features = FeatureStore(
+                Path(self.cfg.FEATURE_DIR), f"{self.cfg.MACHINE_ID}_{os.getpid()}"
+            )
+
+        self.db: Optional[SupabaseClient] = None
+        self.redis: Optional[redis.Redis] = None
+        self.tor: Optional[EgressRouter] = None
+        self.site_client: Optional[PacedClient] = None
+        self.queue: Optional[TaskQueue] = None
+        self.breaker: Optional[HostCircuitBreaker] = None
+        self.recrawl: Optional[RecrawlScheduler] = None
+        self.discovery: Optional[SiteDiscovery] = None
+        self.documents: Optional[DocumentIngestor] = None
+        self.completed = 0
+        self._started = False
+        self._lock = asyncio.Lock()
+
+    async def start(self):
+        """Abre las conexiones una sola vez aunque varios workers lo pidan a la vez."""
+        async with self._lock:
+            if self._started:
+                return
+            self._connect()
+            # Los SDK de Supabase y OpenAI se importan en hilos mientras se verifica la IP
+            self.db, _, ip = await asyncio.gather(
+                asyncio.to_thread(SupabaseClient),
+                asyncio.to_thread(lambda: self.ai.client),
+                self.tor.check_ip(),
+            )
+            self._started = True
+
+        logger.info(
+            "Componentes iniciados [%s] en %.2fs - %s workers, pools de %s conexiones",
+            self.cfg.MACHINE_ID, time.monotonic() - STARTED_AT, self.concurrency, self.pool_size,
+        )
+        logger.info("IP Tor actual: %s", ip)
+
+    def _connect(self):
+        cfg = self.cfg
+        # Bloqueante: si se agota el pool se espera conexión en vez de fallar
+        pool = redis.BlockingConnectionPool.from_url(cfg.REDIS_URL, max_connections=self.pool_size)
+        self.redis = redis.Redis.from_pool(pool)
+        self.tor = EgressRouter(self.redis, pool_size=self.pool_size)
+        self.queue = TaskQueue(
+            self.redis,
+            max_retries=cfg.MAX_RETRIES,
+            retry_base_delay=cfg.RETRY_BASE_DELAY,
+            domain_rate=cfg.DOMAIN_RATE,
+            domain_burst=cfg.DOMAIN_BURST,
+        )
+        # Robots, sitemaps, páginas internas y documentos: al ritmo del bucket del dominio
+        self.site_client = PacedClient(self.tor, self.queue, get_limiter("fetch"))
+        self.breaker = HostCircuitBreaker(self.redis)
+        self.recrawl = RecrawlScheduler(
+            self.redis,
+            min_days=cfg.RECRAWL_MIN_DAYS,
+            max_days=cfg.RECRAWL_MAX_DAYS,
+            initial_days=cfg.RECRAWL_INITIAL_DAYS,
+        )
+        self.discovery = SiteDiscovery(
+            self.site_client, self.redis, cache_ttl=int(cfg.DISCOVERY_CACHE_DAYS * 86400)
+        )
+        if cfg.DOCUMENT_MAX_FILES > 0:
+            self.documents = DocumentIngestor(
+                self.site_client, self.redis,
+                max_files=cfg.DOCUMENT_MAX_FILES,
+                max_bytes=int(cfg.DOCUMENT_MAX_MB * 1024 * 1024),
+                max_pages=cfg.DOCUMENT_MAX_PAGES,
+                timeout=cfg.DOCUMENT_TIMEOUT,
+                workers=cfg.DOCUMENT_WORKERS,
+            )
+
+    async def task_done(self):
+        """Cuenta una tarea terminada y rota la IP de Tor cada ``ROTATE_EVERY`` del proceso."""
+        self.completed += 1
+        if self.completed == 1:
+            cold_start = time.monotonic() - STARTED_AT
+            COLD_START_SECONDS.set(cold_start)
+            logger.info("Primera tarea terminada a %.2fs del arranque del proceso", cold_start)
+        if self.completed % ROTATE_EVERY == 0 and self.tor:
+            await self.tor.renew_identity()
+
+    async def close(self):
+        """Cierra todas las conexiones del proceso."""
+        if self.tor:
+            await self.tor.close()
+        if self.redis:
+            await self.redis.aclose()
+        if self.db:
+            self.db.close()
+        if self.features:
+            self.features.close()
+        await self.ai.close()
+        self._started = False
+        logger.info("Tokens IA consumidos: %s", self.ai.get_token_count())
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
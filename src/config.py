@@ -1,9 +1,12 @@
 """Configuración centralizada del sistema."""
 import os
-import sys
 import logging
+import time
 from functools import lru_cache
 
+# Referencia del arranque en frío: config es lo primero que importa cualquier proceso
+STARTED_AT = time.monotonic()
+
 
 class ConfigError(Exception):
     """Error de configuración crítica."""
@@ -16,8 +19,10 @@ class Config:
 
     def __new__(cls):
         if cls._instance is None:
-            cls._instance = super().__new__(cls)
-            cls._instance._init_config()
+            # Solo se guarda si la validación pasa: un fallo no deja un singleton a medias
+            instance = super().__new__(cls)
+            instance._init_config()
+            cls._instance = instance
         return cls._instance
 
     def _init_config(self):
@@ -28,58 +33,113 @@ class Config:
         
         # OpenRouter es opcional para pruebas sin IA
         self.OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY", "")
+        self.OPENROUTER_BASE_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
         
         # Variables con defaults
         self.REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
         self.MACHINE_ID = os.getenv("MACHINE_ID", "local")
         self.MAX_THREADS = int(os.getenv("MAX_THREADS", "12"))
+        # Procesos con su propio event loop (0 = uno por núcleo); MAX_THREADS es por proceso
+        self.PROCESSES = int(os.getenv("PROCESSES", "1")) or (os.cpu_count() or 1)
+
+        # Concurrencia adaptativa (AIMD) por etapa; el techo no puede superar MAX_THREADS
+        self.FETCH_CONCURRENCY_MIN = int(os.getenv("FETCH_CONCURRENCY_MIN", "2"))
+        self.FETCH_CONCURRENCY_MAX = min(
+            int(os.getenv("FETCH_CONCURRENCY_MAX", str(self.MAX_THREADS))), self.MAX_THREADS
+        )
+        self.AI_CONCURRENCY_MIN = int(os.getenv("AI_CONCURRENCY_MIN", "1"))
+        self.AI_CONCURRENCY_MAX = min(
+            int(os.getenv("AI_CONCURRENCY_MAX", str(self.MAX_THREADS))), self.MAX_THREADS
+        )
         
         # Tor config
         self.TOR_SOCKS_PORT = int(os.getenv("TOR_SOCKS_PORT", "9050"))
         self.TOR_CONTROL_PORT = int(os.getenv("TOR_CONTROL_PORT", "9051"))
         
+        # Salida: tor | direct | auto (directo con paso a Tor al detectar bloqueos)
+        self.EGRESS_MODE = os.getenv("EGRESS_MODE", "tor").lower()
+        if self.EGRESS_MODE not in ("tor", "direct", "auto"):
+            raise ConfigError(f"EGRESS_MODE inválido: {self.EGRESS_MODE}")
+        self.EGRESS_DIRECT_DOMAINS = self._list("EGRESS_DIRECT_DOMAINS")
+        self.EGRESS_TOR_DOMAINS = self._list("EGRESS_TOR_DOMAINS")
+        
+        # Caché HTTP en disco (0 MB = desactivada); entradas frescas se sirven sin red
+        self.HTTP_CACHE_DIR = os.getenv("HTTP_CACHE_DIR", "data/http_cache")
+        self.HTTP_CACHE_MAX_MB = int(os.getenv("HTTP_CACHE_MAX_MB", "2048"))
+        self.HTTP_CACHE_FRESH_SECONDS = float(os.getenv("HTTP_CACHE_FRESH_SECONDS", "86400"))
+        
+        # Captura WARC de respuestas descargadas (vacío = desactivada)
+        self.WARC_DIR = os.getenv("WARC_DIR", "")
+        self.WARC_MAX_MB = int(os.getenv("WARC_MAX_MB", "1024"))
+
+        # Feature store local con las entradas del scoring por dominio (vacío = desactivado)
+        self.FEATURE_DIR = os.getenv("FEATURE_DIR", "data/features")
+        
         # Timeouts
         self.REQUEST_TIMEOUT = int(os.getenv("REQUEST_TIMEOUT", "30"))
         self.AI_TIMEOUT = int(os.getenv("AI_TIMEOUT", "60"))
 
+        # Reintentos diferidos: backoff exponencial desde RETRY_BASE_DELAY segundos
+        self.MAX_RETRIES = int(os.getenv("MAX_RETRIES", "3"))
+        self.RETRY_BASE_DELAY = float(os.getenv("RETRY_BASE_DELAY", "60"))
+
+        # Recrawl adaptativo (días): primera revisita y límites del intervalo estimado
+        self.RECRAWL_INITIAL_DAYS = float(os.getenv("RECRAWL_INITIAL_DAYS", "14"))
+        self.RECRAWL_MIN_DAYS = float(os.getenv("RECRAWL_MIN_DAYS", "1"))
+        self.RECRAWL_MAX_DAYS = float(os.getenv("RECRAWL_MAX_DAYS", "90"))
+
+        # Descubrimiento de páginas internas (robots.txt + sitemaps)
+        self.DISCOVERY_MAX_PAGES = int(os.getenv("DISCOVERY_MAX_PAGES", "2"))
+        self.DISCOVERY_CACHE_DAYS = float(os.getenv("DISCOVERY_CACHE_DAYS", "7"))
+
+        # Documentos enlazados (PDF/DOCX) que se leen por sitio para la IA
+        self.DOCUMENT_MAX_FILES = int(os.getenv("DOCUMENT_MAX_FILES", "2"))
+        self.DOCUMENT_MAX_MB = float(os.getenv("DOCUMENT_MAX_MB", "15"))
+        self.DOCUMENT_MAX_PAGES = int(os.getenv("DOCUMENT_MAX_PAGES", "30"))
+        self.DOCUMENT_TIMEOUT = float(os.getenv("DOCUMENT_TIMEOUT", "30"))
+        self.DOCUMENT_WORKERS = int(os.getenv("DOCUMENT_WORKERS", "2"))
+
+        # Cortesía por dominio registrable: tokens/s y ráfaga compartidos entre máquinas
+        self.DOMAIN_RATE = float(os.getenv("DOMAIN_RATE", "0.5"))
+        self.DOMAIN_BURST = int(os.getenv("DOMAIN_BURST", "2"))
+
+        # Métricas (0 = desactivado); solo loopback salvo que se abra explícitamente.
+        # 9847 no choca con node_exporter (9100) en las mismas máquinas
+        self.METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+        self.METRICS_PORT = int(os.getenv("METRICS_PORT", "9847"))
+
         self._setup_logging()
 
     def _require(self, key: str) -> str:
-        """Obtiene variable o falla inmediatamente."""
+        """Obtiene variable o falla inmediatamente con ConfigError."""
         value = os.getenv(key)
         if not value:
-            print(f"[FATAL] Variable de entorno requerida no encontrada: {key}", file=sys.stderr)
-            sys.exit(1)
+            raise ConfigError(f"Variable de entorno requerida no encontrada: {key}")
         return value
 
+    @staticmethod
+    def _list(key: str) -> list:
+        """Lista separada por comas (vacía si no está definida)."""
+        return [item.strip().lower() for item in os.getenv(key, "").split(",") if item.strip()]
+
     def _setup_logging(self):
-        """Configura logging estructurado."""
+        """Configura logging estructurado sin bloquear el event loop (cola + hilo escritor)."""
+        from src.utils.log_pipeline import JSONFormatter, install
+
         log_format = os.getenv("LOG_FORMAT", "text")
-        
         if log_format == "json":
             # JSON estructurado para monitoreo
-            import json
-            class JSONFormatter(logging.Formatter):
-                def format(self, record):
-                    return json.dumps({
-                        "time": self.formatTime(record),
-                        "level": record.levelname,
-                        "machine": self.machine_id,
-                        "msg": record.getMessage(),
-                    })
-            fmt = JSONFormatter()
-            fmt.machine_id = self.MACHINE_ID
+            fmt = JSONFormatter(self.MACHINE_ID)
         else:
             fmt = logging.Formatter(
                 f"[%(asctime)s] [{self.MACHINE_ID}] %(levelname)s - %(message)s"
             )
-        
-        handler = logging.StreamHandler()
-        handler.setFormatter(fmt)
-        
-        logging.basicConfig(
-            level=logging.INFO,
-            handlers=[handler]
+
+        # Muestreo de mensajes frecuentes (por debajo de WARNING): por plantilla y segundo
+        install(
+            fmt,
+            rate=float(os.getenv("LOG_RATE_LIMIT", "5")),
+            burst=int(os.getenv("LOG_RATE_BURST", "20")),
         )
 
 
@@ -0,0 +1,223 @@
+"""Extracción del contenido principal: fuera menús, banners de cookies y widgets.
+
+Estilo jusText sobre el árbol ya parseado: el cuerpo se parte en bloques
+(párrafos, celdas, items...) y cada bloque se clasifica por longitud,
+densidad de enlaces y densidad de palabras vacías; los bloques cortos se
+deciden por contexto. Los contenedores marcados como navegación, cookies o
+widgets por etiqueta, clase o id se descartan sin recorrerlos.
+"""
+import re
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from bs4 import BeautifulSoup, Comment, NavigableString, Tag
+from bs4.element import CData, Declaration, Doctype, ProcessingInstruction
+
+SKIP_TAGS = {
+    "script", "style", "noscript", "template", "svg", "iframe", "object", "embed",
+    "canvas", "select", "button", "input", "textarea", "nav", "aside", "form", "head",
+}
+# Solo se descartan fuera de <main>/<article> (ahí suelen llevar el título de la entrada)
+LAYOUT_TAGS = {"header", "footer"}
+CONTENT_TAGS = {"main", "article"}
+BLOCK_TAGS = {
+    "p", "div", "section", "article", "main", "li", "ul", "ol", "dl", "dt", "dd", "td", "th",
+    "tr", "table", "blockquote", "pre", "address", "figcaption", "figure", "header", "footer",
+    "h1", "h2", "h3", "h4", "h5", "h6", "center", "fieldset", "details", "summary",
+}
+HEADING_TAGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+_NON_TEXT = (Comment, CData, Declaration, Doctype, ProcessingInstruction)
+
+# Tokens de clase/id de contenedores que no son contenido (Divi, Elementor, temas WP...)
+BOILERPLATE_TOKENS = {
+    "cookie", "cookies", "gdpr", "consent", "cmplz", "menu", "nav", "navbar", "navigation",
+    "sidebar", "widget", "widgets", "share", "sharing", "social", "breadcrumb", "breadcrumbs",
+    "popup", "modal", "newsletter", "subscribe", "comments", "comment", "slider", "carousel",
+    "related", "advert", "ads", "topbar", "skip", "screen-reader-text", "sr-only",
+}
+_TOKEN_SPLIT = re.compile(r"[\s_\-]+")
+_WHITESPACE = re.compile(r"\s+")
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+STOPWORDS = set("""
+a al algo algunas algunos ante antes como con contra cual cuando de del desde donde durante
+e el ella ellas ellos en entre era es esa esas ese eso esos esta estas este esto estos fue
+ha han hasta hay la las le les lo los mas más me mi mis muy ni no nos nuestra nuestras nuestro
+nuestros o os otra otras otro otros para pero poco por porque que qué se sea ser si sí sin
+sobre son su sus también tanto te tiene tienen todo todos tu tus un una unas uno unos y ya
+además cada mismo misma hacia según sus somos ofrecemos nuestra trabajamos
+the of and to in is for on with that this are as be by at from or an it our we
+""".split())
+
+# Parámetros de clasificación (valores por defecto de jusText)
+MAX_LINK_DENSITY = 0.2
+LENGTH_LOW = 70
+LENGTH_HIGH = 200
+STOPWORDS_LOW = 0.30
+STOPWORDS_HIGH = 0.32
+MIN_MAIN_CHARS = 200  # Por debajo se devuelve todo el texto visible (páginas mínimas)
+
+
+@dataclass
+class _Block:
+    parts: List[str] = field(default_factory=list)
+    link_chars: int = 0
+    heading: bool = False
+    text: str = ""
+    kind: str = "bad"
+
+
+@dataclass
+class MainContent:
+    """Texto principal (bloques separados por saltos de línea) y encabezados de sección."""
+    text: str
+    headings: List[str]
+
+
+def _is_boilerplate(tag: Tag) -> bool:
+    attrs = tag.attrs
+    if not attrs or tag.name in ("html", "body", "main", "article"):
+        return False
+    if "hidden" in attrs or attrs.get("aria-hidden") == "true" or attrs.get("role") == "navigation":
+        return True
+    style = attrs.get("style")
+    if style and "display:none" in style.replace(" ", "").lower():
+        return True
+    classes = attrs.get("class") or []
+    names = " ".join(classes) + " " + (attrs.get("id") or "")
+    if not names.strip():
+        return False
+    return any(token in BOILERPLATE_TOKENS for token in _TOKEN_SPLIT.split(names.lower()))
+
+
+def _segment(root: Tag) -> List[_Block]:
+    """Parte el árbol en bloques de texto sin recursión (los DOM de page builders son profundos)."""
+    blocks: List[_Block] = []
+    current = _Block()
+
+    def flush():
+        nonlocal current
+        raw = "".join(current.parts)
+        if not raw or raw.isspace():
+            # Bloque vacío (lo habitual entre divs anidados): se reutiliza
+            current.parts.clear()
+            current.link_chars = 0
+            current.heading = False
+            return
+        current.text = _WHITESPACE.sub(" ", raw).strip()
+        blocks.append(current)
+        current = _Block()
+
+    # Pila de (nodo, dentro de enlace, dentro de main/article); None marca fin de bloque
+    stack = [(child, False, False) for child in reversed(root.contents)]
+    while stack:
+        node, in_link, in_content = stack.pop()
+        if node is None:
+            flush()
+            continue
+        if isinstance(node, NavigableString):
+            if isinstance(node, _NON_TEXT):
+                continue
+            text = str(node)
+            current.parts.append(text)
+            if in_link:
+                current.link_chars += len(text.strip())
+            continue
+        if not isinstance(node, Tag):
+            continue
+
+        name = node.name
+        if name in SKIP_TAGS or (name in LAYOUT_TAGS and not in_content) or _is_boilerplate(node):
+            continue
+        if name == "br":
+            current.parts.append(" ")
+            continue
+
+        is_block = name in BLOCK_TAGS
+        if is_block:
+            flush()
+            stack.append((None, False, False))
+        if name in HEADING_TAGS:
+            current.heading = True
+        child_link = in_link or name == "a"
+        child_content = in_content or name in CONTENT_TAGS
+        stack.extend((child, child_link, child_content) for child in reversed(node.contents))
+    flush()
+    return blocks
+
+
+def _classify(block: _Block) -> str:
+    length = len(block.text)
+    link_density = block.link_chars / length if length else 1.0
+    if link_density > MAX_LINK_DENSITY:
+        return "bad"
+    if length < LENGTH_LOW:
+        return "short" if block.link_chars == 0 else "bad"
+    words = _WORD.findall(block.text.lower())
+    stopword_density = sum(1 for w in words if w in STOPWORDS) / len(words) if words else 0.0
+    if stopword_density >= STOPWORDS_HIGH:
+        return "good" if length > LENGTH_HIGH else "near_good"
+    if stopword_density >= STOPWORDS_LOW:
+        return "near_good"
+    return "bad"
+
+
+def _neighbour(kinds: List[str], index: int, step: int, ignore: tuple) -> str:
+    index += step
+    while 0 <= index < len(kinds):
+        if kinds[index] not in ignore:
+            return kinds[index]
+        index += step
+    return "bad"  # Los bordes del documento cuentan como boilerplate
+
+
+def _resolve_context(blocks: List[_Block]):
+    """Cortos y casi-buenos se deciden por sus vecinos (segunda pasada de jusText)."""
+    kinds = [b.kind for b in blocks]
+    for i, block in enumerate(blocks):
+        if kinds[i] == "short":
+            prev = _neighbour(kinds, i, -1, ("short", "near_good"))
+            nxt = _neighbour(kinds, i, 1, ("short", "near_good"))
+            if prev == nxt:
+                block.kind = prev
+            else:
+                # Entre bueno y malo: decide si hay algún casi-bueno pegado
+                near = (_neighbour(kinds, i, -1, ("short",)), _neighbour(kinds, i, 1, ("short",)))
+                block.kind = "good" if "near_good" in near else "bad"
+        elif kinds[i] == "near_good":
+            prev = _neighbour(kinds, i, -1, ("short", "near_good"))
+            nxt = _neighbour(kinds, i, 1, ("short", "near_good"))
+            block.kind = "bad" if prev == nxt == "bad" else "good"
+
+
+def _keep_headings(blocks: List[_Block], max_distance: int = LENGTH_HIGH):
+    """Encabezados seguidos de contenido bueno (antes de otro encabezado) se conservan."""
+    for i, block in enumerate(blocks):
+        if not block.heading:
+            continue
+        distance = 0
+        for following in blocks[i + 1:]:
+            if following.heading or distance > max_distance:
+                break
+            if following.kind == "good":
+                block.kind = "good"
+                break
+            distance += len(following.text)
+
+
+def extract_main_content(soup: BeautifulSoup, max_chars: int = 5000) -> MainContent:
+    """Contenido principal del documento, sin modificar el árbol."""
+    root: Optional[Tag] = soup.body or soup
+    blocks = _segment(root)
+    for block in blocks:
+        # Los encabezados se deciden como cortos y luego por el contenido que encabezan
+        block.kind = "short" if block.heading else _classify(block)
+    _resolve_context(blocks)
+    _keep_headings(blocks)
+
+    kept = [b for b in blocks if b.kind == "good"]
+    if sum(len(b.text) for b in kept) < MIN_MAIN_CHARS:
+        kept = blocks  # Página mínima: mejor todo el texto visible que casi nada
+
+    headings = list(dict.fromkeys(b.text[:200] for b in kept if b.heading))[:30]
+    return MainContent(text="\n".join(b.text for b in kept)[:max_chars], headings=headings)
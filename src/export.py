@@ -0,0 +1,231 @@
+"""Exportación masiva de ``organizaciones`` a CSV, JSONL o Parquet.
+
+La tabla se reparte en rangos de ``dominio`` (por su primer carácter) que
+se leen a la vez, cada uno con paginación keyset: ninguna consulta usa
+OFFSET, así que la página un millón cuesta lo mismo que la primera. Un
+único escritor vuelca las páginas según llegan; la cola entre ambos está
+acotada y la memoria no crece con el tamaño de la exportación. Las filas
+salen ordenadas por dominio dentro de cada rango, no globalmente.
+"""
+import asyncio
+import csv
+import json
+import logging
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from src.config import ConfigError
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Opcional: sin pyarrow no hay exportación a Parquet
+    pa = pq = None
+
+logger = logging.getLogger(__name__)
+
+EXPORT_COLUMNS = (
+    "dominio", "url", "nombre_empresa", "titulo", "descripcion", "emails", "telefonos",
+    "redes_sociales", "direccion", "codigo_postal", "actividad", "sector", "tamaño",
+    "servicios", "pain_points", "score", "tier", "nicho_origen", "scrapeado_en",
+)
+LIST_COLUMNS = {"emails", "telefonos", "servicios", "pain_points", "tecnologias"}
+FORMATS = ("csv", "jsonl", "parquet")
+SUFFIX_FORMATS = {"csv": "csv", "jsonl": "jsonl", "ndjson": "jsonl", "json": "jsonl",
+                  "parquet": "parquet", "pq": "parquet"}
+
+# Primer carácter de los dominios; los rangos se cortan en estas letras
+KEY_ALPHABET = "0123456789abcdefghijklmnopqrstuvwxyz"
+# Filas por row group de Parquet (se acumulan páginas hasta llegar)
+PARQUET_ROW_GROUP = 50_000
+
+
+@dataclass
+class ExportFilters:
+    """Filtros de la exportación; vacíos = sin filtrar."""
+    tiers: List[str] = field(default_factory=list)
+    min_score: Optional[float] = None
+    max_score: Optional[float] = None
+    nichos: List[str] = field(default_factory=list)
+
+    def to_query(self) -> List[Tuple[str, str, object]]:
+        """Tuplas ``(operador, columna, valor)`` para ``SupabaseClient.fetch_page``."""
+        query = []
+        if self.tiers:
+            query.append(("in_", "tier", list(self.tiers)))
+        if self.min_score is not None:
+            query.append(("gte", "score", self.min_score))
+        if self.max_score is not None:
+            query.append(("lte", "score", self.max_score))
+        if self.nichos:
+            query.append(("in_", "nicho_origen", list(self.nichos)))
+        return query
+
+
+def key_ranges(parts: int) -> List[Tuple[Optional[str], Optional[str]]]:
+    """Rangos contiguos ``[desde, hasta)`` de dominio que cubren toda la tabla."""
+    parts = max(1, min(parts, len(KEY_ALPHABET)))
+    cuts = [KEY_ALPHABET[round(i * len(KEY_ALPHABET) / parts)] for i in range(1, parts)]
+    return list(zip([None] + cuts, cuts + [None]))
+
+
+class CsvExport:
+    """CSV con cabecera; listas unidas con ``; `` y objetos como JSON."""
+
+    def __init__(self, path: Path, columns: List[str]):
+        self._file = open(path, "w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(columns)
+        self.columns = columns
+
+    @staticmethod
+    def _cell(value):
+        if isinstance(value, list):
+            return "; ".join(str(v) for v in value)
+        if isinstance(value, dict):
+            return json.dumps(value, ensure_ascii=False)
+        return "" if value is None else value
+
+    def write(self, rows: List[dict]):
+        self._writer.writerows([self._cell(row.get(c)) for c in self.columns] for row in rows)
+
+    def close(self):
+        self._file.close()
+
+
+class JsonlExport:
+    """Una fila JSON por línea, con los tipos originales."""
+
+    def __init__(self, path: Path, columns: List[str]):
+        self._file = open(path, "w", encoding="utf-8")
+        self.columns = columns
+
+    def write(self, rows: List[dict]):
+        self._file.writelines(
+            json.dumps({c: row.get(c) for c in self.columns}, ensure_ascii=False, default=str) + "\n"
+            for row in rows
+        )
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetExport:
+    """Parquet con esquema tipado, escrito por row groups."""
+
+    def __init__(self, path: Path, columns: List[str]):
+        if pq is None:
+            raise ConfigError("La exportación a Parquet requiere pyarrow (pip install pyarrow)")
+        self.columns = columns
+        self.schema = pa.schema([(c, self._type(c)) for c in columns])
+        self._writer = pq.ParquetWriter(str(path), self.schema, compression="zstd")
+        self._pending: List[dict] = []
+
+    @staticmethod
+    def _type(column: str):
+        if column == "score":
+            return pa.float64()
+        if column in LIST_COLUMNS:
+            return pa.list_(pa.string())
+        return pa.string()
+
+    def _value(self, column: str, value):
+        if isinstance(value, dict):
+            return json.dumps(value, ensure_ascii=False)
+        if value is not None and column not in LIST_COLUMNS and column != "score":
+            return str(value)
+        return value
+
+    def write(self, rows: List[dict]):
+        self._pending.extend(rows)
+        if len(self._pending) >= PARQUET_ROW_GROUP:
+            self._flush()
+
+    def _flush(self):
+        if self._pending:
+            data = {c: [self._value(c, row.get(c)) for row in self._pending] for c in self.columns}
+            self._writer.write_table(pa.Table.from_pydict(data, schema=self.schema))
+            self._pending = []
+
+    def close(self):
+        self._flush()
+        self._writer.close()
+
+
+WRITERS = {"csv": CsvExport, "jsonl": JsonlExport, "parquet": ParquetExport}
+
+
+def format_for(path: Path) -> str:
+    """Formato deducido de la extensión (CSV por defecto)."""
+    return SUFFIX_FORMATS.get(Path(path).suffix.lower().lstrip("."), "csv")
+
+
+async def export(db, path: Path, fmt: str = "csv", filters: Optional[ExportFilters] = None,
+                 columns: Optional[List[str]] = None, page_size: int = 1000,
+                 concurrency: int = 4) -> int:
+    """Exporta las organizaciones que cumplen ``filters``. Retorna las filas escritas.
+
+    Se escribe en ``<path>.part`` y se renombra al terminar: un archivo con el
+    nombre final siempre está completo.
+    """
+    columns = list(columns or EXPORT_COLUMNS)
+    if "dominio" not in columns:
+        columns.insert(0, "dominio")  # Clave del keyset
+    select = ",".join(columns)
+    base = (filters or ExportFilters()).to_query()
+    ranges = key_ranges(concurrency)
+
+    path = Path(path)
+    partial = path.with_name(path.name + ".part")
+    writer = WRITERS[fmt](partial, columns)
+    # Como mucho: una página por rango esperando sitio, las de la cola y la que se escribe
+    pages: asyncio.Queue = asyncio.Queue(maxsize=len(ranges))
+
+    async def read_range(low: Optional[str], high: Optional[str]):
+        bounds = ([("gte", "dominio", low)] if low else []) + ([("lt", "dominio", high)] if high else [])
+        after = None
+        while True:
+            page = await asyncio.to_thread(db.fetch_page, select, after, page_size, base + bounds)
+            if page:
+                await pages.put(page)
+            if len(page) < page_size:
+                return
+            after = page[-1]["dominio"]
+
+    async def read_all():
+        tasks = [asyncio.create_task(read_range(low, high)) for low, high in ranges]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            # Exportación fallida: lo pendiente se descarta para que el escritor vea el final
+            for task in tasks:
+                task.cancel()
+            while not pages.empty():
+                pages.get_nowait()
+            pages.put_nowait(None)
+            raise
+        await pages.put(None)
+
+    reader = asyncio.create_task(read_all())
+    written = batches = 0
+    try:
+        while (page := await pages.get()) is not None:
+            await asyncio.to_thread(writer.write, page)
+            written += len(page)
+            batches += 1
+            if batches % 100 == 0:
+                logger.info("Exportadas %s filas", written)
+        await reader  # Propaga errores de lectura
+    except BaseException:
+        reader.cancel()
+        await asyncio.gather(reader, return_exceptions=True)
+        writer.close()
+        partial.unlink(missing_ok=True)
+        raise
+
+    writer.close()
+    os.replace(partial, path)
+    logger.info("Exportación completada: %s filas en %s", written, path)
+    return written
@@ -0,0 +1,251 @@
+"""Feature store local: entradas normalizadas del scoring por dominio.
+
+Cada entidad procesada añade un registro NumPy de ancho fijo al segmento
+de su proceso (``.feat.open`` mientras escribe, ``.feat`` al sellarlo,
+igual que el WAL y los WARC). Cargar es un ``np.fromfile`` por segmento y
+quedarse con el último registro de cada dominio, así que probar pesos
+nuevos sobre toda la tabla no exige volver a scrapear ni a llamar a la IA.
+
+Además de las features del scorer se guardan conteos que Supabase no
+persiste (indicadores de calidad, ``conocimiento_profundo``...) para
+poder experimentar con factores nuevos.
+
+Cada máquina escribe en su ``FEATURE_DIR`` local. Los nombres de segmento
+llevan el writer (``MACHINE_ID_pid``) y cada registro su ``updated_at``,
+así que los segmentos sellados de todas las máquinas se pueden juntar en
+un directorio (``collect``) sin renombrar nada: ``load`` se queda con el
+registro más reciente de cada dominio venga de donde venga.
+"""
+import logging
+import os
+import shutil
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import BinaryIO, Iterable, List, Optional
+
+import numpy as np
+
+from src.batch_scoring import FEATURES, FLAG_FEATURES, feature_row
+
+logger = logging.getLogger(__name__)
+
+OPEN_SUFFIX = ".open"
+SEALED_SUFFIX = ".feat"
+# Dominios más largos no caben en el registro (no se guardan)
+DOMAIN_BYTES = 96
+
+# Features extra que el scorer aún no usa: (campo, dtype)
+EXTRA_FEATURES = (
+    ("emails", "u2"), ("phones", "u2"),
+    ("ssl", "?"), ("contact", "?"), ("professional", "?"),
+    ("services", "u1"), ("technologies", "u1"),
+    ("activities", "u1"), ("challenges", "u1"), ("partners", "u1"), ("funding", "u1"),
+    ("products_fit", "u1"),
+)
+
+RECORD_DTYPE = np.dtype(
+    [("dominio", f"S{DOMAIN_BYTES}"), ("updated_at", "<f8")]
+    + [(name, "?" if name in FLAG_FEATURES else "u1") for name in FEATURES]
+    + list(EXTRA_FEATURES)
+)
+
+# Cabecera: magic, versión, tamaño de registro (cambia si cambia el dtype)
+MAGIC = b"SEFEAT"
+VERSION = 1
+_HEADER = struct.Struct("<6sHI")
+
+
+def _count(value, limit: int) -> int:
+    return min(len(value or ()), limit)
+
+
+def extra_row(scraped: dict, ai: Optional[dict]) -> tuple:
+    """Features extra en el orden de ``EXTRA_FEATURES``."""
+    analysis = ai or {}
+    indicators = analysis.get("indicadores_calidad") or {}
+    deep = analysis.get("conocimiento_profundo") or {}
+    opportunities = analysis.get("oportunidades_detectadas") or {}
+    return (
+        _count(scraped.get("emails"), 0xFFFF),
+        _count(scraped.get("phones"), 0xFFFF),
+        bool(indicators.get("tiene_ssl")),
+        bool(indicators.get("tiene_contacto")),
+        bool(indicators.get("sitio_profesional")),
+        _count(analysis.get("servicios"), 0xFF),
+        _count(analysis.get("tecnologias_detectadas"), 0xFF),
+        _count(deep.get("actividades_principales"), 0xFF),
+        _count(deep.get("retos_objetivos"), 0xFF),
+        _count(deep.get("colaboradores"), 0xFF),
+        _count(deep.get("financiacion"), 0xFF),
+        _count(opportunities.get("productos_encajan"), 0xFF),
+    )
+
+
+class FeatureStore:
+    """Escritor append-only de features, con rotación de segmentos por tamaño."""
+
+    def __init__(self, directory: Path, writer_id: str,
+                 segment_max_bytes: int = 64 * 1024 * 1024, flush_every: int = 64):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.writer_id = writer_id
+        self.segment_max_bytes = segment_max_bytes
+        self.flush_every = flush_every
+        self._lock = threading.Lock()
+        self._file: Optional[BinaryIO] = None
+        self._path: Optional[Path] = None
+        self._seq = 0
+        self._unflushed = 0
+
+    def record(self, domain: str, scraped: dict, ai: Optional[dict]) -> bool:
+        """Añade las features de una entidad. Retorna False si el dominio no cabe."""
+        key = domain.encode("utf-8")
+        if len(key) > DOMAIN_BYTES:
+            logger.warning("Dominio demasiado largo para el feature store: %s", domain)
+            return False
+
+        row = np.array(
+            [(key, time.time(), *(min(v, 0xFF) for v in feature_row(scraped, ai)),
+              *extra_row(scraped, ai))],
+            dtype=RECORD_DTYPE,
+        )
+        with self._lock:
+            if self._file is None:
+                self._open()
+            self._file.write(row.tobytes())
+            self._unflushed += 1
+            # Las features se pueden recalcular: se pierde como mucho un lote si el proceso cae
+            if self._unflushed >= self.flush_every:
+                self._flush()
+            if self._file.tell() >= self.segment_max_bytes:
+                self._seal()
+        return True
+
+    def flush(self):
+        """Vuelca los registros pendientes (visibles para ``load`` en el segmento abierto)."""
+        with self._lock:
+            if self._file is not None:
+                self._flush()
+
+    def _flush(self):
+        self._file.flush()
+        self._unflushed = 0
+
+    def _open(self):
+        self._seq += 1
+        stamp = time.strftime("%Y%m%d%H%M%S")
+        name = f"features-{self.writer_id}-{stamp}-{self._seq:05d}{SEALED_SUFFIX}"
+        self._path = self.directory / (name + OPEN_SUFFIX)
+        self._file = open(self._path, "ab")
+        self._file.write(_HEADER.pack(MAGIC, VERSION, RECORD_DTYPE.itemsize))
+
+    def _seal(self):
+        self._file.close()
+        os.replace(self._path, self._path.with_name(self._path.name[: -len(OPEN_SUFFIX)]))
+        self._file = None
+        self._path = None
+        self._unflushed = 0
+
+    def close(self):
+        """Sella el segmento activo."""
+        with self._lock:
+            if self._file is not None:
+                self._seal()
+
+
+def feature_files(directory: Path, include_open: bool = True) -> List[Path]:
+    """Segmentos del directorio por nombre (writer y fecha)."""
+    patterns = ["*" + SEALED_SUFFIX] + (["*" + SEALED_SUFFIX + OPEN_SUFFIX] if include_open else [])
+    found = [p for pattern in patterns for p in Path(directory).glob(pattern)]
+    return sorted(found, key=lambda p: p.name)
+
+
+def read_segment(path: Path) -> np.ndarray:
+    """Registros de un segmento; un registro a medio escribir al final se ignora."""
+    with open(path, "rb") as f:
+        header = f.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            return np.empty(0, dtype=RECORD_DTYPE)
+        magic, version, itemsize = _HEADER.unpack(header)
+        if magic != MAGIC or version != VERSION or itemsize != RECORD_DTYPE.itemsize:
+            logger.warning("Segmento de features incompatible, se omite: %s", path.name)
+            return np.empty(0, dtype=RECORD_DTYPE)
+        count = (os.fstat(f.fileno()).st_size - _HEADER.size) // itemsize
+        return np.fromfile(f, dtype=RECORD_DTYPE, count=count)
+
+
+def latest(records: np.ndarray) -> np.ndarray:
+    """Último registro de cada dominio, ordenado por dominio."""
+    if len(records) == 0:
+        return records
+    ordered = records[np.lexsort((records["updated_at"], records["dominio"]))]
+    last = np.append(ordered["dominio"][1:] != ordered["dominio"][:-1], True)
+    return ordered[last]
+
+
+def load(directory: Path, include_open: bool = True) -> np.ndarray:
+    """Features vigentes de todos los segmentos del directorio (uno por dominio)."""
+    segments = [read_segment(path) for path in feature_files(directory, include_open)]
+    if not segments:
+        return np.empty(0, dtype=RECORD_DTYPE)
+    return latest(np.concatenate(segments))
+
+
+def compact(directory: Path) -> int:
+    """Funde los segmentos sellados en uno solo con el último registro por dominio.
+
+    Los segmentos abiertos no se tocan, así que puede correr con workers activos.
+    Retorna los registros del segmento resultante.
+    """
+    directory = Path(directory)
+    sealed = feature_files(directory, include_open=False)
+    if len(sealed) < 2:
+        return sum(len(read_segment(path)) for path in sealed)
+
+    records = latest(np.concatenate([read_segment(path) for path in sealed]))
+    stamp = time.strftime("%Y%m%d%H%M%S")
+    target = directory / f"features-compact-{stamp}-{os.getpid()}{SEALED_SUFFIX}"
+    partial = target.with_name(target.name + OPEN_SUFFIX)
+    with open(partial, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, RECORD_DTYPE.itemsize))
+        f.write(records.tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(partial, target)
+    for path in sealed:
+        path.unlink()
+    logger.info("Feature store compactado: %s segmentos -> %s (%s dominios)",
+                len(sealed), target.name, len(records))
+    return len(records)
+
+
+def collect(sources: Iterable[Path], directory: Path) -> int:
+    """Copia a ``directory`` los segmentos sellados de otros directorios. Retorna cuántos.
+
+    Pensado para juntar los feature stores de varias máquinas (copiados con
+    rsync o montados por red) antes de ``rescore``. Los segmentos que ya
+    están se omiten, así que se puede repetir; cada copia se escribe aparte
+    y se renombra al terminar para que ``load`` nunca lea una a medias.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    copied = 0
+    for source in sources:
+        source = Path(source)
+        if not source.is_dir():
+            logger.warning("Directorio de features inexistente, se omite: %s", source)
+            continue
+        if source.resolve() == directory.resolve():
+            continue
+        for path in feature_files(source, include_open=False):
+            target = directory / path.name
+            if target.exists():
+                continue
+            partial = target.with_name(target.name + ".tmp")
+            shutil.copyfile(path, partial)
+            os.replace(partial, target)
+            copied += 1
+    logger.info("Feature store: %s segmentos copiados a %s", copied, directory)
+    return copied
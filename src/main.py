@@ -1,14 +1,28 @@
 """Punto de entrada principal del sistema."""
+import argparse
 import asyncio
 import csv
+import json
 import logging
+import signal
+import sys
+import time
+from importlib import import_module
 from pathlib import Path
+from typing import TYPE_CHECKING, Callable, List, Optional
 
 import redis.asyncio as redis
 
-from src.config import get_config
-from src.worker import Worker
+from src.config import ConfigError, get_config
 from src.models import TareaURL
+from src.utils.metrics import QUEUE_DEPTH, start_metrics_server
+from src.utils.task_codec import encode_task
+from src.utils.task_queue import DEAD_LETTER_KEY, READY_KEY, RETRY_KEY, TaskQueue, canonical_domain
+from src.supervisor import Supervisor
+
+# El stack del worker (bs4, openai, supabase...) se importa al usarlo, no al cargar el CLI
+if TYPE_CHECKING:
+    from src.worker import Worker
 
 logger = logging.getLogger(__name__)
 
@@ -16,9 +30,13 @@ logger = logging.getLogger(__name__)
 async def load_initial_urls(redis_client: redis.Redis, cfg) -> int:
     """Carga URLs iniciales desde CSV a Redis si la cola está vacía."""
     queue_size = await redis_client.llen("scraping_queue")
+    # Tareas ya repartidas en colas por dominio también cuentan como cola existente
+    ready_domains = await redis_client.zcard(READY_KEY)
     
-    if queue_size > 0:
-        logger.info(f"Cola existente con {queue_size} tareas")
+    if queue_size > 0 or ready_domains > 0:
+        logger.info(
+            "Cola existente con %s tareas y %s dominios planificados", queue_size, ready_domains
+        )
         return queue_size
     
     # Buscar archivo de la máquina
@@ -42,31 +60,109 @@ async def load_initial_urls(redis_client: redis.Redis, cfg) -> int:
                 prioridad=int(row.get("prioridad", 1)),
                 nivel=0,
             )
-            await redis_client.rpush("scraping_queue", tarea.model_dump_json())
+            await redis_client.rpush("scraping_queue", encode_task(tarea))
             loaded += 1
     
-    logger.info(f"Cargadas {loaded} URLs iniciales desde {csv_path}")
+    logger.info("Cargadas %s URLs iniciales desde %s", loaded, csv_path)
     return loaded
 
 
-async def run_workers(num_workers: int):
+async def monitor_queue(cfg, interval: float = 15.0):
+    """Publica periódicamente la profundidad de las colas como métrica."""
+    redis_client = redis.from_url(cfg.REDIS_URL)
+    try:
+        while True:
+            try:
+                async with redis_client.pipeline(transaction=False) as pipe:
+                    pipe.llen("scraping_queue")
+                    pipe.zcard(RETRY_KEY)
+                    pipe.hlen(DEAD_LETTER_KEY)
+                    pipe.zcard(READY_KEY)
+                    main_depth, retries, dead, domains = await pipe.execute()
+                QUEUE_DEPTH.set(main_depth, queue="scraping_queue")
+                QUEUE_DEPTH.set(domains, queue=READY_KEY)
+                QUEUE_DEPTH.set(retries, queue=RETRY_KEY)
+                QUEUE_DEPTH.set(dead, queue=DEAD_LETTER_KEY)
+            except Exception as e:
+                logger.debug("Error leyendo profundidad de cola: %s", e)
+            await asyncio.sleep(interval)
+    finally:
+        await redis_client.close()
+
+
+def worker_stats(workers: List["Worker"]) -> dict:
+    """Estadísticas agregadas de los workers del proceso."""
+    # El analizador IA es compartido: sus tokens se cuentan una vez
+    analyzers = {id(w.ai): w.ai for w in workers}
+    return {
+        "processed": sum(w.processed for w in workers),
+        "errors": sum(w.errors for w in workers),
+        "tokens": sum(ai.get_token_count() for ai in analyzers.values()),
+    }
+
+
+async def report_stats(workers: List["Worker"], on_stats: Callable[[dict], None], interval: float):
+    """Publica periódicamente las estadísticas del proceso."""
+    while True:
+        await asyncio.sleep(interval)
+        on_stats(worker_stats(workers))
+
+
+async def run_workers(
+    num_workers: int,
+    on_stats: Optional[Callable[[dict], None]] = None,
+    stats_interval: float = 30.0,
+) -> dict:
     """Ejecuta N workers en paralelo."""
-    workers = [Worker() for _ in range(num_workers)]
+    from src.components import Components
+    from src.worker import Worker
+
+    cfg = get_config()
+    metrics_runner = None
+    if cfg.METRICS_PORT:
+        metrics_runner = await start_metrics_server(cfg.METRICS_PORT, cfg.MACHINE_ID, cfg.METRICS_HOST)
+    background = [asyncio.create_task(monitor_queue(cfg))]
+
+    components = Components(num_workers)
+    workers = [Worker(components) for _ in range(num_workers)]
+
+    # Un único handler por señal: add_signal_handler reemplaza al anterior
+    def shutdown():
+        logger.info("Iniciando apagado gracioso...")
+        for w in workers:
+            w.stop()
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, shutdown)
+
+    if on_stats:
+        background.append(asyncio.create_task(report_stats(workers, on_stats, stats_interval)))
     tasks = [asyncio.create_task(w.start()) for w in workers]
     
     try:
         await asyncio.gather(*tasks)
     except asyncio.CancelledError:
         logger.info("Workers cancelados")
+    finally:
+        for task in background:
+            task.cancel()
+        await components.close()
+        if metrics_runner:
+            await metrics_runner.cleanup()
 
+    stats = worker_stats(workers)
+    if on_stats:
+        on_stats(stats)
+    return stats
 
-async def main():
-    """Función principal."""
-    cfg = get_config()
-    
+
+async def prepare(cfg) -> bool:
+    """Verifica Redis y carga las URLs iniciales."""
     logger.info("=== Sistema de Scraping Distribuido ===")
-    logger.info(f"Machine ID: {cfg.MACHINE_ID}")
-    logger.info(f"Max Threads: {cfg.MAX_THREADS}")
+    logger.info("Machine ID: %s", cfg.MACHINE_ID)
+    logger.info("Max Threads: %s", cfg.MAX_THREADS)
+    logger.info("Procesos: %s", cfg.PROCESSES)
     
     # Conectar a Redis
     redis_client = redis.from_url(cfg.REDIS_URL)
@@ -75,16 +171,314 @@ async def main():
         await redis_client.ping()
         logger.info("Conexión Redis OK")
     except Exception as e:
-        logger.error(f"Error conectando a Redis: {e}")
-        return
+        logger.error("Error conectando a Redis: %s", e)
+        return False
     
     # Cargar URLs iniciales
     await load_initial_urls(redis_client, cfg)
     await redis_client.close()
+    return True
+
+
+async def main():
+    """Función principal (un solo proceso)."""
+    cfg = get_config()
+    # El stack del worker se importa en un hilo mientras se prepara Redis
+    warm = asyncio.create_task(asyncio.to_thread(import_module, "src.worker"))
+    ready = await prepare(cfg)
+    await warm
+    if not ready:
+        return
     
     # Ejecutar workers
     await run_workers(cfg.MAX_THREADS)
 
 
+def run() -> int:
+    """Arranca en modo mono-proceso o supervisor según PROCESSES."""
+    cfg = get_config()
+    if cfg.PROCESSES <= 1:
+        asyncio.run(main())
+        return 0
+
+    # El loop de preparación se cierra antes de lanzar los hijos
+    if not asyncio.run(prepare(cfg)):
+        return 1
+    return Supervisor(cfg.PROCESSES, cfg.MAX_THREADS).run()
+
+
+async def replay(batch_size: int, include_open: bool):
+    """Reenvía a Supabase los registros pendientes del WAL local."""
+    from src.utils.supabase_client import SupabaseClient
+
+    get_config()
+    db = SupabaseClient()
+    pending = await db.get_backup_count()
+    logger.info("Registros pendientes en WAL: %s", pending)
+
+    replayed = await db.replay_backup(batch_size=batch_size, include_open=include_open)
+    logger.info("Replay completado: %s registros enviados", replayed)
+
+
+async def dead_letters(action: str, domains: List[str], limit: int):
+    """Inspecciona, reencola o purga las tareas en dead letters."""
+    cfg = get_config()
+    redis_client = redis.from_url(cfg.REDIS_URL)
+    queue = TaskQueue(redis_client)
+    try:
+        if action == "list":
+            entries = await queue.list_dead_letters(limit=limit)
+            for entry in entries:
+                print(f"{entry['failed_at']}  {entry['dominio']:<40} {entry['error']}")
+            print(f"Total dead letters: {await redis_client.hlen(DEAD_LETTER_KEY)}")
+        elif action == "requeue":
+            requeued = await queue.requeue_dead_letters(domains or None)
+            logger.info("Reencoladas %s tareas desde dead letters", requeued)
+        elif action == "purge":
+            purged = await queue.purge_dead_letters()
+            logger.info("Eliminadas %s dead letters", purged)
+    finally:
+        await redis_client.close()
+
+
+async def recrawl_seed(batch_size: int):
+    """Agenda la revisita de las organizaciones guardadas antes de tener recrawl."""
+    from src.utils.recrawl import RecrawlScheduler
+    from src.utils.supabase_client import SupabaseClient
+
+    cfg = get_config()
+    db = SupabaseClient()
+    redis_client = redis.from_url(cfg.REDIS_URL)
+    scheduler = RecrawlScheduler(
+        redis_client,
+        min_days=cfg.RECRAWL_MIN_DAYS,
+        max_days=cfg.RECRAWL_MAX_DAYS,
+        initial_days=cfg.RECRAWL_INITIAL_DAYS,
+    )
+    seeded = scanned = 0
+    after = None
+    try:
+        while True:
+            rows = await asyncio.to_thread(
+                db.fetch_page, "dominio,url,nicho_origen", after=after, limit=batch_size
+            )
+            if not rows:
+                break
+            after = rows[-1]["dominio"]
+            scanned += len(rows)
+            seeded += await scheduler.seed(
+                (canonical_domain(row["url"] or "") or row["dominio"], row["url"], row.get("nicho_origen"))
+                for row in rows
+            )
+            if len(rows) < batch_size:
+                break
+    finally:
+        await redis_client.close()
+    logger.info("Recrawl: %s dominios agendados de %s revisados", seeded, scanned)
+
+
+async def check() -> int:
+    """Valida configuración y conectividad en paralelo. Retorna el código de salida."""
+    from src.checks import run_checks
+
+    cfg = get_config()
+    start = time.perf_counter()
+    results = await run_checks(cfg)
+    for result in results:
+        status = "OK  " if result.ok else "FAIL"
+        print(f"{status} {result.name:<12} {result.seconds * 1000:>7.0f} ms  {result.detail}")
+    print(f"Comprobación completada en {time.perf_counter() - start:.2f}s")
+    return 0 if all(r.ok for r in results) else 1
+
+
+async def run_reprocess(paths: List[str], concurrency: int, parse_workers: Optional[int],
+                        analyze: bool, include_open: bool):
+    """Reprocesa capturas WARC con el pipeline actual."""
+    from src.reprocess import reprocess, resolve_paths
+
+    cfg = get_config()
+    files = resolve_paths(paths or [cfg.WARC_DIR], include_open)
+    if not files:
+        logger.warning("No hay archivos WARC que reprocesar")
+        return
+    logger.info("Reprocesando %s archivos WARC", len(files))
+    stats = await reprocess(files, concurrency, parse_workers, analyze)
+    logger.info("Reprocesado completado: %s", dict(stats))
+
+
+async def run_rescore(batch_size: int, dry_run: bool, weights: Optional[dict]):
+    """Recalcula score y tier de todas las organizaciones desde el feature store."""
+    from src.batch_scoring import rescore
+    from src.feature_store import load
+    from src.utils.supabase_client import SupabaseClient
+
+    cfg = get_config()
+    if not cfg.FEATURE_DIR:
+        raise ConfigError("FEATURE_DIR vacío: rescore necesita el feature store")
+    features = await asyncio.to_thread(load, Path(cfg.FEATURE_DIR))
+    logger.info("Feature store: %s dominios", len(features))
+    stats = await rescore(
+        SupabaseClient(), features, batch_size=batch_size, dry_run=dry_run, weights=weights
+    )
+    logger.info("Rescoring completado%s: %s", " (dry-run)" if dry_run else "", dict(stats))
+
+
+async def run_export(args: argparse.Namespace):
+    """Exporta organizaciones filtradas a CSV, JSONL o Parquet."""
+    from src.export import ExportFilters, export, format_for
+    from src.utils.supabase_client import SupabaseClient
+
+    get_config()
+    filters = ExportFilters(
+        tiers=args.tier, min_score=args.min_score, max_score=args.max_score, nichos=args.nicho,
+    )
+    columns = args.columns.split(",") if args.columns else None
+    start = time.perf_counter()
+    rows = await export(
+        SupabaseClient(), Path(args.output), args.format or format_for(args.output), filters,
+        columns=columns, page_size=args.page_size, concurrency=args.concurrency,
+    )
+    elapsed = time.perf_counter() - start
+    logger.info(
+        "%s filas exportadas en %.1fs (%.0f filas/s)", rows, elapsed, rows / elapsed if elapsed else 0
+    )
+
+
+def features(weights: Optional[dict], compact: bool, collect: Optional[List[str]] = None):
+    """Scores y tiers del feature store con otros pesos, o junta/compacta sus segmentos."""
+    from src.batch_scoring import score_features, scoring_columns
+    from src.feature_store import collect as collect_segments, compact as compact_store, load
+
+    cfg = get_config()
+    if not cfg.FEATURE_DIR:
+        raise ConfigError("FEATURE_DIR vacío: el feature store está desactivado")
+    if collect:
+        collect_segments([Path(source) for source in collect], Path(cfg.FEATURE_DIR))
+        if not compact:
+            return
+    if compact:
+        compact_store(Path(cfg.FEATURE_DIR))
+        return
+
+    start = time.perf_counter()
+    records = load(Path(cfg.FEATURE_DIR))
+    scores, tiers = score_features(scoring_columns(records), weights)
+    print(f"{len(records)} dominios en {time.perf_counter() - start:.2f}s")
+    for tier in "ABCD":
+        count = int((tiers == tier).sum())
+        share = count / len(records) * 100 if len(records) else 0.0
+        print(f"Tier {tier}: {count:>8} ({share:5.1f}%)")
+    if len(records):
+        print(f"Score medio: {scores.mean():.2f}")
+
+
+def _weights(raw: str) -> dict:
+    """Pesos de scoring en JSON; solo claves conocidas."""
+    from src.scoring import WEIGHTS
+
+    try:
+        weights = json.loads(raw)
+    except json.JSONDecodeError as e:
+        raise argparse.ArgumentTypeError(f"JSON inválido: {e}")
+    if not isinstance(weights, dict):
+        raise argparse.ArgumentTypeError("se espera un objeto JSON")
+    unknown = set(weights) - set(WEIGHTS)
+    if unknown:
+        raise argparse.ArgumentTypeError(f"pesos desconocidos: {', '.join(sorted(unknown))}")
+    return {k: float(v) for k, v in weights.items()}
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """Parsea la línea de comandos."""
+    parser = argparse.ArgumentParser(description="Sistema de Scraping Distribuido")
+    parser.add_argument(
+        "--check", action="store_true",
+        help="Valida configuración y conectividad (Redis, Supabase, Tor, OpenRouter) y sale",
+    )
+    sub = parser.add_subparsers(dest="command")
+
+    replay_cmd = sub.add_parser("replay", help="Reenvía el WAL local a Supabase")
+    replay_cmd.add_argument("--batch-size", type=int, default=500)
+    replay_cmd.add_argument(
+        "--include-open", action="store_true",
+        help="Incluye también segmentos abiertos de procesos vivos (solo con los workers detenidos)",
+    )
+
+    dead_cmd = sub.add_parser("dead-letters", help="Gestiona las tareas con reintentos agotados")
+    dead_cmd.add_argument("action", choices=["list", "requeue", "purge"])
+    dead_cmd.add_argument("domains", nargs="*", help="Dominios a reencolar (todos si se omite)")
+    dead_cmd.add_argument("--limit", type=int, default=50, help="Máximo de entradas a listar")
+
+    seed_cmd = sub.add_parser(
+        "recrawl-seed", help="Agenda revisitas para las organizaciones ya guardadas sin estado de recrawl",
+    )
+    seed_cmd.add_argument("--batch-size", type=int, default=1000, help="Filas por página")
+
+    reprocess_cmd = sub.add_parser("reprocess", help="Reprocesa capturas WARC sin red")
+    reprocess_cmd.add_argument("paths", nargs="*", help="Archivos o directorios WARC (default: WARC_DIR)")
+    reprocess_cmd.add_argument("--concurrency", type=int, default=8, help="Páginas en vuelo (IA/DB)")
+    reprocess_cmd.add_argument("--parse-workers", type=int, default=None, help="Procesos de parseo")
+    reprocess_cmd.add_argument("--no-ai", action="store_true", help="Solo extractores, sin IA")
+    reprocess_cmd.add_argument("--include-open", action="store_true",
+                               help="Incluye archivos aún abiertos (.open)")
+
+    rescore_cmd = sub.add_parser("rescore", help="Recalcula score y tier de toda la tabla")
+    rescore_cmd.add_argument("--batch-size", type=int, default=1000, help="Filas por página")
+    rescore_cmd.add_argument("--dry-run", action="store_true", help="Calcula sin escribir cambios")
+    rescore_cmd.add_argument("--weights", type=_weights, default=None,
+                             help="JSON con los pesos a sustituir (como en features)")
+
+    export_cmd = sub.add_parser("export", help="Exporta organizaciones a CSV, JSONL o Parquet")
+    export_cmd.add_argument("output", help="Archivo de salida (el formato sale de la extensión)")
+    export_cmd.add_argument("--format", choices=["csv", "jsonl", "parquet"], default=None)
+    export_cmd.add_argument("--tier", nargs="+", choices=list("ABCD"), default=[], help="Tiers a incluir")
+    export_cmd.add_argument("--min-score", type=float, default=None)
+    export_cmd.add_argument("--max-score", type=float, default=None)
+    export_cmd.add_argument("--nicho", nargs="+", default=[], help="Valores de nicho_origen")
+    export_cmd.add_argument("--columns", default=None, help="Columnas separadas por coma")
+    export_cmd.add_argument("--page-size", type=int, default=1000, help="Filas por consulta")
+    export_cmd.add_argument("--concurrency", type=int, default=4, help="Rangos de dominio leídos a la vez")
+
+    features_cmd = sub.add_parser("features", help="Scoring experimental sobre el feature store")
+    features_cmd.add_argument("--weights", type=_weights, default=None,
+                              help="JSON con los pesos a sustituir, p. ej. '{\"sector_priority\": 2}'")
+    features_cmd.add_argument("--compact", action="store_true",
+                              help="Funde los segmentos sellados (último registro por dominio)")
+    features_cmd.add_argument("--collect", nargs="+", metavar="DIR", default=None,
+                              help="Copia a FEATURE_DIR los segmentos sellados de otras máquinas")
+
+    return parser.parse_args(argv)
+
+
+def cli(argv=None) -> int:
+    """Despacha la línea de comandos. Retorna el código de salida."""
+    args = parse_args(argv)
+    try:
+        if args.check:
+            return asyncio.run(check())
+        if args.command == "replay":
+            asyncio.run(replay(args.batch_size, args.include_open))
+        elif args.command == "reprocess":
+            asyncio.run(run_reprocess(
+                args.paths, args.concurrency, args.parse_workers, not args.no_ai, args.include_open,
+            ))
+        elif args.command == "rescore":
+            asyncio.run(run_rescore(args.batch_size, args.dry_run, args.weights))
+        elif args.command == "export":
+            asyncio.run(run_export(args))
+        elif args.command == "features":
+            features(args.weights, args.compact, args.collect)
+        elif args.command == "dead-letters":
+            asyncio.run(dead_letters(args.action, args.domains, args.limit))
+        elif args.command == "recrawl-seed":
+            asyncio.run(recrawl_seed(args.batch_size))
+        else:
+            return run()
+    except ConfigError as e:
+        print(f"[FATAL] {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
 if __name__ == "__main__":
-    asyncio.run(main())
+    sys.exit(cli())
@@ -58,6 +58,11 @@ class Organizacion(BaseModel):
     titulo: Optional[str] = None
     descripcion: Optional[str] = None
     
+    # Datos estructurados declarados por la web (JSON-LD, microdata, OpenGraph)
+    nombre: Optional[str] = None
+    direccion: Optional[str] = None
+    codigo_postal: Optional[str] = None
+    
     # Contactos
     emails: List[str] = Field(default_factory=list)
     telefonos: List[str] = Field(default_factory=list)
@@ -76,8 +81,12 @@ class Organizacion(BaseModel):
     scrapeado_en: datetime = Field(default_factory=datetime.utcnow)
     
     def to_supabase_dict(self) -> dict:
-        """Convierte a diccionario para upsert en Supabase."""
-        return {
+        """Convierte a diccionario para upsert en Supabase.
+
+        ``direccion`` y ``codigo_postal`` solo se envían si tienen valor: una
+        tabla aún sin esas columnas sigue aceptando el resto de entidades.
+        """
+        data = {
             "url": str(self.url),
             "dominio": self.dominio,
             "titulo": self.titulo,
@@ -85,7 +94,7 @@ class Organizacion(BaseModel):
             "emails": self.emails,
             "telefonos": self.telefonos,
             "redes_sociales": self.redes_sociales,
-            "nombre_empresa": self.analisis.nombre_empresa if self.analisis else None,
+            "nombre_empresa": self.nombre or (self.analisis.nombre_empresa if self.analisis else None),
             "actividad": self.analisis.actividad_principal if self.analisis else None,
             "sector": self.analisis.sector if self.analisis else None,
             "tamaño": self.analisis.tamaño_estimado if self.analisis else None,
@@ -98,6 +107,11 @@ class Organizacion(BaseModel):
             "nicho_origen": self.nicho_origen,
             "scrapeado_en": self.scrapeado_en.isoformat(),
         }
+        if self.direccion:
+            data["direccion"] = self.direccion
+        if self.codigo_postal:
+            data["codigo_postal"] = self.codigo_postal
+        return data
 
 
 class TareaURL(BaseModel):
@@ -107,3 +121,4 @@ class TareaURL(BaseModel):
     prioridad: int = 1
     nivel: int = 0  # 0 = seed, 1 = descubierto
     reintentos: int = 0
+    recrawl: bool = False  # Revisita programada de un dominio ya guardado
@@ -0,0 +1,89 @@
+"""Reprocesado offline de capturas WARC: parseo, filtro, IA y guardado sin red."""
+import asyncio
+import logging
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+from src.components import Components
+from src.config import get_config
+from src.models import TareaURL
+from src.scraper import Scraper
+from src.utils.supabase_client import SupabaseClient
+from src.utils.warc import iter_responses, warc_files
+from src.worker import Worker
+
+logger = logging.getLogger(__name__)
+
+_scraper: Optional[Scraper] = None
+
+
+def _parse(html: str, url: str) -> dict:
+    """Parseo en un proceso del pool (un Scraper por proceso)."""
+    global _scraper
+    if _scraper is None:
+        _scraper = Scraper()
+    return _scraper.parse(html, url)
+
+
+def resolve_paths(paths: Iterable[str], include_open: bool = False) -> List[Path]:
+    """Expande directorios a sus archivos WARC."""
+    resolved = []
+    for raw in paths:
+        path = Path(raw)
+        resolved.extend(warc_files(path, include_open) if path.is_dir() else [path])
+    return resolved
+
+
+async def reprocess(paths: List[Path], concurrency: int = 8, parse_workers: Optional[int] = None,
+                    analyze: bool = True) -> Counter:
+    """Pasa cada portada HTML 200 archivada por el pipeline del worker (sin fetch ni descubrimiento).
+
+    El parseo (CPU) va a un pool de procesos; IA y guardado (I/O) se solapan
+    con hasta ``concurrency`` páginas en vuelo.
+    """
+    get_config()
+    # Solo parseo, IA y guardado: sin Redis ni clientes de fetch
+    components = Components(concurrency)
+    components.db = SupabaseClient()
+    worker = Worker(components)
+    worker.db = components.db
+    stats: Counter = Counter()
+    loop = asyncio.get_running_loop()
+    slots = asyncio.Semaphore(concurrency)
+    pending = set()
+
+    async def handle(record, pool):
+        try:
+            scraped = await loop.run_in_executor(pool, _parse, record.text(), record.url)
+            tarea = TareaURL(
+                url=record.url,
+                nicho=record.fields.get("X-Nicho"),
+                nivel=int(record.fields.get("X-Nivel", 1)),
+            )
+            saved = await worker.process_page(tarea, scraped, discover=False, analyze=analyze)
+            stats["saved" if saved else "discarded"] += 1
+        except Exception as e:
+            logger.warning("Error reprocesando %s: %s", record.url, e)
+            stats["error"] += 1
+        finally:
+            slots.release()
+
+    with ProcessPoolExecutor(max_workers=parse_workers) as pool:
+        for count, record in enumerate(iter_responses(paths), start=1):
+            # Las páginas internas se archivaron junto a su portada: no son entidades aparte
+            if (record.status != 200 or "html" not in record.headers.get("content-type", "html")
+                    or "X-Parent-URL" in record.fields):
+                stats["skipped"] += 1
+                continue
+            await slots.acquire()
+            task = asyncio.create_task(handle(record, pool))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+            if count % 1000 == 0:
+                logger.info("Reprocesado (%s registros): %s", count, dict(stats))
+        await asyncio.gather(*pending)
+
+    await components.close()
+    return stats
@@ -41,6 +41,23 @@ CANARIAS_KEYWORDS = [
     "canarias", "tenerife", "gran canaria", "lanzarote", "fuerteventura",
     "la palma", "la gomera", "el hierro", "santa cruz", "las palmas",
 ]
+# España peninsular
+SPAIN_KEYWORDS = ["españa", "madrid", "barcelona", "valencia", "sevilla", "bilbao"]
+
+# Sectores con algo de necesidad
+MEDIUM_PRIORITY_SECTORS = {"retail", "servicios", "manufactura", "inmobiliario"}
+
+# Multiplicador del peso de tamaño (lo no listado cuenta como desconocido)
+SIZE_MULTIPLIERS = {
+    "grande": 1.0,
+    "mediana": 0.8,
+    "pequeña": 0.5,
+    "micro": 0.3,
+    "desconocido": 0.4,
+}
+
+# Proveedores de correo gratuito (un email con ellos no es corporativo)
+FREE_EMAIL_PROVIDERS = ["gmail", "hotmail", "yahoo", "outlook"]
 
 
 class Scorer:
@@ -100,8 +117,7 @@ class Scorer:
             return WEIGHTS["ubicacion_canarias"]
         
         # España peninsular
-        spain_keywords = ["españa", "madrid", "barcelona", "valencia", "sevilla", "bilbao"]
-        if any(kw in text_lower for kw in spain_keywords):
+        if any(kw in text_lower for kw in SPAIN_KEYWORDS):
             return WEIGHTS["ubicacion_espana"]
         
         return 0.5  # Otros países (bajo interés)
@@ -115,7 +131,7 @@ class Scorer:
         emails = scraped_data.get("emails", [])
         if emails:
             has_corporate = any(
-                not any(free in e for free in ["gmail", "hotmail", "yahoo", "outlook"])
+                not any(free in e for free in FREE_EMAIL_PROVIDERS)
                 for e in emails
             )
             if has_corporate:
@@ -159,16 +175,8 @@ class Scorer:
         """Puntúa tamaño de la organización."""
         max_score = WEIGHTS["tamaño_organizacion"]
         
-        size_scores = {
-            "grande": 1.0,
-            "mediana": 0.8,
-            "pequeña": 0.5,
-            "micro": 0.3,
-            "desconocido": 0.4,
-        }
-        
         size = ai_analysis.get("tamaño_estimado", "desconocido").lower()
-        multiplier = size_scores.get(size, 0.4)
+        multiplier = SIZE_MULTIPLIERS.get(size, SIZE_MULTIPLIERS["desconocido"])
         
         return max_score * multiplier
 
@@ -182,8 +190,7 @@ class Scorer:
             return max_score
         
         # Sectores con algo de necesidad
-        medium_sectors = {"retail", "servicios", "manufactura", "inmobiliario"}
-        if sector in medium_sectors:
+        if sector in MEDIUM_PRIORITY_SECTORS:
             return max_score * 0.5
         
         return max_score * 0.2
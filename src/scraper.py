@@ -6,6 +6,9 @@ from urllib.parse import urljoin, urlparse
 
 from bs4 import BeautifulSoup
 
+from src.content_extractor import extract_main_content
+from src.structured_data import extract_structured
+
 logger = logging.getLogger(__name__)
 
 # Dominios a ignorar en el descubrimiento de URLs
@@ -20,23 +23,84 @@ DOMAIN_BLACKLIST = {
 EMAIL_PATTERN = re.compile(r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}")
 PHONE_PATTERN = re.compile(r"(?:\+56\s?)?(?:9\s?)?\d{4}[\s-]?\d{4}")
 
+# Texto máximo de un sitio al combinar la portada con sus páginas internas
+MERGED_TEXT_MAX = 10000
+
+# Dominio de red social -> clave en redes_sociales
+SOCIAL_DOMAINS = {
+    "facebook.com": "facebook",
+    "twitter.com": "twitter",
+    "x.com": "twitter",
+    "instagram.com": "instagram",
+    "linkedin.com": "linkedin",
+    "youtube.com": "youtube",
+}
+
+
+def merge_pages(primary: dict, extras: List[dict]) -> dict:
+    """Combina la portada con páginas internas del mismo sitio en un solo resultado.
+
+    La portada manda en meta y enlaces internos; contactos, redes y datos
+    estructurados se completan con las demás páginas.
+    """
+    merged = dict(primary)
+    texts = [primary["text_content"]]
+    emails = list(primary["emails"])
+    phones = list(primary["phones"])
+    social = dict(primary["social"])
+    structured = {k: (list(v) if isinstance(v, list) else v)
+                  for k, v in primary.get("structured", {}).items()}
+    external = list(primary["external_links"])
+    documents = list(primary.get("documents", []))
+
+    for page in extras:
+        texts.append(page["text_content"])
+        emails += [e for e in page["emails"] if e not in emails]
+        phones += [p for p in page["phones"] if p not in phones]
+        social = {**page["social"], **social}
+        external += [link for link in page["external_links"] if link not in external]
+        known = {d["url"] for d in documents}
+        documents += [d for d in page.get("documents", []) if d["url"] not in known]
+        for key, value in page.get("structured", {}).items():
+            if isinstance(value, list):
+                current = structured.setdefault(key, [])
+                current += [v for v in value if v not in current]
+            elif not structured.get(key):
+                structured[key] = value
+
+    merged.update({
+        "text_content": " ".join(t for t in texts if t)[:MERGED_TEXT_MAX],
+        "emails": emails,
+        "phones": phones,
+        "social": social,
+        "structured": structured,
+        "external_links": external[:20],
+        "documents": documents,
+    })
+    return merged
+
 
 class Scraper:
     """Extractor de datos de páginas web."""
 
-    def __init__(self, blacklist: Set[str] = None):
+    def __init__(self, blacklist: Set[str] = None, parser: str = "lxml"):
         self.blacklist = blacklist or DOMAIN_BLACKLIST
+        self.parser = parser
 
     def parse(self, html: str, base_url: str) -> dict:
         """Extrae datos estructurados del HTML."""
-        soup = BeautifulSoup(html, "lxml")
+        soup = BeautifulSoup(html, self.parser)
+        main = extract_main_content(soup)
         
         return {
             "meta": self._extract_meta(soup),
             "emails": self._extract_emails(soup),
             "phones": self._extract_phones(soup),
             "social": self._extract_social(soup),
-            "text_content": self._extract_text(soup),
+            "documents": self._extract_documents(soup, base_url),
+            "structured": extract_structured(soup),
+            "text_content": main.text,
+            "headings": main.headings,
             "internal_links": self._extract_internal_links(soup, base_url),
             "external_links": self._extract_external_links(soup, base_url),
         }
@@ -94,35 +158,33 @@ class Scraper:
     def _extract_social(self, soup: BeautifulSoup) -> dict:
         """Extrae links a redes sociales."""
         social = {}
-        social_domains = {
-            "facebook.com": "facebook",
-            "twitter.com": "twitter",
-            "x.com": "twitter",
-            "instagram.com": "instagram",
-            "linkedin.com": "linkedin",
-            "youtube.com": "youtube",
-        }
         
         for a in soup.find_all("a", href=True):
             href = a["href"]
-            for domain, name in social_domains.items():
+            for domain, name in SOCIAL_DOMAINS.items():
                 if domain in href and name not in social:
                     social[name] = href
                     break
         
         return social
 
-    def _extract_text(self, soup: BeautifulSoup, max_chars: int = 5000) -> str:
-        """Extrae texto limpio para análisis IA."""
-        # Remover scripts y estilos
-        for tag in soup(["script", "style", "nav", "footer", "header"]):
-            tag.decompose()
+    def _extract_documents(self, soup: BeautifulSoup, base_url: str) -> List[dict]:
+        """Extrae enlaces a PDF/DOCX (de cualquier dominio) con el texto del enlace."""
+        documents = {}
         
-        text = soup.get_text(separator=" ", strip=True)
-        # Limpiar espacios múltiples
-        text = re.sub(r"\s+", " ", text)
+        for a in soup.find_all("a", href=True):
+            absolute_url = urljoin(base_url, a["href"])
+            parsed = urlparse(absolute_url)
+            if parsed.scheme not in ("http", "https"):
+                continue
+            if parsed.path.lower().endswith((".pdf", ".docx")) and absolute_url not in documents:
+                documents[absolute_url] = a.get_text(" ", strip=True)[:200]
         
-        return text[:max_chars]
+        return [{"url": url, "text": text} for url, text in documents.items()][:20]
+
+    def _extract_text(self, soup: BeautifulSoup, max_chars: int = 5000) -> str:
+        """Extrae el contenido principal (sin menús, cookies ni widgets) para análisis IA."""
+        return extract_main_content(soup, max_chars).text
 
     def _extract_internal_links(self, soup: BeautifulSoup, base_url: str) -> List[str]:
         """Extrae links internos (mismo dominio)."""
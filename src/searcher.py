@@ -1,14 +1,13 @@
 """Buscador de Nichos: Transforma nombres de nichos en URLs para scraping."""
 import asyncio
 import logging
-import urllib.parse
 from typing import List
 
 # TODO: Reemplazar con cliente real (Google Custom Search, Serper, etc)
 # Por ahora simularemos búsqueda usando Google Search standard (con riesgo de bloqueo)
 # o simplemente generaremos URLs de prueba para validar el flujo.
 from src.config import get_config
-from src.models import TareaURL
+from src.utils.task_queue import TaskQueue
 from redis import asyncio as aioredis
 from tenacity import retry, stop_after_attempt, wait_exponential
 
@@ -23,32 +22,22 @@ class NicheSearcher:
     def __init__(self):
         self.cfg = get_config()
         self.redis = aioredis.from_url(self.cfg.REDIS_URL, encoding="utf-8", decode_responses=True)
+        self.queue = TaskQueue(self.redis)
 
     async def close(self):
         await self.redis.close()
 
     async def search_and_enqueue(self, nicho: str, limit: int = 20):
         """Busca URLs para un nicho y las encola en Redis."""
-        logger.info(f"Buscando nicho: {nicho}")
+        logger.info("Buscando nicho: %s", nicho)
         
         # 1. Obtener URLs (Simulado/Real)
         urls = await self._search_google_simulated(nicho, limit)
         
-        count = 0
-        for url in urls:
-            # 2. Filtrar duplicados (bloom filter simplificado con Redis SET)
-            if await self._is_duplicate(url):
-                continue
-                
-            # 3. Encolar
-            tarea = TareaURL(url=url, nivel=0, nicho=nicho)
-            await self.redis.rpush("scraping_queue", tarea.model_dump_json())
+        # 2. Filtrar duplicados y encolar en un solo viaje (script Lua atómico)
+        count = await self.queue.enqueue_batch(urls, nicho=nicho, nivel=0)
             
-            # Marcar como visto
-            await self._mark_seen(url)
-            count += 1
-            
-        logger.info(f"Encoladas {count} nuevas URLs para nicho '{nicho}'")
+        logger.info("Encoladas %s nuevas URLs para nicho '%s'", count, nicho)
         return count
 
     async def _search_google_simulated(self, query: str, limit: int) -> List[str]:
@@ -75,17 +64,6 @@ class NicheSearcher:
         
         return []
 
-    async def _is_duplicate(self, url: str) -> bool:
-        """Verifica si la URL ya fue procesada."""
-        # Check simple en Redis (Set de dominios vistos)
-        domain = urllib.parse.urlparse(url).netloc
-        return await self.redis.sismember("processed_domains", domain)
-
-    async def _mark_seen(self, url: str):
-        """Marca dominio como visto."""
-        domain = urllib.parse.urlparse(url).netloc
-        await self.redis.sadd("processed_domains", domain)
-
 
 # CLI para probar
 if __name__ == "__main__":
@@ -0,0 +1,253 @@
+"""Datos estructurados embebidos: JSON-LD, microdata schema.org y OpenGraph.
+
+Muchas webs ya publican nombre, dirección, teléfono y redes de la
+organización como bloques ``Organization``/``LocalBusiness``. Leerlos es más
+fiable que las regex y evita pedirle esos campos a la IA.
+"""
+import json
+import logging
+import re
+from typing import Iterator, List, Optional
+
+from bs4 import BeautifulSoup, Tag
+
+logger = logging.getLogger(__name__)
+
+# Tipos schema.org que describen a la propia entidad (y subtipos frecuentes)
+ORG_TYPES = {
+    "organization", "localbusiness", "ngo", "corporation", "governmentorganization",
+    "educationalorganization", "sportsorganization", "medicalorganization",
+    "performinggroup", "newsmediaorganization", "professionalservice", "store",
+    "library", "museum", "school", "collegeoruniversity", "place", "civicstructure",
+}
+ORG_SUFFIXES = ("organization", "business", "store", "office", "club")
+
+POSTAL_CODE_PATTERN = re.compile(r"\b(\d{5})\b")
+SPAIN = {"es", "esp", "españa", "espana", "spain"}
+CANARIAS_PROVINCES = ("35", "38")  # Las Palmas, Santa Cruz de Tenerife
+
+# Propiedades OpenGraph de negocio (og:* antiguas y business:contact_data:*)
+OG_FIELDS = {
+    "og:site_name": "name",
+    "og:street-address": "street",
+    "business:contact_data:street_address": "street",
+    "og:locality": "locality",
+    "business:contact_data:locality": "locality",
+    "og:region": "region",
+    "business:contact_data:region": "region",
+    "og:postal-code": "postal_code",
+    "business:contact_data:postal_code": "postal_code",
+    "og:country-name": "country",
+    "business:contact_data:country_name": "country",
+    "og:phone_number": "telephone",
+    "business:contact_data:phone_number": "telephone",
+    "og:email": "email",
+    "business:contact_data:email": "email",
+}
+
+
+def is_canarias_postal_code(code: str) -> bool:
+    """Código postal de las provincias canarias (35xxx / 38xxx)."""
+    return len(code) == 5 and code.isdigit() and code.startswith(CANARIAS_PROVINCES)
+
+
+def _types(node: dict) -> List[str]:
+    raw = node.get("@type") or node.get("type") or []
+    if isinstance(raw, str):
+        raw = [raw]
+    # "http://schema.org/LocalBusiness" -> "localbusiness"
+    return [str(t).rstrip("/").rsplit("/", 1)[-1].lower() for t in raw]
+
+
+def _is_org(types: List[str]) -> bool:
+    return any(t in ORG_TYPES or t.endswith(ORG_SUFFIXES) for t in types)
+
+
+def _text(value) -> Optional[str]:
+    """Primer valor textual de una propiedad (cadena, lista o nodo con nombre)."""
+    if isinstance(value, list):
+        value = next((v for v in value if v), None)
+    if isinstance(value, dict):
+        value = value.get("name") or value.get("@value")
+    if value is None:
+        return None
+    value = re.sub(r"\s+", " ", str(value)).strip()
+    return value or None
+
+
+def _as_list(value) -> list:
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def _add_unique(values: list, value: Optional[str]):
+    if value and value not in values:
+        values.append(value)
+
+
+def _walk_jsonld(data) -> Iterator[dict]:
+    """Todos los nodos de un documento JSON-LD (listas, @graph y anidados)."""
+    if isinstance(data, list):
+        for item in data:
+            yield from _walk_jsonld(item)
+    elif isinstance(data, dict):
+        yield data
+        for key, value in data.items():
+            if key in ("@graph", "publisher", "author", "provider", "organizer",
+                       "mainEntity", "about", "parentOrganization", "location"):
+                yield from _walk_jsonld(value)
+
+
+def _jsonld_nodes(soup: BeautifulSoup) -> Iterator[dict]:
+    for script in soup.find_all("script", type=re.compile(r"application/ld\+json", re.I)):
+        raw = script.string or script.get_text()
+        if not raw or not raw.strip():
+            continue
+        try:
+            data = json.loads(raw.strip(), strict=False)
+        except ValueError as e:
+            logger.debug("JSON-LD inválido: %s", e)
+            continue
+        yield from _walk_jsonld(data)
+
+
+def _microdata_value(el: Tag):
+    if el.has_attr("itemscope"):
+        return _microdata_item(el)
+    if el.name == "meta":
+        return el.get("content")
+    if el.name in ("a", "link", "area"):
+        return el.get("href")
+    if el.name in ("img", "audio", "video", "source", "iframe", "embed"):
+        return el.get("src")
+    if el.name in ("time", "data", "meter"):
+        return el.get("datetime") or el.get("value") or el.get_text(" ", strip=True)
+    return el.get_text(" ", strip=True)
+
+
+def _microdata_item(scope: Tag) -> dict:
+    """Propiedades de un itemscope sin entrar en los itemscope anidados."""
+    item = {"@type": scope.get("itemtype", "").split()}
+    stack = list(scope.find_all(True, recursive=False))
+    while stack:
+        el = stack.pop(0)
+        if el.has_attr("itemprop"):
+            value = _microdata_value(el)
+            for prop in el["itemprop"].split():
+                item.setdefault(prop, []).append(value)
+            if el.has_attr("itemscope"):
+                continue
+        elif el.has_attr("itemscope"):
+            continue  # Item independiente; se recorre por separado
+        stack.extend(el.find_all(True, recursive=False))
+    return {k: (v[0] if isinstance(v, list) and len(v) == 1 else v) for k, v in item.items()}
+
+
+def _microdata_nodes(soup: BeautifulSoup) -> Iterator[dict]:
+    for scope in soup.find_all(attrs={"itemscope": True}):
+        if scope.has_attr("itemprop"):
+            continue  # Propiedad de otro item: ya está dentro de su padre
+        yield from _walk_jsonld(_microdata_item(scope))
+
+
+def _opengraph(soup: BeautifulSoup) -> dict:
+    found = {}
+    for tag in soup.find_all("meta", attrs={"property": True, "content": True}):
+        field = OG_FIELDS.get(tag["property"].strip().lower())
+        if field and field not in found and tag["content"].strip():
+            found[field] = tag["content"].strip()
+    return found
+
+
+class StructuredData:
+    """Acumula los datos de la entidad de todas las fuentes (la primera gana en escalares)."""
+
+    def __init__(self):
+        self.types: List[str] = []
+        self.name: Optional[str] = None
+        self.legal_name: Optional[str] = None
+        self.description: Optional[str] = None
+        self.address: dict = {}
+        self.postal_codes: List[str] = []
+        self.telephones: List[str] = []
+        self.emails: List[str] = []
+        self.same_as: List[str] = []
+
+    def add_node(self, node: dict):
+        types = _types(node)
+        self.types.extend(t for t in types if t not in self.types)
+        self.name = self.name or _text(node.get("name"))
+        self.legal_name = self.legal_name or _text(node.get("legalName"))
+        self.description = self.description or _text(node.get("description"))
+        for phone in _as_list(node.get("telephone")):
+            _add_unique(self.telephones, _text(phone))
+        for email in _as_list(node.get("email")):
+            email = _text(email)
+            _add_unique(self.emails, email[7:] if email and email.startswith("mailto:") else email)
+        for url in _as_list(node.get("sameAs")):
+            _add_unique(self.same_as, _text(url))
+        for address in _as_list(node.get("address")):
+            if isinstance(address, dict):
+                self.add_address(
+                    street=_text(address.get("streetAddress")),
+                    locality=_text(address.get("addressLocality")),
+                    region=_text(address.get("addressRegion")),
+                    postal_code=_text(address.get("postalCode")),
+                    country=_text(address.get("addressCountry")),
+                )
+            elif _text(address):
+                self.add_address(street=_text(address))
+
+    def add_address(self, street=None, locality=None, region=None, postal_code=None, country=None):
+        if country and country.lower() not in SPAIN:
+            return  # Un 35xxx fuera de España no dice nada de Canarias
+        codes = POSTAL_CODE_PATTERN.findall(postal_code or "") or POSTAL_CODE_PATTERN.findall(street or "")
+        for code in codes:
+            _add_unique(self.postal_codes, code)
+        if not self.address:
+            fields = {
+                "street": street, "locality": locality, "region": region,
+                "postal_code": codes[0] if codes else None, "country": country,
+            }
+            self.address = {k: v for k, v in fields.items() if v}
+
+    def to_dict(self) -> dict:
+        return {
+            "types": self.types,
+            "name": self.name,
+            "legal_name": self.legal_name,
+            "description": self.description,
+            "address": self.address,
+            "postal_codes": self.postal_codes,
+            "telephones": self.telephones,
+            "emails": self.emails,
+            "same_as": self.same_as,
+        }
+
+
+def extract_structured(soup: BeautifulSoup) -> dict:
+    """Datos de la organización desde JSON-LD, microdata y OpenGraph.
+
+    Solo se consideran los nodos de tipo organización/negocio/lugar, así el
+    ``name`` de un ``WebPage`` o un ``BreadcrumbList`` no se confunde con el
+    de la entidad. Debe llamarse antes de eliminar los ``<script>`` del árbol.
+    """
+    data = StructuredData()
+    for node in _jsonld_nodes(soup):
+        if _is_org(_types(node)):
+            data.add_node(node)
+    for node in _microdata_nodes(soup):
+        if _is_org(_types(node)):
+            data.add_node(node)
+
+    og = _opengraph(soup)
+    if og:
+        data.name = data.name or og.get("name")
+        data.add_address(
+            street=og.get("street"), locality=og.get("locality"), region=og.get("region"),
+            postal_code=og.get("postal_code"), country=og.get("country"),
+        )
+        _add_unique(data.telephones, og.get("telephone"))
+        _add_unique(data.emails, og.get("email"))
+    return data.to_dict()
@@ -0,0 +1,171 @@
+"""Supervisor multi-proceso: un event loop y un pool de workers por núcleo."""
+import asyncio
+import logging
+import multiprocessing as mp
+import os
+import queue
+import signal
+import time
+from typing import Dict, List, Optional
+
+from src.config import get_config
+
+logger = logging.getLogger(__name__)
+
+# Espera máxima para que un hijo termine su tarea en curso tras SIGTERM
+DRAIN_TIMEOUT = 90.0
+STATS_INTERVAL = 30.0
+MAX_RESTART_DELAY = 60.0
+# Un hijo que aguantó este tiempo vivo vuelve a empezar el backoff desde cero
+STABLE_UPTIME = 300.0
+
+
+def _child_main(index: int, num_workers: int, stats_queue) -> None:
+    """Punto de entrada de cada proceso hijo."""
+    # Cada hijo expone sus propias métricas en METRICS_PORT + índice
+    cfg = get_config()
+    if cfg.METRICS_PORT:
+        cfg.METRICS_PORT += index
+
+    from src.main import run_workers
+
+    def report(stats: dict):
+        stats_queue.put({"index": index, "pid": os.getpid(), **stats})
+
+    asyncio.run(run_workers(num_workers, on_stats=report, stats_interval=STATS_INTERVAL))
+
+
+class _Child:
+    """Estado de un proceso hijo y su política de reinicio."""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.process: Optional[mp.Process] = None
+        self.restarts = 0
+        self.restart_at = 0.0
+        self.started_at: Optional[float] = None
+
+
+class Supervisor:
+    """Lanza K procesos hijos, los reinicia si caen y agrega sus estadísticas.
+
+    Todos los hijos comparten las colas Redis; el padre no procesa tareas.
+    """
+
+    def __init__(self, processes: int, workers_per_process: int):
+        self.processes = processes
+        self.workers_per_process = workers_per_process
+        # spawn: cada hijo arranca limpio (sin loops ni sockets heredados) y funciona igual en Windows
+        self._ctx = mp.get_context("spawn")
+        self._stats_queue = self._ctx.Queue()
+        self._children: List[_Child] = [_Child(i) for i in range(processes)]
+        self._stats: Dict[int, dict] = {}
+        self._stopping = False
+        self._last_summary = time.monotonic()
+
+    def run(self) -> int:
+        """Bloquea hasta que todos los hijos terminan. Retorna el código de salida."""
+        signal.signal(signal.SIGTERM, self._handle_shutdown)
+        signal.signal(signal.SIGINT, self._handle_shutdown)
+
+        logger.info(
+            "Supervisor: %s procesos x %s workers", self.processes, self.workers_per_process
+        )
+        for child in self._children:
+            self._spawn(child)
+
+        while not self._stopping:
+            self._drain_stats()
+            self._check_children()
+            if time.monotonic() - self._last_summary >= STATS_INTERVAL:
+                self._log_summary()
+            time.sleep(0.5)
+
+        self._shutdown_children()
+        self._drain_stats()
+        self._log_summary()
+        return 0
+
+    def aggregate(self) -> dict:
+        """Suma las últimas estadísticas de cada proceso (incluidos los ya reiniciados)."""
+        total = {"processed": 0, "errors": 0, "tokens": 0}
+        for stats in self._stats.values():
+            for key in total:
+                total[key] += stats.get(key, 0)
+        return total
+
+    def _spawn(self, child: _Child):
+        child.process = self._ctx.Process(
+            target=_child_main,
+            args=(child.index, self.workers_per_process, self._stats_queue),
+            name=f"scraper-{child.index}",
+        )
+        child.process.start()
+        child.started_at = time.monotonic()
+        logger.info("Proceso hijo %s iniciado (pid %s)", child.index, child.process.pid)
+
+    def _check_children(self):
+        now = time.monotonic()
+        for child in self._children:
+            proc = child.process
+            if proc is None or proc.is_alive():
+                if proc is None and now >= child.restart_at:
+                    self._spawn(child)
+                continue
+
+            proc.join()
+            if proc.exitcode == 0:
+                logger.info("Proceso hijo %s terminó limpiamente", child.index)
+                child.process = None
+                child.restart_at = float("inf")
+                continue
+
+            # Backoff exponencial para no entrar en un bucle de caídas; una caída
+            # aislada tras horas estable no hereda el retraso de las anteriores
+            if child.started_at is not None and now - child.started_at >= STABLE_UPTIME:
+                child.restarts = 0
+            delay = min(2 ** child.restarts, MAX_RESTART_DELAY)
+            child.restarts += 1
+            child.restart_at = now + delay
+            child.process = None
+            logger.error(
+                "Proceso hijo %s cayó (exitcode %s); reinicio en %.0fs", child.index, proc.exitcode, delay,
+            )
+
+        if all(c.process is None and c.restart_at == float("inf") for c in self._children):
+            self._stopping = True
+
+    def _drain_stats(self):
+        while True:
+            try:
+                stats = self._stats_queue.get_nowait()
+            except queue.Empty:
+                return
+            self._stats[stats["pid"]] = stats
+
+    def _log_summary(self):
+        self._last_summary = time.monotonic()
+        total = self.aggregate()
+        alive = sum(1 for c in self._children if c.process and c.process.is_alive())
+        logger.info(
+            "Supervisor: %s/%s procesos vivos | Procesados: %s | Errores: %s | Tokens: %s",
+            alive, self.processes, total["processed"], total["errors"], total["tokens"],
+        )
+
+    def _handle_shutdown(self, signum, frame):
+        if not self._stopping:
+            logger.info("Supervisor: reenviando señal de apagado a los hijos...")
+        self._stopping = True
+
+    def _shutdown_children(self):
+        alive = [c.process for c in self._children if c.process and c.process.is_alive()]
+        for proc in alive:
+            proc.terminate()  # SIGTERM: el hijo termina su tarea en curso y sale
+
+        deadline = time.monotonic() + DRAIN_TIMEOUT
+        for proc in alive:
+            proc.join(max(0.0, deadline - time.monotonic()))
+            if proc.is_alive():
+                logger.warning("Proceso %s no terminó a tiempo; forzando cierre", proc.pid)
+                proc.kill()
+                proc.join()
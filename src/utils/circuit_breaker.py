@@ -0,0 +1,107 @@
+"""Circuit breaker por host compartido en Redis (caché negativa de dominios)."""
+import logging
+from typing import Dict, Optional, Tuple
+
+import aiohttp
+import redis.asyncio as redis
+from python_socks import ProxyConnectionError, ProxyError, ProxyTimeoutError
+
+logger = logging.getLogger(__name__)
+
+FAILURES_PREFIX = "circuit:failures:"  # HASH count/clase, TTL = ventana de fallos
+OPEN_PREFIX = "circuit:open:"          # STRING clase, TTL = tiempo abierto
+
+# Clase de fallo -> (fallos consecutivos para abrir, segundos abierto)
+CLASS_POLICY: Dict[str, Tuple[int, int]] = {
+    "dns": (2, 24 * 3600),
+    "tls": (2, 24 * 3600),
+    "refused": (3, 6 * 3600),
+    "blocked": (3, 6 * 3600),
+    "connect": (3, 3600),
+    "connect_timeout": (3, 3600),
+    "timeout": (3, 3600),
+    "server_error": (5, 1800),
+}
+
+# Ni la resolución ni el TLS se arreglan en horas: sus tareas van a dead letters (reencolables a mano)
+TERMINAL_CLASSES = frozenset({"dns", "tls"})
+
+# Códigos de respuesta SOCKS5 que Tor devuelve según el fallo en el nodo de salida
+_SOCKS_CLASSES = {4: "dns", 5: "refused", 6: "connect_timeout"}
+
+# aiohttp < 3.10 no distingue el timeout de conexión: cae en "timeout" (misma política)
+_CONNECT_TIMEOUT = getattr(aiohttp, "ConnectionTimeoutError", ())
+
+
+def classify_failure(exc: BaseException) -> Optional[str]:
+    """Clase de fallo atribuible al host, o None si no dice nada de él (404, Tor local caído)."""
+    if isinstance(exc, (ProxyConnectionError, ProxyTimeoutError)):
+        return None  # No se pudo hablar con el propio proxy Tor
+    if isinstance(exc, ProxyError):
+        return _SOCKS_CLASSES.get(exc.error_code, "connect")
+    if isinstance(exc, aiohttp.ClientResponseError):
+        if exc.status in (403, 429):
+            return "blocked"
+        return "server_error" if exc.status >= 500 else None
+    if isinstance(exc, aiohttp.ClientSSLError):
+        return "tls"
+    if isinstance(exc, _CONNECT_TIMEOUT):
+        return "connect_timeout"
+    if isinstance(exc, TimeoutError):
+        return "timeout"
+    if isinstance(exc, aiohttp.ClientConnectorError):
+        return "connect"
+    return None
+
+
+class HostCircuitBreaker:
+    """Abre el circuito de un host tras N fallos consecutivos, para todas las máquinas.
+
+    Mientras está abierto las tareas del host se aplazan al instante sin red.
+    Al expirar el TTL el siguiente intento actúa de sonda: un éxito reinicia
+    el contador y un fallo del mismo tipo lo vuelve a abrir.
+    """
+
+    def __init__(self, redis_client: redis.Redis, failure_window: int = 3600):
+        self.redis = redis_client
+        self.failure_window = failure_window
+
+    async def is_open(self, host: str) -> Optional[str]:
+        """Clase del fallo que abrió el circuito, o None si está cerrado."""
+        reason = await self.redis.get(OPEN_PREFIX + host)
+        if reason is None:
+            return None
+        return reason.decode() if isinstance(reason, bytes) else reason
+
+    async def reopens_in(self, host: str) -> float:
+        """Segundos hasta que el circuito del host deje pasar la siguiente sonda."""
+        ttl = await self.redis.ttl(OPEN_PREFIX + host)
+        return float(max(ttl, 1))
+
+    async def record_failure(self, host: str, exc: BaseException) -> Optional[str]:
+        """Cuenta el fallo. Retorna la clase si con él se abre el circuito."""
+        failure_class = classify_failure(exc)
+        if failure_class is None:
+            return None
+
+        key = FAILURES_PREFIX + host
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hincrby(key, "count", 1)
+            pipe.hset(key, "class", failure_class)
+            pipe.expire(key, self.failure_window)
+            count, _, _ = await pipe.execute()
+
+        threshold, open_seconds = CLASS_POLICY[failure_class]
+        if count < threshold:
+            return None
+
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.set(OPEN_PREFIX + host, failure_class, ex=open_seconds)
+            pipe.delete(key)
+            await pipe.execute()
+        logger.info("Circuito abierto para %s (%s, %ss)", host, failure_class, open_seconds)
+        return failure_class
+
+    async def record_success(self, host: str):
+        """Un éxito reinicia los fallos consecutivos."""
+        await self.redis.delete(FAILURES_PREFIX + host)
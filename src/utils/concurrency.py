@@ -0,0 +1,182 @@
+"""Control adaptativo de concurrencia (AIMD) para las etapas de fetch e IA."""
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import Callable, Optional
+
+from src.config import get_config
+from src.utils.metrics import CONCURRENCY_INFLIGHT, CONCURRENCY_LIMIT
+
+logger = logging.getLogger(__name__)
+
+
+class AdaptiveLimiter:
+    """Limita los slots activos de una etapa y ajusta el límite según lo observado.
+
+    - Aumento aditivo: +1 slot por cada ``limit`` éxitos con la etapa saturada.
+    - Reducción multiplicativa (``limit * backoff``) ante un error de sobrecarga
+      (429, 5xx, timeout) o, si ``tolerance`` no es None, cuando la latencia
+      suavizada supera ``tolerance`` veces la latencia base (mínimo observado,
+      con decaimiento lento). La latencia solo sirve de señal con un único
+      destino (el proveedor de IA); en fetch cada sitio tiene la suya y el
+      mínimo global haría ver congestión permanente.
+    - Como mucho una reducción por ventana (``cooldown`` o la latencia reciente),
+      para que una ráfaga de errores de un mismo episodio no hunda el límite.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        floor: int,
+        ceiling: int,
+        initial: Optional[int] = None,
+        backoff: float = 0.7,
+        tolerance: Optional[float] = 2.0,
+        smoothing: float = 0.2,
+        cooldown: float = 1.0,
+        is_overload: Callable[[BaseException], bool] = lambda exc: True,
+    ):
+        self.name = name
+        self.floor = max(1, floor)
+        self.ceiling = max(self.floor, ceiling)
+        self.limit = float(min(max(initial or self.floor, self.floor), self.ceiling))
+        self.backoff = backoff
+        self.tolerance = tolerance
+        self.smoothing = smoothing
+        self.cooldown = cooldown
+        self.is_overload = is_overload
+
+        self.inflight = 0
+        self.latency_ewma: Optional[float] = None
+        self.latency_base: Optional[float] = None
+        self._last_decrease = 0.0
+        self._waiters: deque = deque()
+        self._publish()
+
+    @asynccontextmanager
+    async def slot(self, record: bool = True):
+        """Ocupa un slot durante el bloque; excepciones de sobrecarga reducen el límite.
+
+        Con ``record=False`` el bloque solo ocupa capacidad y no alimenta el
+        control: para operaciones compuestas (descubrimiento, documentos) cuya
+        duración no es la de una petición.
+        """
+        saturated = await self.acquire()
+        start = time.monotonic()
+        try:
+            yield
+        except BaseException as e:
+            overload = not isinstance(e, asyncio.CancelledError) and self.is_overload(e)
+            self.release(time.monotonic() - start, ok=not overload, saturated=saturated, record=record)
+            raise
+        self.release(time.monotonic() - start, ok=True, saturated=saturated, record=record)
+
+    async def acquire(self) -> bool:
+        """Espera un slot libre. Retorna True si la etapa quedó saturada al entrar."""
+        while self.inflight >= int(self.limit):
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                self._wake()
+                raise
+        self.inflight += 1
+        CONCURRENCY_INFLIGHT.set(self.inflight, stage=self.name)
+        return self.inflight >= int(self.limit)
+
+    def release(self, latency: float, ok: bool = True, saturated: bool = True, record: bool = True):
+        """Libera el slot y alimenta el control con la muestra."""
+        self.inflight -= 1
+        CONCURRENCY_INFLIGHT.set(self.inflight, stage=self.name)
+        if record:
+            self.record(latency, ok, saturated)
+        self._wake()
+
+    def record(self, latency: float, ok: bool = True, saturated: bool = True):
+        """Aplica AIMD a una muestra de latencia y resultado."""
+        if ok:
+            self._observe_latency(latency)
+            congested = (self.tolerance is not None
+                         and self.latency_ewma > self.latency_base * self.tolerance)
+        else:
+            congested = True
+
+        if congested:
+            self._decrease()
+        elif saturated and self.limit < self.ceiling:
+            # Aditivo: +1 slot tras una "ventana" completa de éxitos
+            self.limit = min(self.ceiling, self.limit + 1 / self.limit)
+            self._publish()
+
+    def _observe_latency(self, latency: float):
+        if self.latency_ewma is None:
+            self.latency_ewma = self.latency_base = latency
+            return
+        self.latency_ewma += self.smoothing * (latency - self.latency_ewma)
+        # La base sube muy despacio: si la ruta cambia (nuevo circuito Tor) se re-aprende
+        self.latency_base = min(latency, self.latency_base * 1.01)
+
+    def _decrease(self):
+        now = time.monotonic()
+        window = max(self.cooldown, self.latency_ewma or 0.0)
+        if now - self._last_decrease < window:
+            return
+        self._last_decrease = now
+        previous = int(self.limit)
+        self.limit = max(float(self.floor), self.limit * self.backoff)
+        if int(self.limit) != previous:
+            logger.info("Concurrencia %s: %s -> %s slots", self.name, previous, int(self.limit))
+        self._publish()
+
+    def _wake(self):
+        free = int(self.limit) - self.inflight
+        while free > 0 and self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
+
+    def _publish(self):
+        CONCURRENCY_LIMIT.set(int(self.limit), stage=self.name)
+
+
+def _ai_overload(exc: BaseException) -> bool:
+    """Solo 429, 5xx, timeouts y errores de conexión indican saturación del proveedor."""
+    from openai import APIConnectionError  # Ya cargado: la excepción viene del propio SDK
+
+    status = getattr(exc, "status_code", None)
+    if status is not None:
+        return status == 429 or status >= 500
+    return isinstance(exc, (APIConnectionError, TimeoutError, ConnectionError))
+
+
+def _fetch_overload(exc: BaseException) -> bool:
+    """Solo 429, 5xx y timeouts: un 4xx o un host caído son problemas del sitio, no de capacidad."""
+    status = getattr(exc, "status", None)
+    if isinstance(status, int):
+        return status == 429 or status >= 500
+    return isinstance(exc, TimeoutError)
+
+
+@lru_cache(maxsize=None)
+def get_limiter(stage: str) -> AdaptiveLimiter:
+    """Limitador compartido por todos los workers del proceso para la etapa dada."""
+    cfg = get_config()
+    if stage == "fetch":
+        return AdaptiveLimiter(
+            "fetch", cfg.FETCH_CONCURRENCY_MIN, cfg.FETCH_CONCURRENCY_MAX,
+            initial=cfg.FETCH_CONCURRENCY_MAX // 2, is_overload=_fetch_overload,
+            tolerance=None,  # Solo 429/5xx/timeouts: la latencia varía por sitio, no por carga
+        )
+    if stage == "ai":
+        return AdaptiveLimiter(
+            "ai", cfg.AI_CONCURRENCY_MIN, cfg.AI_CONCURRENCY_MAX,
+            initial=cfg.AI_CONCURRENCY_MAX // 2, is_overload=_ai_overload,
+        )
+    raise ValueError(f"Etapa sin limitador: {stage}")
@@ -0,0 +1,270 @@
+"""Descubrimiento de páginas internas vía robots.txt y sitemaps, con caché en Redis.
+
+En lugar de seguir a ciegas los enlaces de la portada, se leen los sitemaps
+declarados en ``robots.txt`` (o ``/sitemap.xml``), incluidos índices y
+sitemaps ``.xml.gz``, con un parser XML incremental y acotado. Las URLs se
+ordenan por palabras clave de la ruta (transparencia, memoria, quiénes
+somos...) y frescura, y la lista resultante se cachea por dominio.
+"""
+import json
+import logging
+import re
+import time
+import unicodedata
+import zlib
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import unquote, urljoin, urlparse
+from urllib.robotparser import RobotFileParser
+from xml.etree.ElementTree import ParseError, XMLPullParser
+
+import redis.asyncio as redis
+
+from src.utils.task_queue import canonical_domain
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = "discovery:"     # STRING JSON con las URLs ordenadas por dominio
+EMPTY_CACHE_TTL = 24 * 3600     # Sin sitemap ni enlaces útiles: volver a mirar en un día
+
+# Límites del protocolo sitemaps.org por archivo, y de trabajo por dominio
+MAX_SITEMAP_BYTES = 50 * 1024 * 1024
+MAX_SITEMAP_URLS = 50_000
+MAX_SITEMAPS = 3
+CHUNK_SIZE = 64 * 1024
+
+# Peso por palabra clave en la ruta (sin tildes, minúsculas)
+PATH_KEYWORDS = {
+    "transparencia": 10, "memoria": 8, "quienes-somos": 7, "quienes": 6, "sobre-nosotros": 6,
+    "nosotros": 5, "junta-directiva": 6, "organigrama": 6, "estatutos": 6, "aviso-legal": 5,
+    "contacto": 5, "equipo": 4, "historia": 3, "mision": 3, "socios": 3, "about": 4,
+    "contact": 4, "legal": 3,
+}
+# Secciones que casi nunca describen a la entidad
+PATH_PENALTIES = {
+    "blog": 4, "noticia": 4, "noticias": 4, "news": 4, "tag": 5, "etiqueta": 5,
+    "categoria": 4, "category": 4, "author": 5, "autor": 5, "page": 2, "wp-content": 8,
+    "producto": 3, "product": 3, "evento": 2, "events": 2,
+}
+# Sitemaps hijos de un índice que conviene leer primero (WordPress, Yoast...)
+SITEMAP_HINTS = {"page": 3, "pagina": 3, "paginas": 3, "post": -2, "product": -3, "tag": -4, "category": -4}
+
+_TOKEN_SPLIT = re.compile(r"[/\-_.]+")
+
+
+@dataclass
+class SitemapEntry:
+    """Entrada de un sitemap: URL de página (``url``) o de otro sitemap (``sitemap``)."""
+    kind: str
+    loc: str
+    lastmod: Optional[float] = None
+
+
+def _normalize_path(url: str) -> str:
+    path = unquote(urlparse(url).path).lower()
+    # "quiénes-somos" -> "quienes-somos"
+    return unicodedata.normalize("NFKD", path).encode("ascii", "ignore").decode()
+
+
+def _parse_lastmod(value: str) -> Optional[float]:
+    value = value.strip()
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _chunks(data: bytes) -> Iterator[bytes]:
+    """Trozos del XML, descomprimiendo gzip al vuelo y con tope de tamaño."""
+    if data[:2] == b"\x1f\x8b":
+        inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        produced = 0
+        for start in range(0, len(data), CHUNK_SIZE):
+            chunk = inflater.decompress(data[start:start + CHUNK_SIZE], MAX_SITEMAP_BYTES - produced)
+            produced += len(chunk)
+            yield chunk
+            if produced >= MAX_SITEMAP_BYTES:
+                logger.warning("Sitemap gzip por encima del límite, truncado")
+                return
+        return
+    for start in range(0, min(len(data), MAX_SITEMAP_BYTES), CHUNK_SIZE):
+        yield data[start:start + CHUNK_SIZE]
+
+
+def iter_sitemap(data: bytes) -> Iterator[SitemapEntry]:
+    """Entradas de un ``urlset`` o ``sitemapindex`` sin construir el árbol completo.
+
+    Cada ``<url>``/``<sitemap>`` se libera en cuanto se emite. Un XML roto
+    corta la lectura pero conserva lo ya leído.
+    """
+    parser = XMLPullParser(events=("end",))
+    count = 0
+    try:
+        for chunk in _chunks(data):
+            parser.feed(chunk)
+            for _, elem in parser.read_events():
+                kind = _local(elem.tag)
+                if kind not in ("url", "sitemap"):
+                    continue
+                loc = lastmod = None
+                for child in elem:
+                    name = _local(child.tag)
+                    if name == "loc":
+                        loc = (child.text or "").strip()
+                    elif name == "lastmod":
+                        lastmod = _parse_lastmod(child.text or "")
+                elem.clear()
+                if loc:
+                    yield SitemapEntry("url" if kind == "url" else "sitemap", loc, lastmod)
+                    count += 1
+                    if count >= MAX_SITEMAP_URLS:
+                        return
+        parser.close()
+    except (ParseError, zlib.error) as e:
+        logger.debug("Sitemap ilegible tras %s entradas: %s", count, e)
+
+
+def parse_robots(text: str, base_url: str) -> Tuple[RobotFileParser, List[str]]:
+    """Reglas de robots.txt y sitemaps declarados (o ``/sitemap.xml`` si no hay)."""
+    robots = RobotFileParser()
+    robots.parse(text.splitlines())
+    sitemaps = robots.site_maps() or [urljoin(base_url, "/sitemap.xml")]
+    return robots, sitemaps
+
+
+def score_url(url: str, lastmod: Optional[float] = None, now: Optional[float] = None) -> float:
+    """Relevancia de una página para conocer a la entidad (ruta, profundidad y frescura)."""
+    path = _normalize_path(url)
+    tokens = [t for t in _TOKEN_SPLIT.split(path) if t]
+    score = 0.0
+    for keyword, weight in PATH_KEYWORDS.items():
+        if keyword in path:
+            score = max(score, weight)
+    score -= sum(weight for token, weight in PATH_PENALTIES.items() if token in tokens)
+    score -= 0.5 * path.strip("/").count("/")
+    if any(token.isdigit() and len(token) == 4 for token in tokens):
+        score -= 2  # /2019/05/... fechas de blog
+    if lastmod:
+        age_days = ((now or time.time()) - lastmod) / 86400
+        score += 1.0 if age_days < 365 else (0.5 if age_days < 3 * 365 else 0.0)
+    return score
+
+
+def rank_urls(entries: Iterable[Tuple[str, Optional[float]]], host: str, limit: int = 20) -> List[str]:
+    """URLs del mismo host con puntuación positiva, de más a menos relevante."""
+    now = time.time()
+    best = {}
+    for url, lastmod in entries:
+        if canonical_domain(url) != host or _normalize_path(url).strip("/") == "":
+            continue
+        if url.lower().endswith((".jpg", ".jpeg", ".png", ".gif", ".webp", ".svg", ".zip")):
+            continue
+        score = score_url(url, lastmod, now)
+        if score > 0 and score > best.get(url, float("-inf")):
+            best[url] = score
+    return sorted(best, key=lambda u: (-best[u], len(u)))[:limit]
+
+
+class SiteDiscovery:
+    """Páginas internas relevantes de un sitio: robots.txt, sitemaps y caché compartida.
+
+    ``client`` es cualquier cliente con ``get`` y ``get_bytes`` (TorClient o
+    EgressRouter). Si el sitio no publica sitemap se ordenan los enlaces
+    internos de la portada con el mismo criterio.
+    """
+
+    def __init__(self, client, redis_client: Optional[redis.Redis] = None,
+                 cache_ttl: int = 7 * 24 * 3600, max_sitemaps: int = MAX_SITEMAPS):
+        self.client = client
+        self.redis = redis_client
+        self.cache_ttl = cache_ttl
+        self.max_sitemaps = max_sitemaps
+
+    async def discover(self, base_url: str, fallback_links: Iterable[str] = ()) -> List[str]:
+        """URLs internas ordenadas por relevancia (cacheadas por dominio)."""
+        host = canonical_domain(base_url)
+        if not host:
+            return []
+        cached = await self._cached(host)
+        if cached is not None:
+            return cached
+
+        robots, sitemaps = await self._robots(base_url)
+        entries = await self._sitemap_entries(sitemaps, host)
+        if not entries:
+            entries = [(link, None) for link in fallback_links]
+        ranked = [url for url in rank_urls(entries, host) if robots.can_fetch("*", url)]
+
+        await self._store(host, ranked)
+        logger.debug("Descubrimiento %s: %s URLs, %s relevantes", host, len(entries), len(ranked))
+        return ranked
+
+    async def _robots(self, base_url: str) -> Tuple[RobotFileParser, List[str]]:
+        try:
+            text = await self.client.get(urljoin(base_url, "/robots.txt"))
+        except Exception as e:
+            logger.debug("Sin robots.txt en %s: %s", base_url, e)
+            text = ""
+        if "<html" in text[:500].lower():
+            text = ""  # Página de error servida con 200
+        return parse_robots(text, base_url)
+
+    async def _sitemap_entries(self, sitemaps: List[str], host: str) -> List[Tuple[str, Optional[float]]]:
+        pending = list(sitemaps)
+        visited = set()
+        entries = []
+        while pending and len(visited) < self.max_sitemaps:
+            sitemap_url = pending.pop(0)
+            if sitemap_url in visited:
+                continue
+            visited.add(sitemap_url)
+            try:
+                data = await self.client.get_bytes(sitemap_url, max_bytes=MAX_SITEMAP_BYTES)
+            except Exception as e:
+                logger.debug("Sitemap no disponible %s: %s", sitemap_url, e)
+                continue
+
+            children = []
+            for entry in iter_sitemap(data):
+                if entry.kind == "sitemap":
+                    children.append(entry)
+                elif len(entries) < MAX_SITEMAP_URLS:
+                    entries.append((entry.loc, entry.lastmod))
+            # Índice: primero los sitemaps de páginas, luego los más recientes
+            children.sort(key=lambda e: (-self._sitemap_hint(e.loc), -(e.lastmod or 0)))
+            pending.extend(e.loc for e in children if canonical_domain(e.loc) == host)
+        return entries
+
+    @staticmethod
+    def _sitemap_hint(url: str) -> int:
+        tokens = _TOKEN_SPLIT.split(_normalize_path(url))
+        return sum(weight for hint, weight in SITEMAP_HINTS.items() if hint in tokens)
+
+    async def _cached(self, host: str) -> Optional[List[str]]:
+        if self.redis is None:
+            return None
+        try:
+            raw = await self.redis.get(CACHE_PREFIX + host)
+        except Exception as e:
+            logger.debug("Error leyendo caché de descubrimiento de %s: %s", host, e)
+            return None
+        return json.loads(raw) if raw else None
+
+    async def _store(self, host: str, urls: List[str]):
+        if self.redis is None:
+            return
+        try:
+            ttl = self.cache_ttl if urls else min(self.cache_ttl, EMPTY_CACHE_TTL)
+            await self.redis.set(CACHE_PREFIX + host, json.dumps(urls), ex=ttl)
+        except Exception as e:
+            logger.debug("Error guardando caché de descubrimiento de %s: %s", host, e)
@@ -0,0 +1,221 @@
+"""Ingesta de documentos enlazados (PDF/DOCX): memorias, cuentas, transparencia.
+
+La descarga va por el cliente HTTP con tope de tamaño; la extracción de
+texto es CPU pura y corre en un pool de procesos con límite de páginas y
+timeout. El texto se cachea en Redis por hash del documento: la misma
+memoria enlazada desde varios sitios se procesa una sola vez.
+"""
+import asyncio
+import hashlib
+import io
+import logging
+import multiprocessing as mp
+import re
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import unquote, urlparse
+from xml.etree.ElementTree import ParseError, iterparse
+
+import redis.asyncio as redis
+
+try:
+    from pypdf import PdfReader
+except ImportError:  # Opcional: sin pypdf solo se leen DOCX
+    PdfReader = None
+
+logger = logging.getLogger(__name__)
+
+TEXT_PREFIX = "doc_text:"            # STRING texto extraído por sha256 del documento
+TEXT_CACHE_TTL = 30 * 24 * 3600
+DOCUMENT_EXTENSIONS = (".pdf", ".docx")
+MAX_TEXT_CHARS = 20000               # Texto guardado por documento
+MAX_DOCX_XML_BYTES = 50 * 1024 * 1024  # Tope del XML descomprimido (zip bombs)
+
+# Peso por palabra clave en la URL o el texto del enlace (sin tildes, minúsculas)
+DOCUMENT_KEYWORDS = {
+    "memoria": 10, "transparencia": 9, "cuentas": 8, "balance": 7, "presupuesto": 7,
+    "subvencion": 6, "estatutos": 6, "informe": 5, "plan-estrategico": 5, "plan estrategico": 5,
+    "actividades": 3, "junta": 3,
+}
+DOCUMENT_PENALTIES = {"menu": 8, "carta": 5, "inscripcion": 6, "formulario": 6, "solicitud": 5, "cartel": 4}
+
+_W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_WHITESPACE = re.compile(r"[ \t\r\f\v]+")
+
+
+def _fold(text: str) -> str:
+    text = unquote(text).lower()
+    for accented, plain in zip("áéíóúü", "aeiouu"):
+        text = text.replace(accented, plain)
+    return text
+
+
+def score_document(url: str, anchor: str = "") -> int:
+    """Relevancia de un documento enlazado para conocer a la entidad."""
+    haystack = _fold(f"{urlparse(url).path} {anchor}").replace("_", "-")
+    score = max((w for k, w in DOCUMENT_KEYWORDS.items() if k in haystack), default=0)
+    return score - sum(w for k, w in DOCUMENT_PENALTIES.items() if k in haystack)
+
+
+def rank_documents(documents: Iterable[dict], limit: int) -> List[dict]:
+    """Documentos con puntuación positiva, de más a menos relevante."""
+    scored = [(score_document(d["url"], d.get("text", "")), d) for d in documents]
+    scored = [item for item in scored if item[0] > 0]
+    scored.sort(key=lambda item: -item[0])
+    return [d for _, d in scored[:limit]]
+
+
+# --- Extracción (se ejecuta en los procesos del pool) ---
+
+def _pdf_text(data: bytes, max_pages: int, max_chars: int) -> str:
+    if PdfReader is None:
+        logger.debug("pypdf no instalado: PDF omitido")
+        return ""
+    reader = PdfReader(io.BytesIO(data))
+    parts, size = [], 0
+    for page in reader.pages[:max_pages]:
+        text = page.extract_text() or ""
+        parts.append(text)
+        size += len(text)
+        if size >= max_chars:
+            break
+    return "\n".join(parts)
+
+
+def _docx_text(data: bytes, max_chars: int) -> str:
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        info = archive.getinfo("word/document.xml")
+        if info.file_size > MAX_DOCX_XML_BYTES:
+            raise ValueError(f"document.xml demasiado grande ({info.file_size} bytes)")
+        parts, size = [], 0
+        with archive.open(info) as stream:
+            for _, elem in iterparse(stream, events=("end",)):
+                if elem.tag == _W_NS + "t" and elem.text:
+                    parts.append(elem.text)
+                    size += len(elem.text)
+                elif elem.tag == _W_NS + "p":
+                    parts.append("\n")
+                    elem.clear()
+                if size >= max_chars:
+                    break
+    return "".join(parts)
+
+
+def extract_text(data: bytes, max_pages: int = 30, max_chars: int = MAX_TEXT_CHARS) -> str:
+    """Texto de un PDF o DOCX según su firma (no la extensión), normalizado y recortado."""
+    if data[:5] == b"%PDF-":
+        text = _pdf_text(data, max_pages, max_chars)
+    elif data[:4] == b"PK\x03\x04":
+        text = _docx_text(data, max_chars)
+    else:
+        return ""
+    lines = (_WHITESPACE.sub(" ", line).strip() for line in text.splitlines())
+    return "\n".join(line for line in lines if line)[:max_chars]
+
+
+_pools: Dict[int, ProcessPoolExecutor] = {}
+
+
+def get_document_pool(workers: int) -> ProcessPoolExecutor:
+    """Pool compartido del proceso; spawn para no clonar el event loop ni sus hilos."""
+    pool = _pools.get(workers)
+    if pool is None:
+        pool = _pools[workers] = ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn"))
+    return pool
+
+
+def discard_document_pool(pool: ProcessPoolExecutor):
+    """Mata los procesos de un pool con una extracción colgada; el siguiente uso crea otro.
+
+    Un futuro cancelado no detiene al proceso que lo ejecuta: sin esto, cada
+    documento que se cuelga deja un proceso del pool ocupado para siempre.
+    Las extracciones que compartían el pool fallan con ``BrokenProcessPool``.
+    """
+    for workers, current in list(_pools.items()):
+        if current is pool:
+            del _pools[workers]
+    for process in list((pool._processes or {}).values()):
+        process.kill()
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+class DocumentIngestor:
+    """Descarga, extrae y cachea el texto de los documentos más relevantes de un sitio.
+
+    ``client`` es cualquier cliente con ``get_bytes`` (TorClient o EgressRouter).
+    """
+
+    def __init__(self, client, redis_client: Optional[redis.Redis] = None,
+                 max_files: int = 2, max_bytes: int = 15 * 1024 * 1024,
+                 max_pages: int = 30, timeout: float = 30.0, workers: int = 2):
+        self.client = client
+        self.redis = redis_client
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self.max_pages = max_pages
+        self.timeout = timeout
+        self.workers = workers
+
+    async def ingest(self, documents: Iterable[dict]) -> str:
+        """Texto de los documentos elegidos, cada uno encabezado por su nombre."""
+        sections = []
+        for doc in rank_documents(documents, self.max_files):
+            text = await self._document_text(doc["url"])
+            if text:
+                name = unquote(urlparse(doc["url"]).path.rsplit("/", 1)[-1]) or doc["url"]
+                sections.append(f"[{name}]\n{text}")
+        return "\n\n".join(sections)
+
+    async def _document_text(self, url: str) -> str:
+        try:
+            data = await self.client.get_bytes(url, max_bytes=self.max_bytes)
+        except Exception as e:
+            logger.debug("Documento no descargado %s: %s: %s", url, type(e).__name__, e)
+            return ""
+
+        digest = hashlib.sha256(data).hexdigest()
+        cached = await self._cached(digest)
+        if cached is not None:
+            return cached
+
+        loop = asyncio.get_running_loop()
+        pool = get_document_pool(self.workers)
+        try:
+            text = await asyncio.wait_for(
+                loop.run_in_executor(pool, extract_text, data, self.max_pages),
+                timeout=self.timeout,
+            )
+        except asyncio.TimeoutError:
+            logger.warning("Extracción de %s superó %ss, omitido (pool reiniciado)", url, self.timeout)
+            discard_document_pool(pool)
+            return ""
+        except (ValueError, KeyError, ParseError, zipfile.BadZipFile) as e:
+            logger.debug("Documento ilegible %s: %s", url, e)
+            text = ""
+        except Exception as e:
+            logger.warning("Error extrayendo %s: %s: %s", url, type(e).__name__, e)
+            return ""
+
+        await self._store(digest, text)
+        return text
+
+    async def _cached(self, digest: str) -> Optional[str]:
+        if self.redis is None:
+            return None
+        try:
+            raw = await self.redis.get(TEXT_PREFIX + digest)
+        except Exception as e:
+            logger.debug("Error leyendo caché de documentos: %s", e)
+            return None
+        if raw is None:
+            return None
+        return raw.decode("utf-8") if isinstance(raw, bytes) else raw
+
+    async def _store(self, digest: str, text: str):
+        if self.redis is None:
+            return
+        try:
+            await self.redis.set(TEXT_PREFIX + digest, text, ex=TEXT_CACHE_TTL)
+        except Exception as e:
+            logger.debug("Error guardando caché de documentos: %s", e)
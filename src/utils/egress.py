@@ -0,0 +1,248 @@
+"""Enrutado de salida por dominio: conexión directa o Tor, con aprendizaje de bloqueos."""
+import logging
+import re
+import time
+from typing import TYPE_CHECKING, Dict, Optional, Tuple, Union
+
+import aiohttp
+import redis.asyncio as redis
+
+from src.config import get_config
+from src.utils.http_cache import get_http_cache
+from src.utils.metrics import EGRESS_REQUESTS
+from src.utils.task_queue import TaskQueue, canonical_domain, registrable_domain
+from src.utils.tor_client import TorClient
+
+if TYPE_CHECKING:
+    from src.utils.concurrency import AdaptiveLimiter
+
+logger = logging.getLogger(__name__)
+
+ROUTE_PREFIX = "egress:route:"   # STRING direct|tor con TTL, compartido entre máquinas
+LEARNED_TTL = 7 * 24 * 3600      # Un dominio que bloqueó va por Tor una semana
+LOCAL_TTL = 300.0                # Caché en memoria para no consultar Redis en cada fetch
+
+# Estados HTTP típicos de WAF / rate limit sobre IPs de centro de datos
+BLOCK_STATUSES = {403, 429, 451}
+# Estados con los que los WAF sirven sus desafíos (503: modo "under attack" de Cloudflare)
+CHALLENGE_STATUSES = {403, 429, 503}
+# Marcadores propios de los scripts de desafío; solo cuentan con un estado de bloqueo
+CHALLENGE_MARKERS = ("cf-chl", "/cdn-cgi/challenge-platform", "_incapsula_resource", "incapsula")
+# Títulos de página de desafío; bastan por sí solos aunque el estado sea 200
+CHALLENGE_TITLES = (
+    "just a moment...", "attention required! | cloudflare", "request unsuccessful. incapsula incident",
+    "ddos-guard",
+)
+CHALLENGE_MAX_BYTES = 20_000
+_TITLE = re.compile(r"<title[^>]*>(.*?)</title>", re.DOTALL)
+
+
+class BlockedError(Exception):
+    """La respuesta directa es una página de bloqueo o desafío."""
+
+
+def is_block_signal(exc: BaseException) -> bool:
+    """Errores que indican bloqueo de la IP directa (no fallos del sitio)."""
+    if isinstance(exc, BlockedError):
+        return True
+    if isinstance(exc, aiohttp.ClientResponseError):
+        return exc.status in BLOCK_STATUSES
+    # Conexión reseteada o cortada sin respuesta: firma habitual de WAF por IP
+    return isinstance(exc, (aiohttp.ServerDisconnectedError, ConnectionResetError)) or (
+        isinstance(exc, aiohttp.ClientOSError) and not isinstance(exc, aiohttp.ClientConnectorError)
+    )
+
+
+def looks_blocked(html: Union[str, bytes], status: int = 200) -> bool:
+    """Página corta de desafío anti-bot: título de desafío, o marcador con estado de bloqueo.
+
+    Palabras como "captcha" o "access denied" aparecen en formularios y avisos
+    legales de sitios normales, así que no bastan.
+    """
+    if len(html) > CHALLENGE_MAX_BYTES:
+        return False
+    if isinstance(html, bytes):
+        html = html.decode("utf-8", errors="replace")
+    lowered = html.lower()
+    title = _TITLE.search(lowered)
+    if title and any(t in title.group(1) for t in CHALLENGE_TITLES):
+        return True
+    return status in CHALLENGE_STATUSES and any(marker in lowered for marker in CHALLENGE_MARKERS)
+
+
+class DirectClient(TorClient):
+    """Mismo cliente HTTP sin proxy: la vía rápida para sitios que no bloquean."""
+
+    # El router en modo auto lo activa para reconocer desafíos servidos como 503
+    detect_challenges = False
+
+    def _connector(self) -> aiohttp.BaseConnector:
+        # Sin Tor de por medio el certificado sí se verifica (ssl por defecto de aiohttp)
+        return aiohttp.TCPConnector(**self._pool_kwargs())
+
+    async def _check_status(self, response: aiohttp.ClientResponse):
+        # Un 503 de WAF solo se distingue de una caída del sitio por el cuerpo
+        if (self.detect_challenges and response.status in CHALLENGE_STATUSES
+                and response.status not in BLOCK_STATUSES):
+            body = await response.content.read(CHALLENGE_MAX_BYTES + 1)
+            if looks_blocked(body, response.status):
+                raise BlockedError(f"desafío con estado {response.status}")
+        response.raise_for_status()
+
+    async def renew_identity(self):
+        return False
+
+
+class EgressRouter:
+    """Elige conexión directa o Tor por dominio con la misma interfaz que TorClient.
+
+    Modos (``EGRESS_MODE``):
+    - ``tor``: todo por Tor (comportamiento original).
+    - ``direct``: todo directo.
+    - ``auto``: directo salvo dominios forzados a Tor o que ya bloquearon; ante
+      una señal de bloqueo se aprende Tor para el dominio y se reintenta por Tor
+      en la misma llamada.
+    """
+
+    def __init__(self, redis_client: Optional[redis.Redis] = None, pool_size: Optional[int] = None):
+        cfg = get_config()
+        self.mode = cfg.EGRESS_MODE
+        self.direct_domains = tuple(cfg.EGRESS_DIRECT_DOMAINS)
+        self.tor_domains = tuple(cfg.EGRESS_TOR_DOMAINS)
+        self.redis = redis_client
+        self.tor = TorClient(pool_size)
+        self.direct = DirectClient(pool_size)
+        self.direct.detect_challenges = self.mode == "auto"
+        self._routes: Dict[str, Tuple[str, float]] = {}
+        self._tor_used = False
+
+    async def get(self, url: str, headers: dict = None, **kwargs) -> str:
+        """GET por la ruta elegida para el dominio de la URL (kwargs como TorClient.get)."""
+        return await self._request("get", url, headers, kwargs)
+
+    async def get_bytes(self, url: str, headers: dict = None, **kwargs) -> bytes:
+        """Como ``get`` pero con el cuerpo sin decodificar."""
+        return await self._request("get_bytes", url, headers, kwargs)
+
+    async def _request(self, method: str, url: str, headers: Optional[dict], kwargs: dict):
+        domain = registrable_domain(canonical_domain(url) or url)
+        route = await self._route(domain)
+
+        if route == "tor":
+            return await self._via_tor(method, url, headers, kwargs)
+
+        try:
+            html = await getattr(self.direct, method)(url, headers=headers, **kwargs)
+            if self.mode == "auto" and looks_blocked(html):
+                raise BlockedError("página de desafío")
+        except Exception as e:
+            if self.mode != "auto" or not is_block_signal(e):
+                EGRESS_REQUESTS.inc(route="direct", outcome="error")
+                raise
+            EGRESS_REQUESTS.inc(route="direct", outcome="blocked")
+            logger.info("Bloqueo en conexión directa (%s), %s pasa a Tor", type(e).__name__, domain)
+            await self._learn(domain, "tor")
+            return await self._via_tor(method, url, headers, kwargs)
+
+        EGRESS_REQUESTS.inc(route="direct", outcome="ok")
+        return html
+
+    async def _via_tor(self, method: str, url: str, headers: Optional[dict], kwargs: dict):
+        self._tor_used = True
+        try:
+            html = await getattr(self.tor, method)(url, headers=headers, **kwargs)
+        except Exception:
+            EGRESS_REQUESTS.inc(route="tor", outcome="error")
+            raise
+        EGRESS_REQUESTS.inc(route="tor", outcome="ok")
+        return html
+
+    async def _route(self, domain: str) -> str:
+        if self.mode in ("tor", "direct"):
+            return self.mode
+        if any(domain == d or domain.endswith("." + d) for d in self.tor_domains):
+            return "tor"
+        if any(domain == d or domain.endswith("." + d) for d in self.direct_domains):
+            return "direct"
+
+        cached = self._routes.get(domain)
+        if cached and cached[1] > time.monotonic():
+            return cached[0]
+
+        route = "direct"
+        if self.redis is not None:
+            try:
+                learned = await self.redis.get(ROUTE_PREFIX + domain)
+                if learned:
+                    route = learned.decode() if isinstance(learned, bytes) else learned
+            except Exception as e:
+                logger.debug("Error leyendo ruta aprendida de %s: %s", domain, e)
+        self._routes[domain] = (route, time.monotonic() + LOCAL_TTL)
+        return route
+
+    async def _learn(self, domain: str, route: str):
+        self._routes[domain] = (route, time.monotonic() + LOCAL_TTL)
+        if self.redis is None:
+            return
+        try:
+            await self.redis.set(ROUTE_PREFIX + domain, route, ex=LEARNED_TTL)
+        except Exception as e:
+            logger.debug("Error guardando ruta aprendida de %s: %s", domain, e)
+
+    async def renew_identity(self):
+        """Rota el circuito Tor solo si se usó desde la última rotación."""
+        if not self._tor_used:
+            return False
+        self._tor_used = False
+        return await self.tor.renew_identity()
+
+    async def check_ip(self) -> str:
+        """IP de salida de Tor (o "direct" si Tor no está en uso)."""
+        if self.mode == "direct":
+            return "direct"
+        return await self.tor.check_ip()
+
+    async def close(self):
+        await self.tor.close()
+        await self.direct.close()
+        # Ambos clientes comparten el writer WARC del proceso
+        if self.tor.archive:
+            self.tor.archive.close()
+        # Y la caché HTTP: se vuelcan los last_access pendientes y se cierra el índice
+        if self.tor.cache:
+            self.tor.cache.close()
+            get_http_cache.cache_clear()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+
+class PacedClient:
+    """Cliente con la interfaz de TorClient que cobra cada petición al bucket de su dominio.
+
+    Para las peticiones secundarias de un sitio (robots.txt, sitemaps, páginas
+    internas, documentos); la portada ya consume su token al salir de la cola.
+    La espera por token ocurre fuera del limitador de fetch: solo la petición
+    en sí ocupa un slot.
+    """
+
+    def __init__(self, client, queue: TaskQueue, limiter: Optional["AdaptiveLimiter"] = None):
+        self.client = client
+        self.queue = queue
+        self.limiter = limiter
+
+    async def get(self, url: str, headers: dict = None, **kwargs) -> str:
+        return await self._request("get", url, headers, kwargs)
+
+    async def get_bytes(self, url: str, headers: dict = None, **kwargs) -> bytes:
+        return await self._request("get_bytes", url, headers, kwargs)
+
+    async def _request(self, method: str, url: str, headers: Optional[dict], kwargs: dict):
+        await self.queue.acquire_token(url)
+        if self.limiter is None:
+            return await getattr(self.client, method)(url, headers=headers, **kwargs)
+        async with self.limiter.slot(record=False):
+            return await getattr(self.client, method)(url, headers=headers, **kwargs)
@@ -0,0 +1,289 @@
+"""Caché HTTP en disco: revalidación con ETag/Last-Modified y cuerpos comprimidos.
+
+Los cuerpos se guardan una sola vez por contenido (``objects/ab/<sha256>``),
+comprimidos con zstandard si está instalado o con zlib en su defecto. Un
+índice SQLite relaciona cada URL con su cuerpo y sus validadores. Todas las
+operaciones bloqueantes se ejecutan con ``asyncio.to_thread``.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Optional
+
+try:
+    import zstandard
+except ImportError:  # Opcional: zlib como alternativa
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Accesos (last_access) acumulados en memoria antes de escribirlos en un solo commit
+ACCESS_FLUSH_EVERY = 256
+ACCESS_FLUSH_SECONDS = 30.0
+# Cada cuánto se recalcula el total de bytes desde el índice (otros procesos también escriben)
+TOTAL_RESYNC_SECONDS = 60.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS objects (
+    digest TEXT PRIMARY KEY,
+    codec TEXT NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entries (
+    url TEXT PRIMARY KEY,
+    digest TEXT NOT NULL REFERENCES objects(digest),
+    etag TEXT,
+    last_modified TEXT,
+    encoding TEXT,
+    fetched_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_entries_access ON entries(last_access);
+CREATE INDEX IF NOT EXISTS idx_entries_digest ON entries(digest);
+"""
+
+
+@dataclass
+class CacheEntry:
+    """Metadatos de una URL cacheada."""
+    url: str
+    digest: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    encoding: Optional[str]
+    fetched_at: float
+
+    def is_fresh(self, ttl: float) -> bool:
+        return time.time() - self.fetched_at < ttl
+
+    def conditional_headers(self) -> dict:
+        """Cabeceras para una petición condicional."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+def _compress(data: bytes) -> tuple:
+    if zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=6).compress(data)
+    return "zlib", zlib.compress(data, 6)
+
+
+def _decompress(codec: str, data: bytes) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Objeto zstd en caché pero zstandard no está instalado")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+class HttpCache:
+    """Índice SQLite más almacén direccionado por contenido, acotado en tamaño.
+
+    - ``fresh_seconds``: durante ese tiempo una entrada se sirve sin red.
+    - ``max_bytes``: al superarlo se expulsan las URLs menos usadas (LRU) hasta
+      el 90 % y se borran los cuerpos que ya nadie referencia.
+
+    El total de bytes se lleva en memoria y se recalcula con ``SUM`` solo cada
+    ``TOTAL_RESYNC_SECONDS`` o antes de expulsar. Los ``last_access`` de las
+    lecturas se escriben por lotes: el LRU tolera ese retraso y una lectura
+    no paga un commit.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int, fresh_seconds: float):
+        self.directory = Path(directory)
+        self.objects_dir = self.directory / "objects"
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.fresh_seconds = fresh_seconds
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(
+            self.directory / "index.sqlite", check_same_thread=False, timeout=30
+        )
+        # WAL: varios procesos (supervisor) comparten el mismo índice
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+        self._total: Optional[int] = None
+        self._total_synced = 0.0
+        self._accessed: Dict[str, float] = {}
+        self._accessed_since = 0.0
+
+    # --- API asíncrona ---
+
+    async def lookup(self, url: str) -> Optional[CacheEntry]:
+        return await asyncio.to_thread(self._lookup, url)
+
+    async def load(self, entry: CacheEntry) -> Optional[bytes]:
+        """Cuerpo sin comprimir, o None si el objeto desapareció (expulsado)."""
+        return await asyncio.to_thread(self._load, entry)
+
+    async def store(self, url: str, body: bytes, etag: Optional[str],
+                    last_modified: Optional[str], encoding: Optional[str]):
+        await asyncio.to_thread(self._store, url, body, etag, last_modified, encoding)
+
+    async def touch(self, url: str):
+        """Marca la entrada como revalidada (respuesta 304)."""
+        await asyncio.to_thread(self._touch, url)
+
+    def close(self):
+        with self._lock:
+            self._flush_access()
+            self._db.close()
+
+    # --- Implementación síncrona (hilos) ---
+
+    def _object_path(self, digest: str) -> Path:
+        return self.objects_dir / digest[:2] / digest
+
+    def _lookup(self, url: str) -> Optional[CacheEntry]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT url, digest, etag, last_modified, encoding, fetched_at "
+                "FROM entries WHERE url = ?", (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            if not self._accessed:
+                self._accessed_since = now
+            self._accessed[url] = now
+            if (len(self._accessed) >= ACCESS_FLUSH_EVERY
+                    or now - self._accessed_since >= ACCESS_FLUSH_SECONDS):
+                self._flush_access()
+        return CacheEntry(*row)
+
+    def _flush_access(self):
+        """Escribe los accesos pendientes en un solo commit (con el lock tomado)."""
+        if not self._accessed:
+            return
+        self._db.executemany(
+            "UPDATE entries SET last_access = ? WHERE url = ?",
+            [(ts, url) for url, ts in self._accessed.items()],
+        )
+        self._db.commit()
+        self._accessed.clear()
+
+    def _load(self, entry: CacheEntry) -> Optional[bytes]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT codec FROM objects WHERE digest = ?", (entry.digest,)
+            ).fetchone()
+        if row is None:
+            return None
+        try:
+            return _decompress(row[0], self._object_path(entry.digest).read_bytes())
+        except (OSError, zlib.error) as e:
+            logger.warning("Objeto de caché ilegible %s: %s", entry.digest, e)
+            return None
+
+    def _store(self, url: str, body: bytes, etag: Optional[str],
+               last_modified: Optional[str], encoding: Optional[str]):
+        digest = hashlib.sha256(body).hexdigest()
+        path = self._object_path(digest)
+        now = time.time()
+
+        with self._lock:
+            known = self._db.execute(
+                "SELECT 1 FROM objects WHERE digest = ?", (digest,)
+            ).fetchone()
+        if not known or not path.exists():
+            codec, data = _compress(body)
+            path.parent.mkdir(exist_ok=True)
+            tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+            with self._lock:
+                replaced = self._db.execute(
+                    "SELECT size FROM objects WHERE digest = ?", (digest,)
+                ).fetchone()
+                self._db.execute(
+                    "INSERT OR REPLACE INTO objects (digest, codec, size) VALUES (?, ?, ?)",
+                    (digest, codec, len(data)),
+                )
+                if self._total is not None:
+                    self._total += len(data) - (replaced[0] if replaced else 0)
+
+        with self._lock:
+            previous = self._db.execute(
+                "SELECT digest FROM entries WHERE url = ?", (url,)
+            ).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries "
+                "(url, digest, etag, last_modified, encoding, fetched_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, digest, etag, last_modified, encoding, now, now),
+            )
+            if previous and previous[0] != digest:
+                self._drop_orphan(previous[0])
+            self._db.commit()
+            self._evict()
+
+    def _touch(self, url: str):
+        now = time.time()
+        with self._lock:
+            self._accessed.pop(url, None)
+            self._db.execute(
+                "UPDATE entries SET fetched_at = ?, last_access = ? WHERE url = ?",
+                (now, now, url),
+            )
+            self._db.commit()
+
+    def _drop_orphan(self, digest: str) -> int:
+        """Borra un cuerpo si ninguna URL lo referencia (con el lock tomado). Retorna bytes liberados."""
+        if self._db.execute("SELECT 1 FROM entries WHERE digest = ? LIMIT 1", (digest,)).fetchone():
+            return 0
+        row = self._db.execute("SELECT size FROM objects WHERE digest = ?", (digest,)).fetchone()
+        self._db.execute("DELETE FROM objects WHERE digest = ?", (digest,))
+        self._object_path(digest).unlink(missing_ok=True)
+        freed = row[0] if row else 0
+        if self._total is not None:
+            self._total -= freed
+        return freed
+
+    def _sync_total(self) -> int:
+        """Total real de bytes según el índice (con el lock tomado)."""
+        self._total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM objects").fetchone()[0]
+        self._total_synced = time.monotonic()
+        return self._total
+
+    def _evict(self):
+        """Expulsa por LRU hasta el 90 % de max_bytes (con el lock tomado)."""
+        if self._total is None or time.monotonic() - self._total_synced >= TOTAL_RESYNC_SECONDS:
+            self._sync_total()
+        if self._total <= self.max_bytes:
+            return
+        # Antes de expulsar: total exacto y accesos al día para el orden LRU
+        total = self._sync_total()
+        self._flush_access()
+        if total <= self.max_bytes:
+            return
+
+        target = self.max_bytes * 0.9
+        evicted = 0
+        rows = self._db.execute("SELECT url, digest FROM entries ORDER BY last_access").fetchall()
+        for url, digest in rows:
+            if total <= target:
+                break
+            self._db.execute("DELETE FROM entries WHERE url = ?", (url,))
+            self._accessed.pop(url, None)
+            total -= self._drop_orphan(digest)
+            evicted += 1
+        self._db.commit()
+        logger.info("Caché HTTP: %s entradas expulsadas, %.1f MB en uso", evicted, total / 1e6)
+
+
+@lru_cache(maxsize=None)
+def get_http_cache(directory: str, max_bytes: int, fresh_seconds: float) -> HttpCache:
+    """Caché compartida por todos los clientes HTTP del proceso."""
+    return HttpCache(Path(directory), max_bytes, fresh_seconds)
@@ -0,0 +1,129 @@
+"""Logging sin bloqueo: cola en memoria, hilo escritor y muestreo por tipo de mensaje.
+
+En el event loop solo se crea el registro y se mete en una cola; el formato
+y la escritura ocurren en el hilo de un ``QueueListener``. Los mensajes de
+alta frecuencia (por debajo de WARNING) pasan por un token bucket por
+plantilla: con argumentos ``%`` la plantilla identifica el tipo de mensaje.
+"""
+import atexit
+import json
+import logging
+import queue
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # Opcional: sin orjson se usa json de la librería estándar
+    orjson = None
+
+
+def dumps(payload: dict) -> str:
+    """JSON compacto con orjson si está instalado."""
+    if orjson is not None:
+        return orjson.dumps(payload, default=str).decode("utf-8")
+    return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class JSONFormatter(logging.Formatter):
+    """Una línea JSON por registro, para monitoreo."""
+
+    def __init__(self, machine_id: str):
+        super().__init__()
+        self.machine_id = machine_id
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "machine": self.machine_id,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        return dumps(payload)
+
+
+class RateLimitFilter(logging.Filter):
+    """Token bucket por plantilla de mensaje; WARNING y superiores pasan siempre.
+
+    Al volver a dejar pasar una plantilla se anota cuántos mensajes se omitieron.
+    """
+
+    def __init__(self, rate: float, burst: int, max_keys: int = 10_000):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: Dict[Tuple[str, object], List[float]] = {}  # clave -> [tokens, instante, omitidos]
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.rate <= 0 or record.levelno >= logging.WARNING:
+            return True
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                if len(self._buckets) >= self.max_keys:
+                    self._buckets.clear()  # Plantillas dinámicas (f-strings): no crecer sin límite
+                bucket = self._buckets[key] = [float(self.burst), now, 0]
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if bucket[0] < 1:
+                bucket[2] += 1
+                return False
+            bucket[0] -= 1
+            suppressed, bucket[2] = int(bucket[2]), 0
+        if suppressed:
+            record.msg = f"{record.msg} [+{suppressed} similares omitidos]"
+        return True
+
+
+class DeferredQueueHandler(QueueHandler):
+    """Encola el registro sin formatearlo: el formato también queda fuera del event loop.
+
+    La cola es en memoria (mismo proceso), así que no hace falta volver el
+    registro serializable como hace ``QueueHandler.prepare``. Los argumentos se
+    interpolan en el hilo escritor: no pasar objetos que se mutan justo después.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+_listener: Optional[QueueListener] = None
+
+
+def install(formatter: logging.Formatter, level: int = logging.INFO,
+            rate: float = 0.0, burst: int = 20) -> bool:
+    """Instala la cola en el logger raíz si no tiene handlers. Retorna si se instaló."""
+    global _listener
+    root = logging.getLogger()
+    if root.handlers:
+        return False  # Ya configurado (tests, otro punto de entrada): no duplicar salida
+
+    stream = logging.StreamHandler()
+    stream.setFormatter(formatter)
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    handler = DeferredQueueHandler(records)
+    handler.addFilter(RateLimitFilter(rate, burst))
+    root.addHandler(handler)
+    root.setLevel(level)
+
+    _listener = QueueListener(records, stream, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown)
+    return True
+
+
+def shutdown():
+    """Vacía la cola y detiene el hilo escritor."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
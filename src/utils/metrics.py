@@ -0,0 +1,267 @@
+"""Métricas en memoria con exposición en formato de texto Prometheus."""
+import logging
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+# Buckets de latencia (segundos): desde parseo rápido hasta fetch lento por Tor
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+LabelKey = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric(ABC):
+    """Base común: nombre, ayuda y valores por combinación de labels."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: Dict[str, str]) -> LabelKey:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} espera labels {self.labelnames}, recibió {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    @abstractmethod
+    def samples(self, const_labels: Dict[str, str]) -> List[str]:
+        """Líneas de exposición de todas las series."""
+
+    @abstractmethod
+    def reset(self):
+        """Vacía los valores acumulados."""
+
+    def _series(self, suffix: str, key: LabelKey, const_labels: Dict[str, str],
+                extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+        names = list(const_labels) + list(self.labelnames) + [n for n, _ in extra]
+        values = list(const_labels.values()) + list(key) + [v for _, v in extra]
+        return f"{self.name}{suffix}{_format_labels(names, values)}"
+
+
+class Counter(_Metric):
+    """Contador monótono."""
+
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def get(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def values(self) -> Dict[LabelKey, float]:
+        return dict(self._values)
+
+    def reset(self):
+        self._values.clear()
+
+    def samples(self, const_labels):
+        return [f"{self._series('', k, const_labels)} {v}" for k, v in self._values.items()]
+
+
+class Gauge(Counter):
+    """Valor instantáneo que puede subir o bajar."""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        self._values[self._key(labels)] = float(value)
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    """Distribución acumulada por buckets."""
+
+    kind = "histogram"
+
+    def __init__(self, *args, buckets: Iterable[float] = DEFAULT_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets))
+        # Por serie: [conteos por bucket..., conteo +Inf], suma
+        self._counts: Dict[LabelKey, List[int]] = {}
+        self._sums: Dict[LabelKey, float] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        counts = self._counts.get(key)
+        if counts is None:
+            counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+            self._sums[key] = 0.0
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+                break
+        else:
+            counts[-1] += 1
+        self._sums[key] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Mide la duración del bloque (válido alrededor de un await)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        return sum(self._counts.get(self._key(labels), ()))
+
+    def series(self) -> List[LabelKey]:
+        return list(self._counts)
+
+    def quantile(self, q: float, **labels) -> Optional[float]:
+        """Estima el cuantil q interpolando dentro del bucket (como histogram_quantile)."""
+        counts = self._counts.get(self._key(labels))
+        if not counts:
+            return None
+        rank = q * sum(counts)
+        cumulative = 0
+        lower = 0.0
+        for bound, c in zip(self.buckets, counts):
+            if c and cumulative + c >= rank:
+                return lower + (bound - lower) * (rank - cumulative) / c
+            cumulative += c
+            lower = bound
+        # Cae en +Inf: el mejor estimado es el último límite finito
+        return self.buckets[-1]
+
+    def reset(self):
+        self._counts.clear()
+        self._sums.clear()
+
+    def samples(self, const_labels):
+        lines = []
+        for key, counts in self._counts.items():
+            cumulative = 0
+            for bound, c in zip(self.buckets, counts):
+                cumulative += c
+                lines.append(f"{self._series('_bucket', key, const_labels, (('le', repr(float(bound))),))} {cumulative}")
+            cumulative += counts[-1]
+            lines.append(f"{self._series('_bucket', key, const_labels, (('le', '+Inf'),))} {cumulative}")
+            lines.append(f"{self._series('_sum', key, const_labels)} {self._sums[key]}")
+            lines.append(f"{self._series('_count', key, const_labels)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Registro de métricas del proceso, compartido por todas las corrutinas."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self.const_labels: Dict[str, str] = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Métrica duplicada: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                  buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets=buckets))
+
+    def reset(self):
+        """Pone a cero todas las series (p. ej. entre corridas de benchmark)."""
+        for metric in self._metrics.values():
+            metric.reset()
+
+    def render(self) -> str:
+        """Serializa todas las métricas en formato de exposición de texto."""
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples(self.const_labels))
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+# Métricas del pipeline
+STAGE_SECONDS = REGISTRY.histogram(
+    "scrap_stage_seconds", "Latencia por etapa del pipeline", ["stage"]
+)
+AI_REQUEST_SECONDS = REGISTRY.histogram(
+    "scrap_ai_request_seconds", "Latencia de cada llamada al LLM", ["model", "outcome"]
+)
+TASKS_TOTAL = REGISTRY.counter(
+    "scrap_tasks_total", "Tareas procesadas por resultado", ["outcome"]
+)
+FETCHED_BYTES = REGISTRY.counter(
+    "scrap_fetched_bytes_total", "Bytes descargados"
+)
+AI_TOKENS = REGISTRY.counter(
+    "scrap_ai_tokens_total", "Tokens consumidos por modelo", ["model"]
+)
+QUEUE_DEPTH = REGISTRY.gauge(
+    "scrap_queue_depth", "Tareas pendientes por cola", ["queue"]
+)
+WORKERS_ACTIVE = REGISTRY.gauge(
+    "scrap_workers_active", "Corrutinas worker en ejecución"
+)
+HTTP_CACHE_REQUESTS = REGISTRY.counter(
+    "scrap_http_cache_requests_total", "Fetches por resultado de caché (fresh, revalidated, miss)", ["outcome"]
+)
+EGRESS_REQUESTS = REGISTRY.counter(
+    "scrap_egress_requests_total", "Peticiones por ruta de salida y resultado", ["route", "outcome"]
+)
+CONCURRENCY_LIMIT = REGISTRY.gauge(
+    "scrap_concurrency_limit", "Slots permitidos por el control adaptativo", ["stage"]
+)
+CONCURRENCY_INFLIGHT = REGISTRY.gauge(
+    "scrap_concurrency_inflight", "Slots ocupados por etapa", ["stage"]
+)
+COLD_START_SECONDS = REGISTRY.gauge(
+    "scrap_cold_start_seconds", "Segundos desde el arranque del proceso hasta su primera tarea terminada"
+)
+
+
+async def start_metrics_server(port: int, machine_id: Optional[str] = None,
+                               host: str = "127.0.0.1") -> "web.AppRunner":
+    """Expone /metrics en un servidor HTTP (solo loopback salvo que se indique ``host``)."""
+    from aiohttp import web
+
+    if machine_id:
+        REGISTRY.const_labels["machine"] = machine_id
+
+    async def handle_metrics(request: "web.Request") -> "web.Response":
+        return web.Response(text=REGISTRY.render(), content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle_metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info("Métricas expuestas en %s:%s/metrics", host, port)
+    return runner
@@ -0,0 +1,168 @@
+"""Recrawl incremental: hash de contenido por dominio y revisitas según su ritmo de cambio."""
+import hashlib
+import logging
+import math
+import random
+import re
+import time
+from typing import Iterable, Tuple
+
+import redis.asyncio as redis
+
+from src.models import TareaURL
+from src.utils.task_codec import encode_task
+from src.utils.task_queue import QUEUE_KEY
+
+logger = logging.getLogger(__name__)
+
+SCHEDULE_KEY = "recrawl_schedule"  # ZSET dominio -> próxima visita (epoch)
+STATE_PREFIX = "recrawl_state:"    # HASH por dominio: hash, url, nicho, visitas, cambios...
+
+DAY = 86400.0
+_WHITESPACE = re.compile(r"\s+")
+
+
+def content_fingerprint(scraped: dict) -> str:
+    """Hash del contenido normalizado (espacios y mayúsculas no cuentan como cambio)."""
+    meta = scraped.get("meta", {})
+    parts = [
+        meta.get("title") or "",
+        meta.get("description") or "",
+        scraped.get("text_content", ""),
+        " ".join(sorted(scraped.get("emails", []))),
+        " ".join(sorted(scraped.get("phones", []))),
+    ]
+    normalized = _WHITESPACE.sub(" ", "\n".join(parts)).strip().lower()
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def estimate_interval(revisits: int, changes: int, elapsed: float, previous: float,
+                      min_interval: float, max_interval: float) -> float:
+    """Intervalo de revisita a partir del ritmo de cambio estimado.
+
+    Estimador de Cho y Garcia-Molina para visitas periódicas:
+    λ = -ln((n - X + 0.5) / (n + 0.5)) / I, con n revisitas, X cambios
+    detectados e I el intervalo medio. Se revisita cada 1/λ, sin más que
+    duplicar el intervalo anterior de una vez y dentro de [mín, máx].
+    """
+    if revisits <= 0 or elapsed <= 0:
+        return previous
+    mean_interval = elapsed / revisits
+    rate = -math.log((revisits - changes + 0.5) / (revisits + 0.5)) / mean_interval
+    interval = 1 / rate if rate > 0 else max_interval
+    interval = min(interval, previous * 2)
+    return max(min_interval, min(interval, max_interval))
+
+
+class RecrawlScheduler:
+    """Estado de contenido por dominio y agenda de revisitas compartida en Redis."""
+
+    def __init__(self, redis_client: redis.Redis, min_days: float = 1.0,
+                 max_days: float = 90.0, initial_days: float = 14.0):
+        self.redis = redis_client
+        self.min_interval = min_days * DAY
+        self.max_interval = max_days * DAY
+        self.initial_interval = initial_days * DAY
+
+    async def changed(self, domain: str, content_hash: str) -> bool:
+        """Consulta sin escribir: True si el dominio no tiene hash o el contenido cambió."""
+        stored = await self.redis.hget(STATE_PREFIX + domain, "hash")
+        if isinstance(stored, bytes):
+            stored = stored.decode()
+        return stored != content_hash
+
+    async def observe(self, domain: str, content_hash: str, tarea: TareaURL) -> bool:
+        """Registra una visita y reprograma la siguiente. Retorna True si el contenido cambió.
+
+        Es el paso de confirmación: el worker lo llama cuando la visita ya está
+        guardada, para que un fallo intermedio no deje el hash nuevo sin datos.
+        """
+        key = STATE_PREFIX + domain
+        raw = await self.redis.hgetall(key)
+        state = {
+            (k.decode() if isinstance(k, bytes) else k): (v.decode() if isinstance(v, bytes) else v)
+            for k, v in raw.items()
+        }
+        now = time.time()
+
+        # Sin hash (dominio sin estado o sembrado por seed): primera visita real
+        if not state.get("hash"):
+            interval = self.initial_interval
+            changed = True
+            state = {
+                "hash": content_hash, "url": str(tarea.url), "nicho": tarea.nicho or state.get("nicho", ""),
+                "first_seen": now, "last_changed": now, "visits": 1, "changes": 0,
+            }
+        else:
+            changed = state.get("hash") != content_hash
+            visits = int(state.get("visits", 1)) + 1
+            changes = int(state.get("changes", 0)) + int(changed)
+            interval = estimate_interval(
+                revisits=visits - 1,
+                changes=changes,
+                elapsed=now - float(state.get("first_seen", now)),
+                previous=float(state.get("interval", self.initial_interval)),
+                min_interval=self.min_interval,
+                max_interval=self.max_interval,
+            )
+            state.update({"visits": visits, "changes": changes, "url": str(tarea.url)})
+            if changed:
+                state.update({"hash": content_hash, "last_changed": now})
+
+        state.update({"last_seen": now, "interval": interval})
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(key, mapping=state)
+            pipe.zadd(SCHEDULE_KEY, {domain: now + interval})
+            await pipe.execute()
+        return changed
+
+    async def seed(self, rows: Iterable[Tuple[str, str, str]]) -> int:
+        """Agenda dominios ya guardados que aún no tienen estado de recrawl.
+
+        ``rows`` son tuplas ``(dominio, url, nicho)``. La primera revisita se
+        reparte al azar dentro del intervalo inicial para no encolarlas todas a
+        la vez. Retorna cuántos dominios se agendaron.
+        """
+        rows = [row for row in rows if row[0] and row[1]]
+        if not rows:
+            return 0
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for domain, _, _ in rows:
+                pipe.exists(STATE_PREFIX + domain)
+            known = await pipe.execute()
+
+        now = time.time()
+        seeded = 0
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for (domain, url, nicho), exists in zip(rows, known):
+                if exists:
+                    continue
+                pipe.hset(STATE_PREFIX + domain, mapping={"url": url, "nicho": nicho or ""})
+                pipe.zadd(SCHEDULE_KEY, {domain: now + random.uniform(0, self.initial_interval)}, nx=True)
+                seeded += 1
+            await pipe.execute()
+        return seeded
+
+    async def promote_due(self, limit: int = 100) -> int:
+        """Encola las revisitas vencidas como tareas ``recrawl``. Retorna cuántas."""
+        due = await self.redis.zrangebyscore(SCHEDULE_KEY, "-inf", time.time(), start=0, num=limit)
+        promoted = 0
+        for member in due:
+            domain = member.decode() if isinstance(member, bytes) else member
+            # ZREM como reclamo: con varios workers solo uno la encola
+            if not await self.redis.zrem(SCHEDULE_KEY, domain):
+                continue
+            url, nicho = await self.redis.hmget(STATE_PREFIX + domain, "url", "nicho")
+            if not url:
+                continue
+            tarea = TareaURL(
+                url=url.decode() if isinstance(url, bytes) else url,
+                nicho=(nicho.decode() if isinstance(nicho, bytes) else nicho) or None,
+                nivel=1,
+                recrawl=True,
+            )
+            await self.redis.rpush(QUEUE_KEY, encode_task(tarea))
+            promoted += 1
+        if promoted:
+            logger.info("%s dominios reprogramados para recrawl", promoted)
+        return promoted
@@ -1,43 +1,52 @@
 """Cliente Supabase con backup local."""
-import csv
 import logging
+import os
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
-
-from supabase import create_client, Client
+from typing import TYPE_CHECKING, Any, Iterable, Optional, Tuple
 
 from src.config import get_config
 from src.models import Organizacion
+from src.utils.wal import get_wal, legacy_backups, migrate_legacy_backups
+
+if TYPE_CHECKING:
+    from supabase import Client
 
 logger = logging.getLogger(__name__)
 
 
 class SupabaseClient:
-    """Cliente para operaciones CRUD en Supabase con fallback a CSV."""
+    """Cliente para operaciones CRUD en Supabase con fallback a WAL local."""
 
     def __init__(self):
+        from supabase import create_client  # SDK lento de importar: solo quien lo usa lo paga
+
         cfg = get_config()
-        self.client: Client = create_client(cfg.SUPABASE_URL, cfg.SUPABASE_KEY)
+        self.client: "Client" = create_client(cfg.SUPABASE_URL, cfg.SUPABASE_KEY)
         self.backup_dir = Path("data/backup")
-        self.backup_dir.mkdir(parents=True, exist_ok=True)
-        self._backup_file: Optional[Path] = None
+        self.wal = get_wal(str(self.backup_dir), f"{cfg.MACHINE_ID}_{os.getpid()}")
+        legacy = legacy_backups(self.backup_dir)
+        if legacy:
+            logger.warning(
+                "%s backups CSV antiguos en %s: 'python -m src.main replay' los migra al WAL",
+                len(legacy), self.backup_dir,
+            )
 
     async def upsert_organizacion(self, org: Organizacion) -> bool:
         """Inserta o actualiza una organización en Supabase."""
+        data = org.to_supabase_dict()
         try:
-            data = org.to_supabase_dict()
             result = self.client.table("organizaciones").upsert(
                 data,
                 on_conflict="dominio"
             ).execute()
             
-            logger.debug(f"Upsert exitoso: {org.dominio}")
+            logger.debug("Upsert exitoso: %s", org.dominio)
             return True
             
         except Exception as e:
-            logger.error(f"Error Supabase upsert {org.dominio}: {e}")
-            self._save_to_backup(org)
+            logger.error("Error Supabase upsert %s: %s", org.dominio, e)
+            self._save_to_backup(data)
             return False
 
     async def check_domain_exists(self, domain: str) -> bool:
@@ -46,7 +55,7 @@ class SupabaseClient:
             result = self.client.table("organizaciones").select("dominio").eq("dominio", domain).limit(1).execute()
             return len(result.data) > 0
         except Exception as e:
-            logger.warning(f"Error verificando dominio {domain}: {e}")
+            logger.warning("Error verificando dominio %s: %s", domain, e)
             return False  # Asumir que no existe para no perder oportunidades
 
     async def log_error(self, url: str, error_type: str, message: str):
@@ -61,28 +70,72 @@ class SupabaseClient:
                 "created_at": datetime.utcnow().isoformat(),
             }).execute()
         except Exception as e:
-            logger.error(f"Error guardando log en Supabase: {e}")
-
-    def _save_to_backup(self, org: Organizacion):
-        """Guarda en CSV local si Supabase falla."""
-        if self._backup_file is None:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            self._backup_file = self.backup_dir / f"backup_{timestamp}.csv"
-        
-        file_exists = self._backup_file.exists()
-        
-        with open(self._backup_file, "a", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=list(org.to_supabase_dict().keys()))
-            if not file_exists:
-                writer.writeheader()
-            writer.writerow(org.to_supabase_dict())
-        
-        logger.info(f"Backup local: {self._backup_file}")
+            logger.error("Error guardando log en Supabase: %s", e)
+
+    def close(self):
+        """Sella el segmento WAL activo para que quede disponible para replay."""
+        self.wal.close()
+
+    def _save_to_backup(self, data: dict):
+        """Guarda en el WAL local la fila ya serializada si Supabase falla."""
+        self.wal.append(data)
+        logger.info("Backup local (WAL): %s", data["dominio"])
 
     async def get_backup_count(self) -> int:
         """Retorna cantidad de registros pendientes en backup."""
-        count = 0
-        for csv_file in self.backup_dir.glob("backup_*.csv"):
-            with open(csv_file, "r", encoding="utf-8") as f:
-                count += sum(1 for _ in f) - 1  # Resta header
-        return max(0, count)
+        return self.wal.pending_count()
+
+    async def replay_backup(self, batch_size: int = 500, include_open: bool = False) -> int:
+        """Reenvía a Supabase los segmentos del WAL con upserts masivos idempotentes.
+
+        Cada segmento se elimina solo cuando todos sus lotes se confirmaron,
+        así que una ejecución interrumpida puede repetirse sin duplicar filas.
+        Los segmentos abiertos de escritores muertos se sellan y entran también.
+        """
+        migrated = migrate_legacy_backups(self.wal)
+        if migrated:
+            logger.info("Backups CSV antiguos migrados al WAL: %s registros", migrated)
+        # Segmentos que un worker caído dejó abiertos: nadie más va a sellarlos
+        orphans = self.wal.seal_orphans()
+        if orphans:
+            logger.info("Segmentos huérfanos sellados para replay: %s", orphans)
+
+        replayed = 0
+        for segment in self.wal.segments(include_open=include_open):
+            batch = {}
+            for record in self.wal.iter_records(segment):
+                # Último registro por dominio: un upsert no puede tocar la misma fila dos veces
+                batch[record["dominio"]] = record
+                if len(batch) >= batch_size:
+                    replayed += self._upsert_batch(list(batch.values()))
+                    batch = {}
+            if batch:
+                replayed += self._upsert_batch(list(batch.values()))
+
+            self.wal.discard(segment)
+            logger.info("Segmento reproducido: %s", segment.name)
+
+        return replayed
+
+    def fetch_page(self, columns: str, after: Optional[str] = None, limit: int = 1000,
+                   filters: Iterable[Tuple[str, str, Any]] = ()) -> list:
+        """Página de organizaciones por orden de dominio, tras ``after`` (keyset, sin OFFSET).
+
+        ``filters`` son tuplas ``(operador, columna, valor)`` del query builder,
+        p. ej. ``("gte", "score", 6.0)`` o ``("in_", "tier", ["A", "B"])``.
+        """
+        query = self.client.table("organizaciones").select(columns).order("dominio").limit(limit)
+        for op, column, value in filters:
+            query = getattr(query, op)(column, value)
+        if after is not None:
+            query = query.gt("dominio", after)
+        return query.execute().data
+
+    def upsert_rows(self, rows: list) -> int:
+        """Upsert masivo de filas ya serializadas (sin pasar por el WAL)."""
+        return self._upsert_batch(rows)
+
+    def _upsert_batch(self, rows: list) -> int:
+        """Upsert masivo por dominio."""
+        self.client.table("organizaciones").upsert(rows, on_conflict="dominio").execute()
+        return len(rows)
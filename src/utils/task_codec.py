@@ -0,0 +1,100 @@
+"""Codificación binaria compacta de tareas para las colas de Redis.
+
+Formato v1 (little endian)::
+
+    magic(1) version(1) flags(1) nivel(1) reintentos(1) prioridad(i16) len_nicho(u16)
+    nicho (utf-8) url (utf-8, hasta el final)
+
+El byte mágico 0xA5 nunca inicia un JSON (ni un UTF-8 válido), así que los
+payloads JSON de productores antiguos siguen leyéndose por la vía legada.
+Las tareas binarias solo las escribe nuestro código tras validar la URL al
+encolar, por lo que al decodificarlas se construye el modelo sin revalidar.
+"""
+import json
+import struct
+from typing import Union
+
+from src.models import TareaURL
+
+MAGIC = 0xA5
+VERSION = 1
+FLAG_RECRAWL = 0x01
+FLAG_NICHO = 0x02  # Distingue nicho None de cadena vacía
+
+_HEADER = struct.Struct("<BBBBBhH")
+_HEADER_SIZE = _HEADER.size
+_ALL_FIELDS = frozenset(TareaURL.model_fields)
+
+
+def encode_task(tarea: TareaURL) -> bytes:
+    """Payload binario de una tarea ya validada (JSON si algún campo no cabe en el formato)."""
+    nicho = tarea.nicho.encode("utf-8") if tarea.nicho is not None else b""
+    flags = (FLAG_RECRAWL if tarea.recrawl else 0) | (FLAG_NICHO if tarea.nicho is not None else 0)
+    try:
+        header = _HEADER.pack(
+            MAGIC, VERSION, flags, tarea.nivel, tarea.reintentos, tarea.prioridad, len(nicho)
+        )
+    except struct.error:
+        return json.dumps(task_to_dict(tarea), ensure_ascii=False).encode("utf-8")
+    return header + nicho + str(tarea.url).encode("utf-8")
+
+
+def decode_task(payload: Union[bytes, str]) -> TareaURL:
+    """Tarea desde un payload binario (sin revalidar; ``url`` queda como str) o JSON legado."""
+    if isinstance(payload, str):
+        payload = payload.encode("utf-8")
+    if not payload or payload[0] != MAGIC:
+        return TareaURL.model_validate_json(payload)
+
+    magic, version, flags, nivel, reintentos, prioridad, nicho_len = _header(payload)
+    start = _HEADER_SIZE + nicho_len
+    return _trusted({
+        "url": payload[start:].decode("utf-8"),
+        "nicho": payload[_HEADER_SIZE:start].decode("utf-8") if flags & FLAG_NICHO else None,
+        "prioridad": prioridad,
+        "nivel": nivel,
+        "reintentos": reintentos,
+        "recrawl": bool(flags & FLAG_RECRAWL),
+    })
+
+
+def task_url(payload: Union[bytes, str]) -> str:
+    """Solo la URL de un payload, sin construir el modelo (reparto por dominio)."""
+    if isinstance(payload, str):
+        payload = payload.encode("utf-8")
+    if not payload or payload[0] != MAGIC:
+        return json.loads(payload)["url"]
+    nicho_len = _header(payload)[-1]
+    return payload[_HEADER_SIZE + nicho_len:].decode("utf-8")
+
+
+def task_to_dict(tarea: TareaURL) -> dict:
+    """Campos de la tarea como tipos JSON (también para tareas construidas sin validar)."""
+    return {
+        "url": str(tarea.url),
+        "nicho": tarea.nicho,
+        "prioridad": tarea.prioridad,
+        "nivel": tarea.nivel,
+        "reintentos": tarea.reintentos,
+        "recrawl": tarea.recrawl,
+    }
+
+
+def _trusted(values: dict) -> TareaURL:
+    # Lo mismo que model_construct con todos los campos presentes, sin su bucle de
+    # valores por defecto (que costaba más que validar el JSON entero)
+    tarea = TareaURL.__new__(TareaURL)
+    object.__setattr__(tarea, "__dict__", values)
+    object.__setattr__(tarea, "__pydantic_fields_set__", set(_ALL_FIELDS))
+    object.__setattr__(tarea, "__pydantic_extra__", None)
+    object.__setattr__(tarea, "__pydantic_private__", None)
+    return tarea
+
+
+def _header(payload: bytes) -> tuple:
+    if len(payload) < _HEADER_SIZE:
+        raise ValueError(f"Payload binario truncado ({len(payload)} bytes)")
+    fields = _HEADER.unpack_from(payload)
+    if fields[1] != VERSION:
+        raise ValueError(f"Versión de codificación de tarea no soportada: {fields[1]}")
+    return fields
@@ -0,0 +1,419 @@
+"""Cola de tareas en Redis con deduplicación atómica y planificación cortés por dominio.
+
+Flujo: los productores escriben en ``scraping_queue`` (entrada legada, FIFO).
+``TaskQueue.pop`` la vuelca por lotes a una lista por dominio registrable y
+entrega tareas desde ``ready_domains``: un ZSET dominio -> instante en que
+vuelve a tener token. Cada dominio tiene un token bucket en Redis compartido
+por todas las máquinas, y tras cada entrega el dominio pasa al final del
+turno, de modo que un sitio grande no acapara los slots de fetch.
+"""
+import asyncio
+import json
+import logging
+import random
+import time
+from datetime import datetime
+from typing import Iterable, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import redis.asyncio as redis
+
+from src.models import TareaURL
+from src.utils.task_codec import encode_task, task_to_dict, task_url
+
+logger = logging.getLogger(__name__)
+
+# Claves Redis compartidas por todas las máquinas
+QUEUE_KEY = "scraping_queue"
+SEEN_KEY = "processed_domains"
+INFLIGHT_KEY = "inflight_domains"
+RETRY_KEY = "retry_queue"              # ZSET payload -> timestamp de vencimiento
+DEAD_LETTER_KEY = "dead_letter_tasks"  # HASH dominio -> {tarea, error, failed_at}
+READY_KEY = "ready_domains"            # ZSET dominio -> instante con token disponible
+DOMAIN_QUEUE_PREFIX = "domain_queue:"  # LIST de payloads por dominio registrable
+BUCKET_PREFIX = "domain_bucket:"       # HASH tokens/ts por dominio registrable
+
+# Sufijos de dos niveles habituales en el crawl (sin lista pública de sufijos completa)
+_MULTI_LABEL_SUFFIXES = {
+    "com.es", "org.es", "gob.es", "nom.es", "edu.es",
+    "co.uk", "org.uk", "com.ar", "com.mx", "com.br", "com.co", "com.ve",
+}
+
+# Filtra contra vistos/en vuelo y encola los supervivientes en un solo viaje.
+# KEYS[1] = cola, KEYS[2] = dominios procesados, KEYS[3] = dominios en vuelo
+# ARGV = dominio_1, payload_1, dominio_2, payload_2, ...
+ENQUEUE_SCRIPT = """
+local accepted = 0
+for i = 1, #ARGV, 2 do
+    local domain = ARGV[i]
+    if redis.call('SISMEMBER', KEYS[2], domain) == 0
+            and redis.call('SADD', KEYS[3], domain) == 1 then
+        redis.call('RPUSH', KEYS[1], ARGV[i + 1])
+        accepted = accepted + 1
+    end
+end
+return accepted
+"""
+
+# Mueve a la cola principal los reintentos vencidos (atómico entre workers).
+# KEYS[1] = zset de reintentos, KEYS[2] = cola; ARGV[1] = ahora, ARGV[2] = máximo
+PROMOTE_SCRIPT = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[2]))
+for _, payload in ipairs(due) do
+    redis.call('RPUSH', KEYS[2], payload)
+    redis.call('ZREM', KEYS[1], payload)
+end
+return #due
+"""
+
+# Vuelca un lote de la entrada legada a las colas por dominio en un solo viaje,
+# marcando cada dominio como listo si no lo estaba. El dominio se calcula como
+# payload_domain: URL del payload (binario v1 o JSON) -> host -> dominio registrable.
+# KEYS[1] = entrada legada, KEYS[2] = ready_domains
+# ARGV[1] = prefijo de cola, ARGV[2] = tamaño del lote, ARGV[3..] = sufijos de dos niveles
+# Retorna {movidas, {payloads ilegibles}}
+INTAKE_SCRIPT = """
+local payloads = redis.call('LPOP', KEYS[1], tonumber(ARGV[2]))
+if not payloads then
+    return {0, {}}
+end
+local suffixes = {}
+for i = 3, #ARGV do
+    suffixes[ARGV[i]] = true
+end
+
+local function task_url(payload)
+    if string.byte(payload, 1) == 165 then
+        if #payload < 9 or string.byte(payload, 2) ~= 1 then
+            return nil
+        end
+        return string.sub(payload, 10 + string.byte(payload, 8) + 256 * string.byte(payload, 9))
+    end
+    local ok, task = pcall(cjson.decode, payload)
+    if ok and type(task) == 'table' and type(task.url) == 'string' then
+        return task.url
+    end
+    return nil
+end
+
+local function domain_of(url)
+    local authority = string.match(url, '^[%a][%w+.-]*://([^/?#]*)') or string.match(url, '^([^/?#]*)')
+    authority = string.match(authority, '([^@]*)$')
+    local host = string.match(authority, '^%[([^%]]*)%]') or string.match(authority, '^[^:]*')
+    host = string.gsub(string.lower(host), '%.+$', '')
+    if string.sub(host, 1, 4) == 'www.' then
+        host = string.sub(host, 5)
+    end
+    if host == '' then
+        return nil
+    end
+    local _, dots = string.gsub(host, '%.', '')
+    if dots < 2 or not string.find(host, '[^%d.]') then
+        return host
+    end
+    local last_two = string.match(host, '[^.]*%.[^.]*$')
+    if suffixes[last_two] then
+        return string.match(host, '[^.]*%.[^.]*%.[^.]*$')
+    end
+    return last_two
+end
+
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local moved, unreadable = 0, {}
+for _, payload in ipairs(payloads) do
+    local url = task_url(payload)
+    local domain = url and domain_of(url)
+    if domain then
+        redis.call('RPUSH', ARGV[1] .. domain, payload)
+        redis.call('ZADD', KEYS[2], 'NX', now, domain)
+        moved = moved + 1
+    else
+        unreadable[#unreadable + 1] = payload
+    end
+end
+return {moved, unreadable}
+"""
+
+# Entrega una tarea del primer dominio listo con token. Usa el reloj de Redis
+# para que los buckets sean coherentes entre máquinas. No interpreta payloads.
+# KEYS[1] = ready_domains
+# ARGV = prefijo cola, prefijo bucket, tokens/s, ráfaga, candidatos a revisar
+# Retorna {payload, 0} o {'', ms hasta el próximo dominio listo (-1 si no hay)}
+POP_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local rate = tonumber(ARGV[3])
+local burst = tonumber(ARGV[4])
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', now, 'LIMIT', 0, tonumber(ARGV[5]))
+for _, domain in ipairs(due) do
+    local qkey = ARGV[1] .. domain
+    local bkey = ARGV[2] .. domain
+    local state = redis.call('HMGET', bkey, 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or burst
+    local ts = tonumber(state[2]) or now
+    tokens = math.min(burst, tokens + (now - ts) * rate)
+    if tokens < 1 then
+        redis.call('ZADD', KEYS[1], now + (1 - tokens) / rate, domain)
+    else
+        local payload = redis.call('LPOP', qkey)
+        if not payload then
+            redis.call('ZREM', KEYS[1], domain)
+        else
+            tokens = tokens - 1
+            redis.call('HSET', bkey, 'tokens', tostring(tokens), 'ts', tostring(now))
+            redis.call('EXPIRE', bkey, math.ceil(burst / rate) + 60)
+            if redis.call('LLEN', qkey) > 0 then
+                local wait = 0
+                if tokens < 1 then
+                    wait = (1 - tokens) / rate
+                end
+                -- Al final del turno: los dominios que esperaban antes salen primero
+                redis.call('ZADD', KEYS[1], now + wait, domain)
+            else
+                redis.call('ZREM', KEYS[1], domain)
+            end
+            return {payload, 0}
+        end
+    end
+end
+local head = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+if #head == 0 then
+    return {'', -1}
+end
+return {'', math.max(0, math.ceil((tonumber(head[2]) - now) * 1000))}
+"""
+
+# Consume un token del bucket de un dominio para una petición secundaria del
+# sitio (robots, sitemaps, páginas internas, documentos). Mismo estado y reloj
+# que POP_SCRIPT, así que el ritmo total por dominio no supera el configurado.
+# KEYS[1] = bucket; ARGV = tokens/s, ráfaga
+# Retorna 0 si se concedió, o ms hasta que haya token (sin consumir nada)
+TAKE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + (now - ts) * rate)
+if tokens < 1 then
+    return math.ceil((1 - tokens) / rate * 1000)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens - 1), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 60)
+return 0
+"""
+
+
+def canonical_domain(url: str) -> Optional[str]:
+    """Normaliza el dominio de una URL para deduplicar (minúsculas, sin www ni puerto)."""
+    parsed = urlparse(url if "://" in url else f"http://{url}")
+    host = (parsed.hostname or "").rstrip(".")
+    if not host:
+        return None
+    if host.startswith("www."):
+        host = host[4:]
+    return host
+
+
+def registrable_domain(host: str) -> str:
+    """Dominio registrable aproximado (eTLD+1) para agrupar subdominios de un mismo sitio."""
+    labels = host.split(".")
+    if len(labels) <= 2 or host.replace(".", "").isdigit():
+        return host
+    keep = 3 if ".".join(labels[-2:]) in _MULTI_LABEL_SUFFIXES else 2
+    return ".".join(labels[-keep:])
+
+
+def payload_domain(payload) -> Optional[str]:
+    """Dominio registrable de una tarea serializada (binaria o JSON legado)."""
+    try:
+        url = task_url(payload)
+    except (ValueError, KeyError, TypeError):
+        return None
+    host = canonical_domain(url)
+    return registrable_domain(host) if host else None
+
+
+class TaskQueue:
+    """Operaciones por lote sobre la cola de scraping, reintentos diferidos y dead letters."""
+
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        max_retries: int = 3,
+        retry_base_delay: float = 60.0,
+        retry_max_delay: float = 3600.0,
+        domain_rate: float = 0.5,
+        domain_burst: int = 2,
+        intake_batch: int = 100,
+    ):
+        self.redis = redis_client
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.domain_rate = domain_rate
+        self.domain_burst = domain_burst
+        self.intake_batch = intake_batch
+        self._enqueue = redis_client.register_script(ENQUEUE_SCRIPT)
+        self._promote = redis_client.register_script(PROMOTE_SCRIPT)
+        self._intake = redis_client.register_script(INTAKE_SCRIPT)
+        self._pop = redis_client.register_script(POP_SCRIPT)
+        self._take = redis_client.register_script(TAKE_SCRIPT)
+
+    async def enqueue_batch(
+        self,
+        urls: Iterable[str],
+        nicho: Optional[str] = None,
+        nivel: int = 1,
+        prioridad: int = 1,
+    ) -> int:
+        """Encola URLs nuevas en un único round trip. Retorna cuántas se aceptaron."""
+        args = []
+        for url in urls:
+            domain = canonical_domain(url)
+            if domain is None:
+                continue
+            try:
+                tarea = TareaURL(url=url, nicho=nicho, nivel=nivel, prioridad=prioridad)
+            except ValueError as e:
+                logger.debug("URL inválida descartada %s: %s", url, e)
+                continue
+            args.extend([domain, encode_task(tarea)])
+
+        if not args:
+            return 0
+
+        accepted = await self._enqueue(keys=[QUEUE_KEY, SEEN_KEY, INFLIGHT_KEY], args=args)
+        return int(accepted)
+
+    async def pop(self) -> Tuple[Optional[bytes], Optional[float]]:
+        """Siguiente tarea respetando el bucket de su dominio.
+
+        Retorna ``(payload, None)`` o ``(None, espera)``: segundos hasta que algún
+        dominio tenga token, o None si no queda nada planificado.
+        """
+        payload, wait = await self._pop_ready()
+        if payload is None and await self.pump_intake():
+            payload, wait = await self._pop_ready()
+        return payload, wait
+
+    async def _pop_ready(self) -> Tuple[Optional[bytes], Optional[float]]:
+        payload, wait_ms = await self._pop(
+            keys=[READY_KEY],
+            args=[DOMAIN_QUEUE_PREFIX, BUCKET_PREFIX, self.domain_rate, self.domain_burst, 10],
+        )
+        if payload:
+            return payload, None
+        return None, (None if int(wait_ms) < 0 else int(wait_ms) / 1000)
+
+    async def pump_intake(self) -> int:
+        """Vuelca un lote de la entrada legada a las colas por dominio. Retorna cuántas."""
+        moved, unreadable = await self._intake(
+            keys=[QUEUE_KEY, READY_KEY],
+            args=[DOMAIN_QUEUE_PREFIX, self.intake_batch, *sorted(_MULTI_LABEL_SUFFIXES)],
+        )
+        for payload in unreadable:
+            logger.warning("Tarea ilegible descartada de %s: %r", QUEUE_KEY, payload[:200])
+        return int(moved)
+
+    async def take_token(self, url: str) -> float:
+        """Consume un token del bucket del dominio de ``url``. Retorna 0 o segundos de espera."""
+        host = canonical_domain(url)
+        if host is None:
+            return 0.0
+        wait_ms = await self._take(
+            keys=[BUCKET_PREFIX + registrable_domain(host)],
+            args=[self.domain_rate, self.domain_burst],
+        )
+        return int(wait_ms) / 1000
+
+    async def acquire_token(self, url: str):
+        """Espera a que el dominio de ``url`` tenga token y lo consume."""
+        while (wait := await self.take_token(url)) > 0:
+            await asyncio.sleep(wait)
+
+    async def mark_done(self, url: str):
+        """Marca el dominio de una URL como procesado y lo saca de los en vuelo."""
+        domain = canonical_domain(url)
+        if domain is None:
+            return
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.sadd(SEEN_KEY, domain)
+            pipe.srem(INFLIGHT_KEY, domain)
+            await pipe.execute()
+
+    def retry_delay(self, attempt: int) -> float:
+        """Backoff exponencial con jitter para el intento N (1-based)."""
+        delay = min(self.retry_base_delay * 2 ** (attempt - 1), self.retry_max_delay)
+        return delay * random.uniform(0.8, 1.2)
+
+    async def schedule_retry(self, tarea: TareaURL, error: str) -> bool:
+        """Reprograma una tarea fallida. Retorna False si se agotó y fue a dead letters."""
+        retry = tarea.model_copy(update={"reintentos": tarea.reintentos + 1})
+        if retry.reintentos > self.max_retries:
+            await self.dead_letter(tarea, error)
+            return False
+
+        due = time.time() + self.retry_delay(retry.reintentos)
+        await self.redis.zadd(RETRY_KEY, {encode_task(retry): due})
+        return True
+
+    async def defer(self, tarea: TareaURL, delay: float):
+        """Aplaza una tarea sin gastar reintentos (p. ej. mientras su host tiene el circuito abierto)."""
+        await self.redis.zadd(RETRY_KEY, {encode_task(tarea): time.time() + delay})
+
+    async def dead_letter(self, tarea: TareaURL, error: str):
+        """Aparca una tarea agotada, indexada por dominio, para inspección manual."""
+        domain = canonical_domain(str(tarea.url)) or str(tarea.url)
+        entry = {
+            "tarea": task_to_dict(tarea),
+            "error": error[:500],
+            "failed_at": datetime.utcnow().isoformat(),
+        }
+        await self.redis.hset(DEAD_LETTER_KEY, domain, json.dumps(entry, ensure_ascii=False))
+
+    async def promote_due(self, limit: int = 100) -> int:
+        """Devuelve a la cola principal los reintentos vencidos. Retorna cuántos."""
+        moved = await self._promote(keys=[RETRY_KEY, QUEUE_KEY], args=[time.time(), limit])
+        return int(moved)
+
+    async def _dead_letter_entries(self) -> dict:
+        raw = await self.redis.hgetall(DEAD_LETTER_KEY)
+        return {
+            (k.decode() if isinstance(k, bytes) else k): json.loads(v) for k, v in raw.items()
+        }
+
+    async def list_dead_letters(self, limit: Optional[int] = None) -> List[dict]:
+        """Dead letters con su dominio, ordenadas por fecha de fallo."""
+        entries = [
+            {"dominio": domain, **entry}
+            for domain, entry in (await self._dead_letter_entries()).items()
+        ]
+        entries.sort(key=lambda e: e["failed_at"])
+        return entries[:limit] if limit else entries
+
+    async def requeue_dead_letters(self, domains: Optional[Iterable[str]] = None) -> int:
+        """Reencola dead letters (todas o las de ``domains``) con los reintentos a cero."""
+        entries = await self._dead_letter_entries()
+        selected = list(entries) if domains is None else [d for d in domains if d in entries]
+        if not selected:
+            return 0
+
+        async with self.redis.pipeline(transaction=True) as pipe:
+            for domain in selected:
+                tarea = TareaURL.model_validate({**entries[domain]["tarea"], "reintentos": 0})
+                pipe.rpush(QUEUE_KEY, encode_task(tarea))
+                pipe.hdel(DEAD_LETTER_KEY, domain)
+            await pipe.execute()
+        return len(selected)
+
+    async def purge_dead_letters(self) -> int:
+        """Elimina todas las dead letters. Retorna cuántas había."""
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hlen(DEAD_LETTER_KEY)
+            pipe.delete(DEAD_LETTER_KEY)
+            count, _ = await pipe.execute()
+        return int(count)
@@ -1,65 +1,195 @@
 """Cliente Tor asíncrono con rotación de IP."""
 import asyncio
 import logging
-from typing import Optional
+import os
+from typing import Dict, Optional, Tuple
 
 import aiohttp
-from aiohttp_socks import ProxyConnector
-from tenacity import retry, stop_after_attempt, wait_exponential
 
 from src.config import get_config
+from src.utils.http_cache import HttpCache, get_http_cache
+from src.utils.metrics import FETCHED_BYTES, HTTP_CACHE_REQUESTS
+from src.utils.warc import WarcWriter, get_warc_writer
 
 logger = logging.getLogger(__name__)
 
+READ_CHUNK = 64 * 1024
+
+
+class ResponseTooLarge(Exception):
+    """El cuerpo supera el tope pedido; la descarga se corta sin leer el resto."""
+
 
 class TorClient:
     """Cliente HTTP que enruta tráfico a través de Tor."""
 
-    def __init__(self):
+    def __init__(self, pool_size: Optional[int] = None):
         cfg = get_config()
         self.socks_port = cfg.TOR_SOCKS_PORT
         self.control_port = cfg.TOR_CONTROL_PORT
         self.timeout = cfg.REQUEST_TIMEOUT
+        # Conexiones simultáneas del conector (None = valor por defecto de aiohttp)
+        self.pool_size = pool_size
         self._session: Optional[aiohttp.ClientSession] = None
+        self._retiring: Dict[asyncio.Task, aiohttp.ClientSession] = {}
+        self._renewing = False
+        self.cache: Optional[HttpCache] = None
+        if cfg.HTTP_CACHE_MAX_MB > 0:
+            self.cache = get_http_cache(
+                cfg.HTTP_CACHE_DIR, cfg.HTTP_CACHE_MAX_MB * 1024 * 1024, cfg.HTTP_CACHE_FRESH_SECONDS
+            )
+        self.archive: Optional[WarcWriter] = None
+        if cfg.WARC_DIR:
+            self.archive = get_warc_writer(
+                cfg.WARC_DIR, f"{cfg.MACHINE_ID}_{os.getpid()}", cfg.WARC_MAX_MB * 1024 * 1024
+            )
 
     async def _get_session(self) -> aiohttp.ClientSession:
         """Obtiene o crea la sesión HTTP."""
         if self._session is None or self._session.closed:
-            # Desactivar SSL verify para evitar errores en webs gubernamentales/antiguas
-            connector = ProxyConnector.from_url(
-                f"socks5://127.0.0.1:{self.socks_port}",
-                ssl=False
-            )
             timeout = aiohttp.ClientTimeout(total=self.timeout)
-            self._session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+            self._session = aiohttp.ClientSession(connector=self._connector(), timeout=timeout)
         return self._session
 
+    def _pool_kwargs(self) -> dict:
+        return {"limit": self.pool_size} if self.pool_size else {}
+
+    def _connector(self) -> aiohttp.BaseConnector:
+        """Conector SOCKS5 hacia Tor."""
+        from aiohttp_socks import ProxyConnector  # Solo se carga si se usa Tor
+
+        # Desactivar SSL verify para evitar errores en webs gubernamentales/antiguas
+        return ProxyConnector.from_url(
+            f"socks5://127.0.0.1:{self.socks_port}",
+            ssl=False,
+            **self._pool_kwargs(),
+        )
+
     async def close(self):
-        """Cierra la sesión HTTP."""
+        """Cierra la sesión HTTP (y las retiradas por una rotación que aún no se cerraron)."""
+        for task, session in list(self._retiring.items()):
+            task.cancel()
+            await session.close()
         if self._session and not self._session.closed:
             await self._session.close()
             self._session = None
 
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=2, max=10),
-        reraise=True
-    )
-    async def get(self, url: str, headers: dict = None) -> str:
-        """Realiza GET request a través de Tor."""
+    def _retire_session(self):
+        """Las peticiones nuevas abren otra sesión; la anterior se cierra cuando acaban las suyas.
+
+        La sesión la comparten todos los workers del proceso: cerrarla en el acto
+        cortaría las descargas en curso de los demás.
+        """
+        session, self._session = self._session, None
+        if session is None or session.closed:
+            return
+
+        async def close_later():
+            await asyncio.sleep(self.timeout)
+            await session.close()
+
+        task = asyncio.create_task(close_later())
+        self._retiring[task] = session
+        task.add_done_callback(lambda t: self._retiring.pop(t, None))
+
+    async def get(self, url: str, headers: dict = None, use_cache: bool = True,
+                  archive_fields: Optional[dict] = None) -> str:
+        """Realiza GET request a través de Tor.
+
+        Sin reintentos en línea: el worker reprograma la tarea en la cola de reintentos.
+        Con caché HTTP activa sirve entradas frescas sin red y revalida las demás
+        con ETag/Last-Modified. Con captura activa archiva cada respuesta 2xx
+        descargada en WARC, con ``archive_fields`` como cabeceras extra del registro.
+        """
+        body, encoding = await self._fetch(url, headers, use_cache, archive_fields)
+        return body.decode(encoding or "utf-8", errors="replace")
+
+    async def get_bytes(self, url: str, headers: dict = None, use_cache: bool = True,
+                        archive_fields: Optional[dict] = None,
+                        max_bytes: Optional[int] = None) -> bytes:
+        """Como ``get`` pero con el cuerpo sin decodificar (sitemaps .gz, documentos).
+
+        Con ``max_bytes`` el cuerpo se lee por trozos y se aborta con
+        ``ResponseTooLarge`` en cuanto lo supera (o si Content-Length ya lo anuncia).
+        """
+        body, _ = await self._fetch(url, headers, use_cache, archive_fields, max_bytes)
+        return body
+
+    async def _fetch(self, url: str, headers: Optional[dict], use_cache: bool,
+                     archive_fields: Optional[dict],
+                     max_bytes: Optional[int] = None) -> Tuple[bytes, Optional[str]]:
+        """Cuerpo y charset de la respuesta, pasando por caché y archivo WARC."""
+        entry = await self.cache.lookup(url) if self.cache and use_cache else None
+        if entry and entry.is_fresh(self.cache.fresh_seconds):
+            cached = await self.cache.load(entry)
+            if cached is not None:
+                HTTP_CACHE_REQUESTS.inc(outcome="fresh")
+                return cached, entry.encoding
+            entry = None
+
         session = await self._get_session()
         default_headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
         }
+        if entry:
+            default_headers.update(entry.conditional_headers())
         if headers:
             default_headers.update(headers)
         
         async with session.get(url, headers=default_headers) as response:
-            response.raise_for_status()
-            return await response.text()
+            if response.status == 304 and entry:
+                cached = await self.cache.load(entry)
+                if cached is not None:
+                    await self.cache.touch(url)
+                    HTTP_CACHE_REQUESTS.inc(outcome="revalidated")
+                    return cached, entry.encoding
+                # Cuerpo expulsado entre lookup y 304: pedir de nuevo sin validadores
+                return await self._fetch(url, headers, False, archive_fields, max_bytes)
+
+            await self._check_status(response)
+            body = await self._read(response, url, max_bytes)
+            FETCHED_BYTES.inc(len(body))
+            encoding = response.get_encoding()
+
+            if self.archive:
+                await self.archive.write_response(
+                    url, response.status, response.reason, response.headers.items(), body,
+                    fields=archive_fields,
+                )
+
+            if self.cache and use_cache and "no-store" not in response.headers.get("Cache-Control", ""):
+                await self.cache.store(
+                    url, body,
+                    etag=response.headers.get("ETag"),
+                    last_modified=response.headers.get("Last-Modified"),
+                    encoding=encoding,
+                )
+                HTTP_CACHE_REQUESTS.inc(outcome="miss")
+            return body, encoding
+
+    async def _check_status(self, response: aiohttp.ClientResponse):
+        """Lanza ``ClientResponseError`` si el estado es de error."""
+        response.raise_for_status()
+
+    @staticmethod
+    async def _read(response: aiohttp.ClientResponse, url: str, max_bytes: Optional[int]) -> bytes:
+        if max_bytes is None:
+            return await response.read()
+        if response.content_length and response.content_length > max_bytes:
+            raise ResponseTooLarge(f"{url}: {response.content_length} bytes anunciados")
+        chunks, size = [], 0
+        async for chunk in response.content.iter_chunked(READ_CHUNK):
+            size += len(chunk)
+            if size > max_bytes:
+                raise ResponseTooLarge(f"{url}: más de {max_bytes} bytes")
+            chunks.append(chunk)
+        return b"".join(chunks)
 
     async def renew_identity(self):
-        """Solicita nueva identidad Tor (cambio de IP)."""
+        """Solicita nueva identidad Tor (cambio de IP). Una sola rotación a la vez."""
+        if self._renewing:
+            return False
+        self._renewing = True
         try:
             reader, writer = await asyncio.open_connection("127.0.0.1", self.control_port)
             writer.write(b"AUTHENTICATE\r\n")
@@ -73,8 +203,8 @@ class TorClient:
             writer.close()
             await writer.wait_closed()
             
-            # Cerrar sesión actual para forzar nueva conexión
-            await self.close()
+            # Sesión nueva para forzar nuevos circuitos
+            self._retire_session()
             
             # Esperar a que Tor aplique el cambio
             await asyncio.sleep(5)
@@ -82,18 +212,20 @@ class TorClient:
             logger.info("Identidad Tor renovada")
             return b"250" in response
         except Exception as e:
-            logger.warning(f"Error renovando identidad Tor: {e}")
+            logger.warning("Error renovando identidad Tor: %s", e)
             return False
+        finally:
+            self._renewing = False
 
     async def check_ip(self) -> str:
         """Verifica la IP actual de salida de Tor."""
         try:
-            html = await self.get("https://check.torproject.org/api/ip")
+            html = await self.get("https://check.torproject.org/api/ip", use_cache=False)
             import json
             data = json.loads(html)
             return data.get("IP", "unknown")
         except Exception as e:
-            logger.error(f"Error verificando IP: {e}")
+            logger.error("Error verificando IP: %s", e)
             return "error"
 
     async def __aenter__(self):
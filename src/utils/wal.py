@@ -0,0 +1,248 @@
+"""Write-ahead log append-only segmentado en JSONL."""
+import ast
+import csv
+import json
+import logging
+import os
+import time
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Segmento activo (aún abierto por un escritor) vs. sellado (listo para replay)
+OPEN_SUFFIX = ".jsonl.part"
+SEALED_SUFFIX = ".jsonl"
+# Backups del formato anterior (una fila CSV por upsert fallido)
+LEGACY_PATTERN = "backup_*.csv"
+MIGRATED_SUFFIX = ".migrated"
+# Segmento abierto de otra máquina sin escrituras en este tiempo: su escritor ya no está
+STALE_SEGMENT_SECONDS = 24 * 3600
+
+
+class WriteAheadLog:
+    """Log de registros pendientes con fsync por lotes, rotación y manifiesto.
+
+    Cada proceso escribe sus propios segmentos y su propio manifiesto
+    (``manifest_<writer>.json``), así nunca hay dos escritores sobre el mismo
+    archivo. El manifiesto guarda cuántos registros tiene cada segmento.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        writer_id: str,
+        segment_max_bytes: int = 16 * 1024 * 1024,
+        fsync_every: int = 50,
+        fsync_interval: float = 1.0,
+    ):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.writer_id = writer_id
+        self.segment_max_bytes = segment_max_bytes
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+
+        self._manifest_path = self.directory / f"manifest_{writer_id}.json"
+        self._counts = self._read_manifest(self._manifest_path)
+        self._file = None
+        self._segment: Optional[Path] = None
+        self._seq = 0
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def append(self, record: dict):
+        """Agrega un registro al segmento activo."""
+        if self._file is None:
+            self._open_segment()
+
+        self._file.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        # flush() sobrevive a la caída del proceso; fsync() (por lotes) a la del SO
+        self._file.flush()
+        self._counts[self._segment.name] = self._counts.get(self._segment.name, 0) + 1
+        self._unsynced += 1
+
+        if (self._unsynced >= self.fsync_every
+                or time.monotonic() - self._last_sync >= self.fsync_interval):
+            self.sync()
+
+        if self._file.tell() >= self.segment_max_bytes:
+            self._seal_segment()
+
+    def sync(self):
+        """Fuerza fsync del segmento activo y persiste el manifiesto."""
+        if self._file is not None and self._unsynced:
+            os.fsync(self._file.fileno())
+            self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._write_manifest()
+
+    def close(self):
+        """Sella el segmento activo."""
+        if self._file is not None:
+            self._seal_segment()
+
+    def pending_count(self) -> int:
+        """Registros pendientes según los manifiestos (sin leer segmentos)."""
+        total = 0
+        for manifest in self.directory.glob("manifest_*.json"):
+            for name, count in self._read_manifest(manifest).items():
+                if (self.directory / name).exists():
+                    total += count
+        return total
+
+    def segments(self, include_open: bool = False) -> List[Path]:
+        """Segmentos pendientes en orden de creación."""
+        found = list(self.directory.glob(f"wal_*{SEALED_SUFFIX}"))
+        if include_open:
+            found.extend(
+                p for p in self.directory.glob(f"wal_*{OPEN_SUFFIX}") if p != self._segment
+            )
+        return sorted(found, key=lambda p: p.name)
+
+    def seal_orphans(self) -> int:
+        """Sella los segmentos abiertos cuyo escritor ya no existe. Retorna cuántos.
+
+        Un proceso caído deja su ``.jsonl.part`` sin sellar. Si el escritor es
+        de esta máquina se comprueba su pid; si no, basta con que el segmento
+        lleve ``STALE_SEGMENT_SECONDS`` sin escrituras.
+        """
+        own_machine = self.writer_id.rpartition("_")[0]
+        sealed = 0
+        for segment in self.directory.glob(f"wal_*{OPEN_SUFFIX}"):
+            if segment == self._segment:
+                continue
+            # wal_<fecha>_<hora>_<máquina>_<pid>_<seq>.jsonl.part
+            writer = "_".join(segment.name[len("wal_"):-len(OPEN_SUFFIX)].split("_")[2:-1])
+            machine, _, pid = writer.rpartition("_")
+            if machine and pid.isdigit() and machine == own_machine:
+                orphan = not _pid_alive(int(pid))
+            else:
+                orphan = time.time() - segment.stat().st_mtime >= STALE_SEGMENT_SECONDS
+            if not orphan:
+                continue
+            target = segment.with_name(segment.name[:-len(OPEN_SUFFIX)] + SEALED_SUFFIX)
+            os.replace(segment, target)
+            manifest = self.directory / f"manifest_{writer}.json"
+            counts = self._read_manifest(manifest)
+            if segment.name in counts:
+                counts[target.name] = counts.pop(segment.name)
+                tmp = manifest.with_suffix(".tmp")
+                tmp.write_text(json.dumps(counts), encoding="utf-8")
+                os.replace(tmp, manifest)
+            logger.warning("Segmento WAL huérfano de %s sellado: %s", writer, target.name)
+            sealed += 1
+        return sealed
+
+    def iter_records(self, segment: Path) -> Iterator[dict]:
+        """Lee un segmento en streaming, ignorando la última línea si quedó truncada."""
+        with open(segment, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning("Línea corrupta ignorada en %s", segment.name)
+
+    def discard(self, segment: Path):
+        """Elimina un segmento ya reproducido y limpia manifiestos huérfanos."""
+        segment.unlink(missing_ok=True)
+        for manifest in self.directory.glob("manifest_*.json"):
+            if manifest == self._manifest_path:
+                continue
+            if not any((self.directory / n).exists() for n in self._read_manifest(manifest)):
+                manifest.unlink(missing_ok=True)
+
+    def _open_segment(self):
+        self._seq += 1
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        name = f"wal_{timestamp}_{self.writer_id}_{self._seq:06d}{OPEN_SUFFIX}"
+        self._segment = self.directory / name
+        self._file = open(self._segment, "a", encoding="utf-8")
+        logger.info("Nuevo segmento WAL: %s", self._segment)
+
+    def _seal_segment(self):
+        self.sync()
+        self._file.close()
+        sealed = self._segment.with_name(self._segment.name[:-len(OPEN_SUFFIX)] + SEALED_SUFFIX)
+        os.replace(self._segment, sealed)
+        self._counts[sealed.name] = self._counts.pop(self._segment.name, 0)
+        self._file = None
+        self._segment = None
+        self._write_manifest()
+
+    def _write_manifest(self):
+        # Olvidar segmentos que otro proceso ya reprodujo y eliminó
+        self._counts = {
+            name: count for name, count in self._counts.items()
+            if (self.directory / name).exists()
+        }
+        tmp = self._manifest_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self._counts), encoding="utf-8")
+        os.replace(tmp, self._manifest_path)
+
+    @staticmethod
+    def _read_manifest(path: Path) -> dict:
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # Existe, aunque sea de otro usuario
+    return True
+
+
+def legacy_backups(directory: Path) -> List[Path]:
+    """Backups CSV del formato anterior aún sin migrar."""
+    return sorted(Path(directory).glob(LEGACY_PATTERN))
+
+
+def _legacy_value(column: str, value: str):
+    # El CSV guardaba None como "" y listas/dicts con su repr de Python
+    if value == "":
+        return None
+    if value[:1] in "[{":
+        try:
+            return ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            return value
+    if column == "score":
+        return float(value)
+    return value
+
+
+def migrate_legacy_backups(wal: WriteAheadLog) -> int:
+    """Pasa al WAL las filas de los backups CSV antiguos. Retorna cuántas.
+
+    Cada CSV se sella como un segmento propio y después se renombra a
+    ``.csv.migrated``: la migración corre una sola vez y el original queda
+    para inspección. Si se corta entre ambos pasos, repetirla solo duplica
+    upserts idempotentes.
+    """
+    files = legacy_backups(wal.directory)
+    if not files:
+        return 0
+    logger.info("%s backups CSV antiguos encontrados, migrando al WAL", len(files))
+    migrated = 0
+    for path in files:
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                wal.append({column: _legacy_value(column, value) for column, value in row.items()})
+                migrated += 1
+        wal.close()
+        path.rename(path.with_name(path.name + MIGRATED_SUFFIX))
+    return migrated
+
+
+@lru_cache(maxsize=None)
+def get_wal(directory: str, writer_id: str) -> WriteAheadLog:
+    """WAL compartido por todos los clientes del proceso."""
+    return WriteAheadLog(Path(directory), writer_id)
@@ -0,0 +1,191 @@
+"""Archivo WARC 1.1 de respuestas descargadas, con rotación por tamaño.
+
+Cada registro es un miembro gzip independiente (``.warc.gz`` estándar). El
+archivo activo lleva el sufijo ``.open`` y se renombra al sellarlo, igual
+que los segmentos del WAL.
+"""
+import asyncio
+import base64
+import gzip
+import hashlib
+import logging
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from functools import lru_cache
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+OPEN_SUFFIX = ".open"
+# Cabeceras que describen la transferencia original, no el cuerpo ya decodificado que guardamos
+_HOP_HEADERS = {"content-encoding", "transfer-encoding", "content-length", "connection"}
+
+
+@dataclass
+class WarcResponse:
+    """Registro ``response`` leído de un WARC."""
+    url: str
+    date: str
+    status: int
+    headers: Dict[str, str]
+    body: bytes
+    fields: Dict[str, str] = field(default_factory=dict)
+
+    def text(self) -> str:
+        """Cuerpo decodificado con el charset declarado (utf-8 por defecto)."""
+        content_type = self.headers.get("content-type", "")
+        charset = "utf-8"
+        if "charset=" in content_type:
+            charset = content_type.split("charset=")[-1].split(";")[0].strip().strip('"') or charset
+        try:
+            return self.body.decode(charset, errors="replace")
+        except LookupError:
+            return self.body.decode("utf-8", errors="replace")
+
+
+def _record(warc_type: str, content_type: str, block: bytes, extra: Dict[str, str]) -> bytes:
+    headers = {
+        "WARC-Type": warc_type,
+        "WARC-Record-ID": f"<urn:uuid:{uuid.uuid4()}>",
+        "WARC-Date": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        **extra,
+        "Content-Type": content_type,
+        "Content-Length": str(len(block)),
+    }
+    head = "WARC/1.1\r\n" + "".join(f"{k}: {v}\r\n" for k, v in headers.items()) + "\r\n"
+    return gzip.compress(head.encode("utf-8") + block + b"\r\n\r\n", compresslevel=6)
+
+
+class WarcWriter:
+    """Escribe registros ``response`` en archivos rotativos por tamaño comprimido."""
+
+    def __init__(self, directory: Path, writer_id: str, max_bytes: int = 1024 * 1024 * 1024):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.writer_id = writer_id
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._file: Optional[BinaryIO] = None
+        self._path: Optional[Path] = None
+        self._seq = 0
+
+    async def write_response(self, url: str, status: int, reason: str,
+                             headers: Iterable[Tuple[str, str]], body: bytes,
+                             fields: Optional[Dict[str, str]] = None):
+        """Archiva una respuesta (cabeceras originales y cuerpo decodificado)."""
+        await asyncio.to_thread(self._write_response, url, status, reason, list(headers), body, fields)
+
+    def _write_response(self, url, status, reason, headers, body, fields):
+        lines = [f"HTTP/1.1 {status} {reason or ''}".rstrip()]
+        lines += [f"{k}: {v}" for k, v in headers if k.lower() not in _HOP_HEADERS]
+        lines.append(f"Content-Length: {len(body)}")
+        block = ("\r\n".join(lines) + "\r\n\r\n").encode("utf-8", errors="replace") + body
+
+        digest = base64.b32encode(hashlib.sha1(body).digest()).decode()
+        extra = {"WARC-Target-URI": url, "WARC-Payload-Digest": f"sha1:{digest}"}
+        extra.update(fields or {})
+        record = _record("response", "application/http;msgtype=response", block, extra)
+
+        with self._lock:
+            if self._file is None:
+                self._open()
+            self._file.write(record)
+            self._file.flush()
+            if self._file.tell() >= self.max_bytes:
+                self._seal()
+
+    def _open(self):
+        self._seq += 1
+        stamp = time.strftime("%Y%m%d%H%M%S")
+        name = f"capture-{self.writer_id}-{stamp}-{self._seq:05d}.warc.gz"
+        self._path = self.directory / (name + OPEN_SUFFIX)
+        self._file = open(self._path, "ab")
+        info = b"software: ScrapEntidades\r\nformat: WARC File Format 1.1\r\n"
+        self._file.write(_record("warcinfo", "application/warc-fields", info, {"WARC-Filename": name}))
+
+    def _seal(self):
+        self._file.close()
+        self._path.rename(self._path.with_name(self._path.name[: -len(OPEN_SUFFIX)]))
+        self._file = None
+        self._path = None
+
+    def close(self):
+        """Sella el archivo activo."""
+        with self._lock:
+            if self._file is not None:
+                self._seal()
+
+
+def _read_headers(stream: BinaryIO) -> Optional[Dict[str, str]]:
+    version = stream.readline()
+    while version in (b"\r\n", b"\n"):
+        version = stream.readline()
+    if not version:
+        return None
+    if not version.startswith(b"WARC/"):
+        raise ValueError(f"Registro WARC inválido: {version[:40]!r}")
+    headers = {}
+    for line in iter(stream.readline, b""):
+        line = line.rstrip(b"\r\n")
+        if not line:
+            break
+        key, _, value = line.decode("utf-8", errors="replace").partition(":")
+        headers[key.strip()] = value.strip()
+    return headers
+
+
+def _parse_http(block: bytes) -> Tuple[int, Dict[str, str], bytes]:
+    head, _, body = block.partition(b"\r\n\r\n")
+    lines = head.decode("iso-8859-1").split("\r\n")
+    parts = lines[0].split(" ", 2)
+    status = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else 0
+    headers = {}
+    for line in lines[1:]:
+        key, _, value = line.partition(":")
+        headers[key.strip().lower()] = value.strip()
+    return status, headers, body
+
+
+def iter_responses(paths: Iterable[Path]) -> Iterator[WarcResponse]:
+    """Recorre en streaming los registros ``response`` de uno o varios WARC."""
+    for path in paths:
+        opener = gzip.open if str(path).endswith((".gz", ".gz" + OPEN_SUFFIX)) else open
+        with opener(path, "rb") as stream:
+            while True:
+                try:
+                    headers = _read_headers(stream)
+                except (EOFError, OSError) as e:
+                    logger.warning("WARC truncado %s: %s", path, e)
+                    break
+                if headers is None:
+                    break
+                block = stream.read(int(headers.get("Content-Length", 0)))
+                if headers.get("WARC-Type") != "response":
+                    continue
+                status, http_headers, body = _parse_http(block)
+                fields = {k: v for k, v in headers.items() if k.startswith("X-")}
+                yield WarcResponse(
+                    url=headers.get("WARC-Target-URI", ""),
+                    date=headers.get("WARC-Date", ""),
+                    status=status,
+                    headers=http_headers,
+                    body=body,
+                    fields=fields,
+                )
+
+
+def warc_files(directory: Path, include_open: bool = False) -> list:
+    """Archivos WARC del directorio, por writer y fecha de creación."""
+    patterns = ["*.warc.gz"] + (["*.warc.gz" + OPEN_SUFFIX] if include_open else [])
+    found = [p for pattern in patterns for p in Path(directory).glob(pattern)]
+    return sorted(found, key=lambda p: p.name)
+
+
+@lru_cache(maxsize=None)
+def get_warc_writer(directory: str, writer_id: str, max_bytes: int) -> WarcWriter:
+    """Writer compartido por todos los clientes HTTP del proceso."""
+    return WarcWriter(Path(directory), writer_id, max_bytes)
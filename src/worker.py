@@ -1,171 +1,396 @@
 """Worker principal del sistema de scraping."""
 import asyncio
 import logging
-import signal
+import time
 from typing import Optional
 from urllib.parse import urlparse
 
 import redis.asyncio as redis
 
 from src.config import get_config
-from src.scraper import Scraper
-from src.ai_analyzer import AIAnalyzer
-from src.scoring import Scorer
+from src.components import Components
+from src.scraper import SOCIAL_DOMAINS, merge_pages
+from src.structured_data import is_canarias_postal_code
 from src.models import Organizacion, AnalisisIA, TareaURL
-from src.utils.tor_client import TorClient
+from src.utils.egress import EgressRouter, PacedClient
 from src.utils.supabase_client import SupabaseClient
+from src.utils.task_codec import decode_task
+from src.utils.task_queue import TaskQueue, canonical_domain
+from src.utils.circuit_breaker import TERMINAL_CLASSES, HostCircuitBreaker
+from src.utils.recrawl import RecrawlScheduler, content_fingerprint
+from src.utils.discovery import SiteDiscovery
+from src.utils.documents import DocumentIngestor
+from src.utils.concurrency import get_limiter
+from src.utils.metrics import STAGE_SECONDS, TASKS_TOTAL, WORKERS_ACTIVE
 
 logger = logging.getLogger(__name__)
 
+# Cada cuánto (s) un worker mueve a la cola los reintentos y revisitas vencidos
+PROMOTE_INTERVAL = 1.0
+RECRAWL_PROMOTE_INTERVAL = 60.0
+# Espera con la cola vacía: crece desde el mínimo hasta el máximo mientras siga vacía
+IDLE_SLEEP_MIN = 0.1
+IDLE_SLEEP_MAX = 5.0
+
+
+def is_transient(exc: BaseException) -> bool:
+    """Un 4xx (salvo 408/429) no cambia al reintentar; el resto de fallos de red sí puede."""
+    status = getattr(exc, "status", None)
+    if isinstance(status, int) and 400 <= status < 500:
+        return status in (408, 429)
+    return True
+
+
+def _merge(first: list, second: list) -> list:
+    """Une dos listas sin duplicados conservando el orden."""
+    return list(dict.fromkeys([*first, *second]))
+
+
+def _social_links(same_as: list, social: dict) -> dict:
+    """Redes del ``sameAs`` estructurado, completadas con los enlaces de la página."""
+    links = {}
+    for url in same_as:
+        for domain, name in SOCIAL_DOMAINS.items():
+            if domain in url and name not in links:
+                links[name] = url
+                break
+    return {**social, **links}
+
 
 class Worker:
     """Worker asíncrono que procesa URLs de la cola Redis."""
 
-    def __init__(self):
+    def __init__(self, components: Optional[Components] = None):
         self.cfg = get_config()
         self.running = True
         self.processed = 0
         self.errors = 0
         
-        # Componentes
-        self.scraper = Scraper()
-        self.ai = AIAnalyzer()
-        self.scorer = Scorer()
-        self.tor: Optional[TorClient] = None
+        # Componentes: compartidos con el resto de workers del proceso o propios si no se pasan
+        self._owns_components = components is None
+        self.components = components or Components()
+        self.scraper = self.components.scraper
+        self.ai = self.components.ai
+        self.scorer = self.components.scorer
+        self.features = self.components.features
+        self.tor: Optional[EgressRouter] = None
+        self.site_client: Optional[PacedClient] = None
         self.db: Optional[SupabaseClient] = None
         self.redis: Optional[redis.Redis] = None
+        self.queue: Optional[TaskQueue] = None
+        self.breaker: Optional[HostCircuitBreaker] = None
+        self.recrawl: Optional[RecrawlScheduler] = None
+        self.discovery: Optional[SiteDiscovery] = None
+        self.documents: Optional[DocumentIngestor] = None
+        self._last_promote = 0.0
+        self._last_recrawl_promote = 0.0
+        self._idle_sleep = IDLE_SLEEP_MIN
+        self.fetch_limiter = get_limiter("fetch")
 
     async def start(self):
         """Inicia el worker."""
-        # Registrar señales para apagado gracioso
-        loop = asyncio.get_running_loop()
-        for sig in (signal.SIGINT, signal.SIGTERM):
-            loop.add_signal_handler(sig, self._handle_shutdown)
-        
-        # Inicializar conexiones
-        self.tor = TorClient()
-        self.db = SupabaseClient()
-        self.redis = redis.from_url(self.cfg.REDIS_URL)
-        
-        logger.info(f"Worker iniciado [{self.cfg.MACHINE_ID}] - Max threads: {self.cfg.MAX_THREADS}")
-        
-        # Verificar IP inicial
-        ip = await self.tor.check_ip()
-        logger.info(f"IP Tor actual: {ip}")
+        components = self.components
+        await components.start()
+        self.db = components.db
+        self.redis = components.redis
+        self.tor = components.tor
+        self.site_client = components.site_client
+        self.queue = components.queue
+        self.breaker = components.breaker
+        self.recrawl = components.recrawl
+        self.discovery = components.discovery
+        self.documents = components.documents
         
         # Bucle principal
+        WORKERS_ACTIVE.inc()
         while self.running:
-            task_data = await self.redis.lpop("scraping_queue")
+            await self._promote_due()
+            with STAGE_SECONDS.time(stage="queue_pop"):
+                task_data, wait = await self.queue.pop()
             
             if task_data is None:
-                # Cola vacía, esperar
-                await asyncio.sleep(5)
+                # Nada listo: esperar al próximo token de dominio, o backoff si la cola está vacía
+                if wait is None:
+                    await asyncio.sleep(self._idle_sleep)
+                    self._idle_sleep = min(self._idle_sleep * 2, IDLE_SLEEP_MAX)
+                else:
+                    await asyncio.sleep(min(IDLE_SLEEP_MAX, max(0.05, wait)))
                 continue
+            self._idle_sleep = IDLE_SLEEP_MIN
             
             try:
-                tarea = TareaURL.model_validate_json(task_data)
-                await self._process_url(tarea)
-                self.processed += 1
-                
-                # Rotar IP cada 10 requests
-                if self.processed % 10 == 0:
-                    await self.tor.renew_identity()
-                    
+                await self._run_task(task_data)
             except Exception as e:
-                logger.error(f"Error procesando tarea: {e}")
+                logger.error("Error procesando tarea: %s", e)
                 self.errors += 1
+                TASKS_TOTAL.inc(outcome="error")
         
+        WORKERS_ACTIVE.dec()
         await self._cleanup()
 
-    async def _process_url(self, tarea: TareaURL):
-        """Pipeline simplificado: Solo extracción Canarias."""
+    async def _run_task(self, task_data: bytes):
+        """Procesa una tarea de la cola y marca su dominio como procesado si terminó."""
+        tarea = decode_task(task_data)
+        try:
+            finished = await self._process_url(tarea)
+        except Exception as e:
+            logger.error("Error procesando %s: %s", tarea.url, e)
+            self.errors += 1
+            TASKS_TOTAL.inc(outcome="error")
+            # Fallo inesperado: se reintenta; agotado pasa a dead letters y se da por terminado
+            finished = not await self.queue.schedule_retry(tarea, f"{type(e).__name__}: {e}")
+        else:
+            self.processed += 1
+            await self.components.task_done()
+        # Un reintento pendiente mantiene el dominio en vuelo: marcarlo procesado lo perdería
+        if finished:
+            await self.queue.mark_done(str(tarea.url))
+
+    async def _process_url(self, tarea: TareaURL) -> bool:
+        """Pipeline simplificado: Solo extracción Canarias.
+
+        Retorna True si la tarea terminó (procesada, descartada o en dead
+        letters) y False si quedó un reintento o un aplazamiento programado.
+        """
         url = str(tarea.url)
         domain = urlparse(url).netloc
         
-        logger.info(f"Procesando: {url}")
+        logger.info("Procesando: %s", url)
         
-        # 1. Verificar si ya existe
-        if await self.db.check_domain_exists(domain):
-            logger.debug(f"Dominio ya existe: {domain}")
-            return
+        # 1. Verificar si ya existe (las revisitas programadas pasan igualmente)
+        if not tarea.recrawl and await self.db.check_domain_exists(domain):
+            logger.debug("Dominio ya existe: %s", domain)
+            TASKS_TOTAL.inc(outcome="exists")
+            return True
         
-        # 2. Scrape
+        # 2. Circuito del host: sin red si está marcado como caído u hostil
+        host = canonical_domain(url) or domain
+        reason = await self.breaker.is_open(host)
+        if reason:
+            return await self._circuit_open(tarea, host, reason)
+
+        # 3. Scrape
         try:
-            html = await self.tor.get(url)
+            async with self.fetch_limiter.slot():
+                with STAGE_SECONDS.time(stage="fetch"):
+                    html = await self.tor.get(url, archive_fields=self._archive_fields(tarea))
         except Exception as e:
-            await self.db.log_error(url, "scrape_error", str(e))
-            return
-        
-        scraped = self.scraper.parse(html, url)
+            error = f"{type(e).__name__}: {e}"
+            await self.db.log_error(url, "scrape_error", error)
+            opened = await self.breaker.record_failure(host, e)
+            if opened:
+                # El host quedó marcado: reintentar ahora solo gastaría más tiempo de worker
+                return await self._circuit_open(tarea, host, opened, error)
+            if not is_transient(e):
+                # Reintentar no cambia un 4xx: dead letter directo (reencolable a mano)
+                await self.queue.dead_letter(tarea, f"fetch_error: {error}")
+                TASKS_TOTAL.inc(outcome="fetch_error")
+            elif await self.queue.schedule_retry(tarea, error):
+                logger.info("Reintento %s programado: %s", tarea.reintentos + 1, url)
+                TASKS_TOTAL.inc(outcome="retry_scheduled")
+                return False
+            else:
+                logger.warning("Reintentos agotados, a dead letters: %s", url)
+                TASKS_TOTAL.inc(outcome="dead_letter")
+            return True
+        await self.breaker.record_success(host)
         
-        # 3. FILTRO GEOGRÁFICO ESTRICTO: Solo Canarias
+        with STAGE_SECONDS.time(stage="parse"):
+            scraped = self.scraper.parse(html, url)
+
+        await self.process_page(tarea, scraped)
+        return True
+
+    async def _with_internal_pages(self, tarea: TareaURL, scraped: dict) -> dict:
+        """Añade a la portada las páginas internas más relevantes (transparencia, quiénes somos...)."""
+        url = str(tarea.url)
+        try:
+            with STAGE_SECONDS.time(stage="discovery"):
+                candidates = await self.discovery.discover(url, scraped["internal_links"])
+        except Exception as e:
+            logger.debug("Descubrimiento fallido en %s: %s", url, e)
+            return scraped
+
+        fields = {**self._archive_fields(tarea), "X-Parent-URL": url}
+        extras = []
+        for page_url in candidates[: self.cfg.DISCOVERY_MAX_PAGES]:
+            try:
+                with STAGE_SECONDS.time(stage="fetch"):
+                    html = await self.site_client.get(page_url, archive_fields=fields)
+            except Exception as e:
+                logger.debug("Página interna no disponible %s: %s", page_url, e)
+                continue
+            with STAGE_SECONDS.time(stage="parse"):
+                extras.append(self.scraper.parse(html, page_url))
+
+        if not extras:
+            return scraped
+        logger.debug("%s páginas internas añadidas a %s", len(extras), url)
+        return merge_pages(scraped, extras)
+
+    async def _circuit_open(self, tarea: TareaURL, host: str, reason: str, error: str = "") -> bool:
+        """Aparca una tarea de un host con el circuito abierto. Retorna True si terminó.
+
+        Las clases recuperables se aplazan hasta que expire el circuito, sin
+        gastar reintentos; las terminales (DNS, TLS) van a dead letters.
+        """
+        if reason in TERMINAL_CLASSES:
+            detail = f"circuit_open: {reason}" + (f" ({error})" if error else "")
+            await self.queue.dead_letter(tarea, detail)
+            TASKS_TOTAL.inc(outcome="circuit_open")
+            return True
+        delay = await self.breaker.reopens_in(host)
+        await self.queue.defer(tarea, delay)
+        logger.debug("Circuito abierto (%s), aplazada %.0fs sin fetch: %s", reason, delay, tarea.url)
+        TASKS_TOTAL.inc(outcome="circuit_deferred")
+        return False
+
+    async def process_page(self, tarea: TareaURL, scraped: dict,
+                           discover: bool = True, analyze: bool = True) -> bool:
+        """Filtro geográfico, IA, guardado y descubrimiento sobre una página ya parseada.
+
+        Compartido por el worker y por el reprocesado offline de WARC. Retorna
+        True si la organización se guardó.
+        """
+        url = str(tarea.url)
+        domain = urlparse(url).netloc
+
+        # 4. FILTRO GEOGRÁFICO ESTRICTO: Solo Canarias
         # Keywords básicas de filtrado preliminar
         canarias_keywords = [
             "canarias", "tenerife", "gran canaria", "lanzarote", "fuerteventura", 
             "la palma", "la gomera", "el hierro", "las palmas", "santa cruz"
         ]
         
-        text_content = scraped["text_content"].lower()
-        meta_content = str(scraped["meta"]).lower()
-        
-        is_canarias = any(kw in text_content for kw in canarias_keywords) or \
-                      any(kw in meta_content for kw in canarias_keywords)
+        structured = scraped.get("structured") or {}
+        with STAGE_SECONDS.time(stage="geo_filter"):
+            postal_codes = structured.get("postal_codes", [])
+            if postal_codes:
+                # La dirección declarada por la propia web manda sobre las keywords
+                is_canarias = any(is_canarias_postal_code(cp) for cp in postal_codes)
+            else:
+                text_content = scraped["text_content"].lower()
+                meta_content = str(scraped["meta"]).lower()
+
+                is_canarias = any(kw in text_content for kw in canarias_keywords) or \
+                              any(kw in meta_content for kw in canarias_keywords)
         
         if not is_canarias:
-            logger.info(f"Descartado (No es Canarias): {url}")
-            return
+            logger.info("Descartado (No es Canarias): %s", url)
+            TASKS_TOTAL.inc(outcome="discarded")
+            return False
+
+        logger.info("Detectado Canarias: %s", url)
 
-        logger.info(f"Detectado Canarias: {url}")
+        # Recrawl: si el contenido normalizado no cambió, ni IA ni escritura.
+        # El hash nuevo solo se guarda tras el upsert: si algo falla antes, el reintento no ve "sin cambios"
+        fingerprint = None
+        if self.recrawl:
+            host = canonical_domain(url) or domain
+            fingerprint = content_fingerprint(scraped)
+            if not await self.recrawl.changed(host, fingerprint):
+                await self.recrawl.observe(host, fingerprint, tarea)
+                logger.info("Sin cambios desde la última visita: %s", url)
+                TASKS_TOTAL.inc(outcome="unchanged")
+                return False
+
+        # Páginas internas: como los documentos, solo para entidades que pasaron el filtro
+        if self.discovery and self.cfg.DISCOVERY_MAX_PAGES > 0:
+            scraped = await self._with_internal_pages(tarea, scraped)
+            structured = scraped.get("structured") or {}
         
-        # 4. ANÁLISIS IA (INFERENCIA A POSTERIORI)
+        # 5. ANÁLISIS IA (INFERENCIA A POSTERIORI)
         # No filtramos por resultado, solo etiquetamos
         ai_result = None
         try:
-            if self.cfg.OPENROUTER_API_KEY:
-                ai_result = await self.ai.analyze(
-                    scraped["text_content"],
-                    scraped["meta"]
-                )
+            if analyze and self.cfg.OPENROUTER_API_KEY:
+                # Memorias y cuentas enlazadas: solo para entidades que ya pasaron el filtro
+                documents = ""
+                if self.documents and scraped.get("documents"):
+                    with STAGE_SECONDS.time(stage="documents"):
+                        documents = await self.documents.ingest(scraped["documents"])
+                with STAGE_SECONDS.time(stage="ai"):
+                    ai_result = await self.ai.analyze(
+                        scraped["text_content"],
+                        scraped["meta"],
+                        documents=documents,
+                    )
         except Exception as e:
-            logger.warning(f"Fallo análisis IA (continuando sin él): {e}")
+            logger.warning("Fallo análisis IA (continuando sin él): %s", e)
 
-        # 5. Construir modelo
+        # 6. Construir modelo (los datos estructurados van primero: son los declarados)
+        score = self.scorer.calculate(scraped, ai_result)
+        if self.features:
+            self.features.record(domain, scraped, ai_result)
+        address = structured.get("address", {})
         org = Organizacion(
             url=url,
             dominio=domain,
             titulo=scraped["meta"].get("title"),
-            descripcion=scraped["meta"].get("description"),
-            emails=scraped["emails"],
-            telefonos=scraped["phones"],
-            redes_sociales=scraped["social"],
+            descripcion=scraped["meta"].get("description") or structured.get("description"),
+            nombre=structured.get("legal_name") or structured.get("name"),
+            direccion=", ".join(
+                v for v in (address.get("street"), address.get("postal_code"), address.get("locality"))
+                if v
+            ) or None,
+            codigo_postal=address.get("postal_code"),
+            emails=_merge(structured.get("emails", []), scraped["emails"]),
+            telefonos=_merge(structured.get("telephones", []), scraped["phones"]),
+            redes_sociales=_social_links(structured.get("same_as", []), scraped["social"]),
             # Guardamos el análisis rico
             analisis=AnalisisIA(**ai_result) if ai_result else None,
-            score=0.0, # Scoring desactivado por ahora
-            tier="CANARIAS",
+            score=score,
+            tier=self.scorer.get_tier(score),
             machine_id=self.cfg.MACHINE_ID,
             nicho_origen=tarea.nicho,
         )
         
-        # 6. Guardar en Supabase
-        await self.db.upsert_organizacion(org)
+        # 7. Guardar en Supabase
+        with STAGE_SECONDS.time(stage="db_write"):
+            await self.db.upsert_organizacion(org)
+        TASKS_TOTAL.inc(outcome="saved")
+        # Guardado en Supabase o en el WAL: ya se puede confirmar el hash de la visita
+        if fingerprint:
+            await self.recrawl.observe(host, fingerprint, tarea)
         
-        # 7. Encolar URLs externas (mantenido para descubrimiento)
-        if tarea.nivel == 0:
-            for ext_url in scraped["external_links"][:5]:
-                nueva_tarea = TareaURL(url=ext_url, nivel=1, nicho=tarea.nicho)
-                await self.redis.rpush("scraping_queue", nueva_tarea.model_dump_json())
-
-    def _handle_shutdown(self):
-        """Maneja señales de apagado."""
-        logger.info("Iniciando apagado gracioso...")
+        # 8. Encolar URLs externas (mantenido para descubrimiento, deduplicado por dominio)
+        if discover and tarea.nivel == 0:
+            accepted = await self.queue.enqueue_batch(
+                scraped["external_links"][:5], nicho=tarea.nicho, nivel=1
+            )
+            logger.debug("Descubiertos %s dominios nuevos desde %s", accepted, url)
+        return True
+
+    @staticmethod
+    def _archive_fields(tarea: TareaURL) -> dict:
+        """Contexto de la tarea que se guarda junto a la respuesta en el WARC."""
+        fields = {"X-Nivel": str(tarea.nivel)}
+        if tarea.nicho:
+            fields["X-Nicho"] = tarea.nicho
+        return fields
+
+    async def _promote_due(self):
+        """Mueve a la cola reintentos y revisitas vencidos, como mucho una vez por intervalo."""
+        now = time.monotonic()
+        if now - self._last_promote < PROMOTE_INTERVAL:
+            return
+        self._last_promote = now
+        try:
+            moved = await self.queue.promote_due()
+            if moved:
+                logger.debug("%s reintentos devueltos a la cola", moved)
+            if now - self._last_recrawl_promote >= RECRAWL_PROMOTE_INTERVAL:
+                self._last_recrawl_promote = now
+                await self.recrawl.promote_due()
+        except Exception as e:
+            logger.warning("Error promoviendo tareas vencidas: %s", e)
+
+    def stop(self):
+        """Solicita apagado gracioso: termina la tarea en curso y sale del bucle."""
         self.running = False
 
     async def _cleanup(self):
-        """Limpia conexiones."""
-        if self.tor:
-            await self.tor.close()
-        if self.redis:
-            await self.redis.close()
-        
-        logger.info(f"Worker finalizado. Procesados: {self.processed}, Errores: {self.errors}")
-        logger.info(f"Tokens IA consumidos: {self.ai.get_token_count()}")
+        """Limpia conexiones (las compartidas las cierra su dueño)."""
+        logger.info("Worker finalizado. Procesados: %s, Errores: %s", self.processed, self.errors)
+        if self._owns_components:
+            await self.components.close()
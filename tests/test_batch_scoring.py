@@ -0,0 +1,154 @@
+"""Tests del scoring vectorizado y del comando rescore."""
+import asyncio
+import random
+
+from src.batch_scoring import RESCORE_COLUMNS, rescore, score_batch
+from src.feature_store import FeatureStore, load
+from src.models import Organizacion
+from src.scoring import (
+    CANARIAS_KEYWORDS, HIGH_PRIORITY_SECTORS, MEDIUM_PRIORITY_SECTORS, SIZE_MULTIPLIERS,
+    SPAIN_KEYWORDS, Scorer,
+)
+
+WORDS = ["empresa", "servicios", "Tenerife", "MADRID", "global", "Las Palmas", "", "consultora"]
+SECTORS = sorted(HIGH_PRIORITY_SECTORS | MEDIUM_PRIORITY_SECTORS) + ["otro", "", "Turismo"]
+SIZES = list(SIZE_MULTIPLIERS) + ["enorme", "Grande"]
+
+
+def _random_case(rng: random.Random):
+    words = WORDS + CANARIAS_KEYWORDS + SPAIN_KEYWORDS
+    scraped = {
+        "meta": {"title": " ".join(rng.sample(words, 2)), "description": rng.choice(WORDS)},
+        "emails": rng.sample(["info@acme.es", "x@gmail.com", "y@hotmail.com", "prensa@org.org"],
+                             rng.randint(0, 3)),
+        "phones": ["+34 922 000 000"] if rng.random() < 0.5 else [],
+        "social": {k: f"https://{k}.com/x" for k in rng.sample(["twitter", "facebook", "linkedin"],
+                                                              rng.randint(0, 3))},
+    }
+    if rng.random() < 0.2:
+        return scraped, None
+    ai = {
+        "sector": rng.choice(SECTORS),
+        "tamaño_estimado": rng.choice(SIZES),
+        "pain_points": ["p"] * rng.randint(0, 5),
+        "ambito_geografico": rng.choice(["", "regional", "Canarias", "nacional España"]),
+        "indicadores_calidad": {
+            "tiene_sala_prensa": rng.random() < 0.5,
+            "activo_comunicacion": rng.random() < 0.5,
+        },
+    }
+    return scraped, ai
+
+
+class FakeDB:
+    """Tabla en memoria con la misma interfaz de páginas que SupabaseClient."""
+
+    def __init__(self, rows):
+        self.rows = {row["dominio"]: row for row in rows}
+        self.pages = []
+        self.upserts = []
+
+    def fetch_page(self, columns, after=None, limit=1000):
+        assert columns == RESCORE_COLUMNS
+        self.pages.append(after)
+        keys = sorted(k for k in self.rows if after is None or k > after)[:limit]
+        return [dict(self.rows[k]) for k in keys]
+
+    def upsert_rows(self, rows):
+        self.upserts.append(rows)
+        for row in rows:
+            self.rows[row["dominio"]].update(row)
+        return len(rows)
+
+
+class TestBatchScoring:
+    """El scoring por lotes coincide exactamente con Scorer.calculate."""
+
+    def test_matches_scalar_scorer(self):
+        """Scores y tiers idénticos fila a fila en casos aleatorios."""
+        rng = random.Random(1234)
+        cases = [_random_case(rng) for _ in range(3000)]
+        scorer = Scorer()
+
+        scores, tiers = score_batch(cases)
+
+        expected = [scorer.calculate(s, a) for s, a in cases]
+        assert scores.tolist() == expected
+        assert tiers.tolist() == [scorer.get_tier(s) for s in expected]
+
+    def test_empty_batch(self):
+        """Un lote vacío devuelve arrays vacíos."""
+        scores, tiers = score_batch([])
+        assert len(scores) == 0 and len(tiers) == 0
+
+
+class TestRescore:
+    """Rescoring desde el feature store, por keyset y escribiendo solo lo que cambia."""
+
+    def _worker_rows(self, tmp_path, count=60, seed=3):
+        """Filas como las guarda el worker, con sus features en el store."""
+        rng = random.Random(seed)
+        scorer = Scorer()
+        store = FeatureStore(tmp_path, "test")
+        rows = []
+        for i in range(count):
+            scraped, ai = _random_case(rng)
+            domain = f"d{i:03d}.es"
+            score = scorer.calculate(scraped, ai)
+            org = Organizacion(url=f"https://{domain}", dominio=domain, score=score,
+                               tier=scorer.get_tier(score))
+            rows.append(org.to_supabase_dict())
+            store.record(domain, scraped, ai)
+        store.close()
+        return rows, load(tmp_path)
+
+    def test_worker_scored_rows_are_unchanged(self, tmp_path):
+        """Con los mismos pesos, rescore no toca lo que puntuó el worker."""
+        rows, features = self._worker_rows(tmp_path)
+        db = FakeDB(rows)
+
+        stats = asyncio.run(rescore(db, features, batch_size=25))
+
+        assert stats["rows"] == 60 and stats["changed"] == 0 and stats["skipped"] == 0
+        assert db.upserts == []
+        assert db.pages == [None, "d024.es", "d049.es", "d059.es"]
+
+    def test_stale_rows_are_updated(self, tmp_path):
+        """Las filas con score antiguo se reescriben con solo dominio, url, score y tier."""
+        rows, features = self._worker_rows(tmp_path)
+        expected = {row["dominio"]: (row["score"], row["tier"]) for row in rows}
+        for row in rows[::5]:
+            row.update(score=0.0, tier="CANARIAS")
+        db = FakeDB(rows)
+
+        stats = asyncio.run(rescore(db, features, batch_size=7))
+
+        assert stats["changed"] == 12
+        assert {d: (r["score"], r["tier"]) for d, r in db.rows.items()} == expected
+        assert set(db.upserts[0][0]) == {"dominio", "url", "score", "tier"}
+
+    def test_rows_without_features_are_skipped(self, tmp_path):
+        """Una fila sin registro en el store no se sobrescribe."""
+        rows, features = self._worker_rows(tmp_path, count=5)
+        orphan = {"dominio": "zz.es", "url": "https://zz.es", "score": 6.2, "tier": "B"}
+        db = FakeDB(rows + [orphan, {**orphan, "dominio": "a.es", "url": "https://a.es"}])
+
+        stats = asyncio.run(rescore(db, features, batch_size=3))
+
+        assert stats["skipped"] == 2 and stats["changed"] == 0
+        assert db.rows["zz.es"]["score"] == 6.2
+
+    def test_weights_and_dry_run(self, tmp_path):
+        """Con otros pesos cambian los scores; en dry-run no se escribe nada."""
+        rows, features = self._worker_rows(tmp_path)
+        db = FakeDB(rows)
+
+        stats = asyncio.run(rescore(db, features, dry_run=True, weights={"ubicacion_canarias": 5.0}))
+
+        assert stats["changed"] > 0 and db.upserts == []
+
+    def test_empty_store(self, tmp_path):
+        """Sin features se omiten todas las filas."""
+        rows, _ = self._worker_rows(tmp_path, count=3)
+        stats = asyncio.run(rescore(FakeDB(rows), load(tmp_path / "vacio"), batch_size=2))
+        assert stats["skipped"] == 3 and stats["changed"] == 0
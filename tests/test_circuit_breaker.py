@@ -0,0 +1,57 @@
+"""Tests del circuit breaker por host."""
+import asyncio
+
+import aiohttp
+import pytest
+from python_socks import ProxyConnectionError, ProxyError
+
+from src.utils.circuit_breaker import HostCircuitBreaker, classify_failure
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+def _response_error(status: int) -> aiohttp.ClientResponseError:
+    return aiohttp.ClientResponseError(request_info=None, history=(), status=status)
+
+
+class TestCircuitBreaker:
+    """Tests de clasificación de fallos y apertura por umbral."""
+
+    def test_classify_failure(self):
+        """Solo los fallos atribuibles al host cuentan."""
+        assert classify_failure(ProxyError("Host unreachable", 4)) == "dns"
+        assert classify_failure(ProxyConnectionError("tor caído")) is None
+        assert classify_failure(_response_error(403)) == "blocked"
+        assert classify_failure(_response_error(404)) is None
+        assert classify_failure(_response_error(503)) == "server_error"
+        assert classify_failure(asyncio.TimeoutError()) == "timeout"
+        assert classify_failure(aiohttp.ServerTimeoutError()) == "timeout"
+
+    def test_classify_connect_timeout(self, monkeypatch):
+        """El timeout de conexión se distingue si aiohttp lo expone; si no, cuenta como timeout."""
+        from src.utils import circuit_breaker
+
+        if hasattr(aiohttp, "ConnectionTimeoutError"):
+            assert classify_failure(aiohttp.ConnectionTimeoutError()) == "connect_timeout"
+        monkeypatch.setattr(circuit_breaker, "_CONNECT_TIMEOUT", ())
+        assert classify_failure(aiohttp.ServerTimeoutError()) == "timeout"
+
+    def test_opens_after_threshold_and_resets_on_success(self):
+        """DNS abre a los 2 fallos consecutivos; un éxito intermedio reinicia."""
+        async def run():
+            breaker = HostCircuitBreaker(fakeredis.FakeAsyncRedis())
+            dns = ProxyError("Host unreachable", 4)
+
+            assert await breaker.record_failure("caido.es", dns) is None
+            await breaker.record_success("caido.es")
+            assert await breaker.record_failure("caido.es", dns) is None
+            assert await breaker.is_open("caido.es") is None
+
+            assert await breaker.record_failure("caido.es", dns) == "dns"
+            assert await breaker.is_open("caido.es") == "dns"
+            assert await breaker.is_open("otro.es") is None
+
+            # Un 404 no dice nada del host
+            assert await breaker.record_failure("otro.es", _response_error(404)) is None
+
+        asyncio.run(run())
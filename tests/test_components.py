@@ -0,0 +1,65 @@
+"""Tests del registro de componentes compartidos por proceso."""
+import asyncio
+import os
+
+os.environ.setdefault("SUPABASE_URL", "https://test.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "test-key")
+os.environ.setdefault("OPENROUTER_API_KEY", "test-api-key")
+os.environ.setdefault("HTTP_CACHE_MAX_MB", "0")
+os.environ.setdefault("FEATURE_DIR", "")
+
+from src.components import ROTATE_EVERY, Components
+from src.main import worker_stats
+from src.utils.tor_client import TorClient
+from src.worker import Worker
+
+
+class FakeRouter:
+    def __init__(self):
+        self.renewals = 0
+
+    async def renew_identity(self):
+        self.renewals += 1
+        return True
+
+
+class TestComponents:
+    """Tests de reparto de clientes, rotación y cierre de sesiones."""
+
+    def test_workers_share_clients(self):
+        """Todos los workers usan los mismos clientes; los tokens no se cuentan N veces."""
+        components = Components(3)
+        workers = [Worker(components) for _ in range(3)]
+
+        assert len({id(w.ai) for w in workers}) == 1
+        assert all(w.scraper is components.scraper for w in workers)
+        components.ai.total_tokens = 100
+        assert worker_stats(workers)["tokens"] == 100
+        assert components.pool_size > components.concurrency
+
+    def test_rotation_counts_process_tasks(self):
+        """La IP rota cada ROTATE_EVERY tareas del proceso, no de cada worker."""
+        async def run():
+            components = Components(4)
+            components.tor = FakeRouter()
+            for _ in range(ROTATE_EVERY * 2 + 1):
+                await components.task_done()
+            assert components.tor.renewals == 2
+
+        asyncio.run(run())
+
+    def test_retired_session_survives_in_flight_requests(self):
+        """Rotar no cierra en el acto la sesión que usan los demás workers."""
+        async def run():
+            client = TorClient(pool_size=8)
+            old = await client._get_session()
+            assert old.connector.limit == 8
+
+            client._retire_session()
+            assert not old.closed
+            assert await client._get_session() is not old
+
+            await client.close()
+            assert old.closed
+
+        asyncio.run(run())
@@ -0,0 +1,104 @@
+"""Tests del control adaptativo de concurrencia."""
+import asyncio
+import random
+
+import pytest
+
+from src.utils.concurrency import AdaptiveLimiter
+
+
+class _Status(Exception):
+    def __init__(self, status):
+        self.status = status
+
+
+def _overload(exc):
+    return getattr(exc, "status", 500) in (429, 500)
+
+
+class TestAdaptiveLimiter:
+    """Tests de AIMD: aumento aditivo, reducción multiplicativa y límites."""
+
+    def test_additive_increase_up_to_ceiling(self):
+        """Con la etapa saturada y latencia estable, crece hasta el techo."""
+        limiter = AdaptiveLimiter("t_inc", floor=1, ceiling=4, initial=2)
+        for _ in range(50):
+            limiter.record(0.1, ok=True, saturated=True)
+        assert limiter.limit == 4
+
+    def test_no_increase_when_not_saturated(self):
+        """Sin saturación no hay evidencia de que más slots ayuden."""
+        limiter = AdaptiveLimiter("t_idle", floor=1, ceiling=8, initial=2)
+        for _ in range(20):
+            limiter.record(0.1, ok=True, saturated=False)
+        assert limiter.limit == 2
+
+    def test_overload_decreases_once_per_window(self):
+        """Una ráfaga de 429 reduce una sola vez y nunca baja del suelo."""
+        limiter = AdaptiveLimiter("t_dec", floor=2, ceiling=10, initial=10, cooldown=60)
+        for _ in range(5):
+            limiter.record(0.1, ok=False)
+        assert limiter.limit == pytest.approx(7.0)
+
+        for _ in range(10):
+            limiter._last_decrease = 0.0
+            limiter.record(0.1, ok=False)
+        assert limiter.limit == 2
+
+    def test_latency_inflation_counts_as_congestion(self):
+        """Si la latencia suavizada dobla la base, el límite baja."""
+        limiter = AdaptiveLimiter("t_lat", floor=1, ceiling=10, initial=10, smoothing=1.0)
+        limiter.record(0.1)
+        limiter.record(0.5)
+        assert limiter.limit < 10
+
+    def test_variable_latency_without_latency_signal(self):
+        """Sin señal de latencia (fetch), sitios lentos y rápidos no hunden el límite."""
+        rng = random.Random(1)
+        limiter = AdaptiveLimiter("t_var", floor=2, ceiling=12, initial=6, tolerance=None, cooldown=0)
+        for _ in range(500):
+            limiter._last_decrease = 0.0  # Cada muestra en su propia ventana
+            limiter.record(rng.lognormvariate(0, 0.5), ok=True, saturated=True)
+        assert limiter.limit == 12
+
+        limiter.record(1.0, ok=False)
+        assert limiter.limit < 12  # Los errores de sobrecarga siguen reduciendo
+
+    def test_unrecorded_slot_does_not_feed_control(self):
+        """Un slot con record=False ocupa capacidad pero no cuenta como muestra."""
+        limiter = AdaptiveLimiter("t_norec", floor=1, ceiling=4, initial=1, is_overload=_overload)
+
+        async def scenario():
+            for _ in range(5):
+                async with limiter.slot(record=False):
+                    assert limiter.inflight == 1
+            with pytest.raises(_Status):
+                async with limiter.slot(record=False):
+                    raise _Status(429)
+
+        asyncio.run(scenario())
+        assert limiter.limit == 1 and limiter.latency_ewma is None and limiter.inflight == 0
+
+    def test_slot_blocks_beyond_limit(self):
+        """Nunca hay más slots ocupados que el límite; los 4xx no penalizan."""
+        limiter = AdaptiveLimiter("t_slot", floor=2, ceiling=2, is_overload=_overload)
+        peak = 0
+
+        async def job(fail):
+            nonlocal peak
+            try:
+                async with limiter.slot():
+                    peak = max(peak, limiter.inflight)
+                    await asyncio.sleep(0.01)
+                    if fail:
+                        raise _Status(404)
+            except _Status:
+                pass
+
+        async def scenario():
+            await asyncio.gather(*(job(i % 2 == 0) for i in range(6)))
+
+        asyncio.run(scenario())
+        assert peak == 2
+        assert limiter.inflight == 0
+        assert limiter.limit == 2
@@ -0,0 +1,60 @@
+"""Tests de extracción del contenido principal."""
+from bs4 import BeautifulSoup
+
+from src.content_extractor import extract_main_content
+from src.scraper import Scraper
+
+PARAGRAPH = (
+    "La asociación trabaja desde hace veinte años con las familias del barrio y organiza "
+    "actividades culturales, deportivas y de apoyo a las personas mayores de la isla, con "
+    "la ayuda de más de cien voluntarios."
+)
+
+PAGE = f"""
+<html><body>
+  <div id="cookie-notice">Utilizamos cookies propias y de terceros para mejorar la experiencia
+    de navegación y ofrecer contenidos de interés. Al continuar navegando acepta su uso.</div>
+  <header><a href="/">Inicio</a> <a href="/quienes-somos">Quiénes somos</a></header>
+  <div class="et_pb_menu"><ul><li><a href="/a">Proyectos</a></li><li><a href="/b">Noticias</a></li></ul></div>
+  <main>
+    <article>
+      <header><h1>Quiénes somos</h1></header>
+      <p>{PARAGRAPH}</p>
+      <p>Sede en La Laguna</p>
+      <p>{PARAGRAPH}</p>
+      <h2>Enlaces</h2>
+      <p><a href="/1">Uno</a> <a href="/2">Dos</a> <a href="/3">Tres</a> <a href="/4">Cuatro</a></p>
+    </article>
+  </main>
+  <div class="widget social-share">Compartir en Facebook Twitter</div>
+  <footer>© 2024 Asociación. Todos los derechos reservados.</footer>
+</body></html>
+"""
+
+
+class TestContentExtractor:
+    """Tests de limpieza de boilerplate y encabezados."""
+
+    def test_keeps_main_content_and_drops_boilerplate(self):
+        """Fuera cookies, menús, widgets y pie; dentro el cuerpo y su título."""
+        main = extract_main_content(BeautifulSoup(PAGE, "lxml"))
+
+        assert main.text.startswith("Quiénes somos\nLa asociación trabaja")
+        assert "Sede en La Laguna" in main.text  # Corto entre dos bloques buenos
+        for boilerplate in ("cookies", "Proyectos", "Compartir", "derechos reservados", "Cuatro"):
+            assert boilerplate not in main.text
+        assert main.headings == ["Quiénes somos"]
+
+    def test_minimal_page_falls_back_to_visible_text(self):
+        """Sin bloques largos se devuelve el texto visible en vez de nada."""
+        main = extract_main_content(BeautifulSoup("<html><body><p>Club de lucha canaria</p></body></html>", "lxml"))
+        assert main.text == "Club de lucha canaria"
+
+    def test_parse_does_not_mutate_tree(self):
+        """El extractor no destruye el árbol: los demás extractores siguen viendo todo."""
+        html = PAGE.replace("</body>", '<script type="application/ld+json">{"@type": "NGO", "name": "AV"}</script></body>')
+        result = Scraper().parse(html, "https://asociacion.es")
+
+        assert result["structured"]["name"] == "AV"
+        assert result["headings"] == ["Quiénes somos"]
+        assert "https://asociacion.es/quienes-somos" in result["internal_links"]
@@ -0,0 +1,124 @@
+"""Tests del descubrimiento de páginas internas vía robots.txt y sitemaps."""
+import asyncio
+import gzip
+
+import pytest
+
+from src.scraper import merge_pages
+from src.utils.discovery import MAX_SITEMAP_BYTES, SiteDiscovery, iter_sitemap, parse_robots, rank_urls
+
+fakeredis = pytest.importorskip("fakeredis")
+
+URLSET = b"""<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <url><loc>https://asociacion.es/blog/2019/05/fiesta</loc><lastmod>2019-05-01</lastmod></url>
+  <url><loc>https://asociacion.es/transparencia/</loc><lastmod>2025-01-10T10:00:00+00:00</lastmod></url>
+  <url><loc>https://asociacion.es/qui%C3%A9nes-somos</loc></url>
+  <url><loc>https://asociacion.es/privado/memoria</loc></url>
+  <url><loc>https://otra.es/contacto</loc></url>
+</urlset>"""
+
+INDEX = b"""<?xml version="1.0" encoding="UTF-8"?>
+<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <sitemap><loc>https://asociacion.es/post-sitemap.xml</loc></sitemap>
+  <sitemap><loc>https://asociacion.es/page-sitemap.xml.gz</loc></sitemap>
+</sitemapindex>"""
+
+
+class FakeClient:
+    """Sitio en memoria: URL -> cuerpo (o 404)."""
+
+    def __init__(self, pages: dict):
+        self.pages = pages
+        self.calls = []
+        self.limits = {}
+
+    async def get_bytes(self, url, headers=None, max_bytes=None):
+        self.calls.append(url)
+        self.limits[url] = max_bytes
+        if url not in self.pages:
+            raise ConnectionError(f"404: {url}")
+        return self.pages[url]
+
+    async def get(self, url, headers=None):
+        return (await self.get_bytes(url)).decode()
+
+
+class TestDiscovery:
+    """Tests de parseo de sitemaps, ranking y caché por dominio."""
+
+    def test_iter_sitemap_plain_gzip_and_broken(self):
+        """Lee urlset plano y gzip; un XML cortado conserva lo leído."""
+        assert len(list(iter_sitemap(URLSET))) == 5
+        assert [e.loc for e in iter_sitemap(gzip.compress(URLSET))][1] == "https://asociacion.es/transparencia/"
+        entries = list(iter_sitemap(INDEX))
+        assert {e.kind for e in entries} == {"sitemap"}
+        assert len(list(iter_sitemap(URLSET[:URLSET.index(b"privado")]))) == 3
+
+    def test_rank_urls(self):
+        """Transparencia primero, blog fuera, solo el mismo host."""
+        entries = [(e.loc, e.lastmod) for e in iter_sitemap(URLSET)]
+        ranked = rank_urls(entries, "asociacion.es")
+        assert ranked[0] == "https://asociacion.es/transparencia/"
+        assert "https://asociacion.es/qui%C3%A9nes-somos" in ranked
+        assert not any("blog" in url or "otra.es" in url for url in ranked)
+
+    def test_robots_sitemaps_and_rules(self):
+        """Sitemaps declarados o /sitemap.xml por defecto; Disallow aplica."""
+        robots, sitemaps = parse_robots(
+            "User-agent: *\nDisallow: /privado/\nSitemap: https://asociacion.es/sm.xml", "https://asociacion.es/"
+        )
+        assert sitemaps == ["https://asociacion.es/sm.xml"]
+        assert not robots.can_fetch("*", "https://asociacion.es/privado/memoria")
+        assert parse_robots("", "https://asociacion.es/")[1] == ["https://asociacion.es/sitemap.xml"]
+
+    def test_discover_follows_index_and_caches(self):
+        """Índice -> sitemap de páginas (gzip) primero; la segunda llamada sale de Redis."""
+        async def run():
+            client = FakeClient({
+                "https://asociacion.es/robots.txt": (
+                    b"User-agent: *\nDisallow: /privado/\n"
+                    b"Sitemap: https://asociacion.es/sitemap_index.xml"
+                ),
+                "https://asociacion.es/sitemap_index.xml": INDEX,
+                "https://asociacion.es/page-sitemap.xml.gz": gzip.compress(URLSET),
+            })
+            discovery = SiteDiscovery(client, fakeredis.FakeAsyncRedis(), max_sitemaps=2)
+
+            ranked = await discovery.discover("https://asociacion.es/")
+            assert ranked[0] == "https://asociacion.es/transparencia/"
+            assert "https://asociacion.es/privado/memoria" not in ranked
+            assert client.calls[2] == "https://asociacion.es/page-sitemap.xml.gz"
+            assert client.limits[client.calls[2]] == MAX_SITEMAP_BYTES  # Descarga acotada
+
+            fetched = len(client.calls)
+            assert await discovery.discover("https://www.asociacion.es/") == ranked
+            assert len(client.calls) == fetched
+
+        asyncio.run(run())
+
+    def test_discover_falls_back_to_internal_links(self):
+        """Sin robots ni sitemap se ordenan los enlaces internos de la portada."""
+        async def run():
+            discovery = SiteDiscovery(FakeClient({}))
+            ranked = await discovery.discover(
+                "https://club.es/", ["https://club.es/noticias", "https://club.es/contacto"]
+            )
+            assert ranked == ["https://club.es/contacto"]
+
+        asyncio.run(run())
+
+    def test_merge_pages(self):
+        """Contactos y códigos postales de las páginas internas se suman a la portada."""
+        home = {
+            "meta": {"title": "Club"}, "emails": ["a@club.es"], "phones": [], "social": {},
+            "structured": {"postal_codes": [], "name": "Club"}, "text_content": "Inicio",
+            "internal_links": [], "external_links": [],
+        }
+        contact = dict(home, emails=["a@club.es", "b@club.es"], text_content="Calle 1, 38001",
+                       structured={"postal_codes": ["38001"], "name": None})
+        merged = merge_pages(home, [contact])
+        assert merged["emails"] == ["a@club.es", "b@club.es"]
+        assert merged["structured"]["postal_codes"] == ["38001"]
+        assert merged["structured"]["name"] == "Club"
+        assert merged["text_content"] == "Inicio Calle 1, 38001"
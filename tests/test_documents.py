@@ -0,0 +1,124 @@
+"""Tests de ingesta de documentos enlazados (PDF/DOCX)."""
+import asyncio
+import hashlib
+import io
+import time
+import zipfile
+
+import pytest
+
+from src.scraper import Scraper
+from src.utils import documents
+from src.utils.documents import TEXT_PREFIX, DocumentIngestor, extract_text, rank_documents
+from src.utils.tor_client import ResponseTooLarge
+
+fakeredis = pytest.importorskip("fakeredis")
+
+W = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+
+
+def _docx(*paragraphs: str) -> bytes:
+    body = "".join(f"<w:p><w:r><w:t>{p}</w:t></w:r></w:p>" for p in paragraphs)
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("word/document.xml", f'<w:document xmlns:w="{W}"><w:body>{body}</w:body></w:document>')
+    return buffer.getvalue()
+
+
+def _hang(data: bytes, max_pages: int) -> str:
+    """Extracción que no termina (se importa por nombre en el proceso del pool)."""
+    time.sleep(60)
+    return ""
+
+
+class FakeClient:
+    def __init__(self, files: dict):
+        self.files = files
+
+    async def get_bytes(self, url, max_bytes=None):
+        data = self.files[url]
+        if max_bytes is not None and len(data) > max_bytes:
+            raise ResponseTooLarge(url)
+        return data
+
+
+class TestDocuments:
+    """Tests de detección, ranking, extracción y caché por hash."""
+
+    def test_scraper_detects_linked_documents(self):
+        """Enlaces .pdf/.docx de cualquier dominio, con su texto."""
+        html = """<html><body>
+            <a href="/docs/Memoria_2023.pdf">Memoria anual</a>
+            <a href="https://cdn.org/estatutos.docx">Estatutos</a>
+            <a href="/contacto">Contacto</a>
+        </body></html>"""
+        documents = Scraper().parse(html, "https://asociacion.es")["documents"]
+
+        assert {"url": "https://asociacion.es/docs/Memoria_2023.pdf", "text": "Memoria anual"} in documents
+        assert len(documents) == 2
+
+    def test_rank_documents(self):
+        """Memorias antes que estatutos; el menú del bar no entra."""
+        documents = [
+            {"url": "https://a.es/menu-bar.pdf", "text": "Menú"},
+            {"url": "https://a.es/estatutos.pdf", "text": ""},
+            {"url": "https://a.es/doc1.pdf", "text": "Memoria de actividades"},
+        ]
+        ranked = rank_documents(documents, limit=5)
+        assert [d["url"] for d in ranked] == ["https://a.es/doc1.pdf", "https://a.es/estatutos.pdf"]
+
+    def test_extract_text_by_signature(self):
+        """DOCX por firma ZIP, con párrafos; lo desconocido da texto vacío."""
+        text = extract_text(_docx("Presupuesto 2024", "Subvención del Cabildo"))
+        assert text == "Presupuesto 2024\nSubvención del Cabildo"
+        assert extract_text(b"<html>no</html>") == ""
+
+    def test_ingest_caches_by_hash_and_caps_size(self):
+        """El texto queda cacheado por sha256; los documentos grandes se omiten."""
+        async def run():
+            data = _docx("Memoria de actividades 2023")
+            client = FakeClient({
+                "https://a.es/memoria.docx": data,
+                "https://a.es/memoria-grande.docx": data + b"\0" * 2048,
+            })
+            redis_client = fakeredis.FakeAsyncRedis()
+            ingestor = DocumentIngestor(client, redis_client, max_files=2, max_bytes=len(data) + 100, workers=1)
+
+            text = await ingestor.ingest([
+                {"url": "https://a.es/memoria.docx", "text": ""},
+                {"url": "https://a.es/memoria-grande.docx", "text": ""},
+            ])
+            assert text == "[memoria.docx]\nMemoria de actividades 2023"
+            cached = await redis_client.get(TEXT_PREFIX + hashlib.sha256(data).hexdigest())
+            assert cached == b"Memoria de actividades 2023"
+
+        asyncio.run(run())
+
+    def test_timeout_replaces_hung_pool(self, monkeypatch):
+        """Una extracción colgada mata su proceso; la siguiente usa un pool nuevo."""
+        async def run():
+            data = _docx("Memoria de actividades 2023")
+            client = FakeClient({"https://a.es/memoria.docx": data})
+            ingestor = DocumentIngestor(client, timeout=3, workers=1)
+
+            processes = []
+            discard = documents.discard_document_pool
+
+            def spy(pool):
+                processes.extend(pool._processes.values())
+                discard(pool)
+
+            monkeypatch.setattr(documents, "discard_document_pool", spy)
+            monkeypatch.setattr(documents, "extract_text", _hang)
+            hung = documents.get_document_pool(1)
+            assert await ingestor.ingest([{"url": "https://a.es/memoria.docx"}]) == ""
+            for process in processes:
+                process.join(timeout=5)
+            assert processes and not any(p.is_alive() for p in processes)
+
+            monkeypatch.setattr(documents, "extract_text", extract_text)
+            assert documents.get_document_pool(1) is not hung
+            text = await ingestor.ingest([{"url": "https://a.es/memoria.docx"}])
+            assert text == "[memoria.docx]\nMemoria de actividades 2023"
+
+        asyncio.run(run())
@@ -0,0 +1,160 @@
+"""Tests del enrutado de salida directo/Tor."""
+import asyncio
+import os
+import sqlite3
+import time
+
+os.environ.setdefault("SUPABASE_URL", "https://test.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "test-key")
+os.environ.setdefault("OPENROUTER_API_KEY", "test-api-key")
+os.environ.setdefault("HTTP_CACHE_MAX_MB", "0")
+
+import aiohttp
+
+from src.utils.egress import BlockedError, DirectClient, EgressRouter, looks_blocked
+from src.utils.http_cache import HttpCache
+
+
+def _router(mode="auto", direct_domains=()):
+    router = EgressRouter()
+    router.mode = mode
+    router.direct_domains = tuple(direct_domains)
+    calls = []
+
+    def fake(route, responses):
+        async def get(url, headers=None):
+            calls.append((route, url))
+            result = responses.pop(0)
+            if isinstance(result, Exception):
+                raise result
+            return result
+        return get
+
+    return router, calls, fake
+
+
+class TestEgressRouter:
+    """Tests de la política y del aprendizaje por dominio."""
+
+    def test_block_learns_tor_for_domain(self):
+        """Un 403 directo reintenta por Tor y el dominio queda en Tor."""
+        async def run():
+            router, calls, fake = _router()
+            blocked = aiohttp.ClientResponseError(request_info=None, history=(), status=403)
+            router.direct.get = fake("direct", [blocked])
+            router.tor.get = fake("tor", ["<html>ok</html>", "<html>ok2</html>"])
+
+            assert await router.get("https://www.waf.es/") == "<html>ok</html>"
+            assert await router.get("https://otra.waf.es/x") == "<html>ok2</html>"
+            assert [c[0] for c in calls] == ["direct", "tor", "tor"]
+
+        asyncio.run(run())
+
+    def test_site_errors_do_not_switch_route(self):
+        """Un 404 no es bloqueo: se propaga sin pasar a Tor."""
+        async def run():
+            router, calls, fake = _router()
+            missing = aiohttp.ClientResponseError(request_info=None, history=(), status=404)
+            router.direct.get = fake("direct", [missing, "<html>ok</html>"])
+            router.tor.get = fake("tor", [])
+
+            try:
+                await router.get("https://sitio.es/no-existe")
+                raise AssertionError("debía propagar el 404")
+            except aiohttp.ClientResponseError:
+                pass
+            assert await router.get("https://sitio.es/") == "<html>ok</html>"
+            assert [c[0] for c in calls] == ["direct", "direct"]
+
+        asyncio.run(run())
+
+    def test_policy_modes(self):
+        """El modo tor ignora las listas; en auto los sufijos forzados mandan."""
+        async def run():
+            router, _, _ = _router(mode="tor")
+            assert await router._route("gobiernodecanarias.org") == "tor"
+            router, _, _ = _router(mode="auto", direct_domains=["gobiernodecanarias.org"])
+            assert await router._route("gobiernodecanarias.org") == "direct"
+
+        asyncio.run(run())
+
+    def test_looks_blocked(self):
+        """Título de desafío, o marcador específico con estado de bloqueo; solo en páginas cortas."""
+        assert looks_blocked("<title>Attention Required! | Cloudflare</title>")
+        assert looks_blocked("<title>Just a moment...</title>" + "x" * 100)
+        assert not looks_blocked("<title>Just a moment...</title>" + "x" * 30_000)
+        assert not looks_blocked("<html><body>Asociación vecinal</body></html>")
+        # Palabras genéricas en sitios normales no son desafíos
+        assert not looks_blocked("<title>Contacto</title><form>captcha</form><p>Access denied</p>")
+        challenge = '<script src="/cdn-cgi/challenge-platform/h/b/orchestrate/chl_page/v1"></script>'
+        assert looks_blocked(challenge, 503)
+        assert not looks_blocked(challenge, 200)
+        assert looks_blocked('<iframe src="/_Incapsula_Resource?SWUDNSAI=31"></iframe>', 403)
+
+    def test_direct_client_detects_503_challenge(self):
+        """Un 503 con desafío es bloqueo; un 503 normal sigue siendo error del sitio."""
+        class FakeContent:
+            def __init__(self, body):
+                self.body = body
+
+            async def read(self, n=-1):
+                return self.body[:n]
+
+        class FakeResponse:
+            def __init__(self, status, body):
+                self.status = status
+                self.content = FakeContent(body)
+
+            def raise_for_status(self):
+                if self.status >= 400:
+                    raise aiohttp.ClientResponseError(request_info=None, history=(), status=self.status)
+
+        async def run():
+            client = DirectClient()
+            client.detect_challenges = True
+            challenge = b'<title>Un momento</title><div id="cf-chl-widget"></div>'
+            try:
+                await client._check_status(FakeResponse(503, challenge))
+                raise AssertionError("debía detectar el desafío")
+            except BlockedError:
+                pass
+            try:
+                await client._check_status(FakeResponse(503, b"<h1>Mantenimiento</h1>"))
+                raise AssertionError("debía propagar el 503")
+            except aiohttp.ClientResponseError as e:
+                assert e.status == 503
+            await client._check_status(FakeResponse(200, challenge))
+            await client.close()
+
+        asyncio.run(run())
+
+    def test_direct_client_verifies_certificates(self):
+        """La conexión directa no hereda ``ssl=False`` del cliente Tor."""
+        async def run():
+            connector = DirectClient()._connector()
+            try:
+                return connector._ssl
+            finally:
+                await connector.close()
+
+        assert asyncio.run(run()) is not False
+
+    def test_close_flushes_shared_http_cache(self, tmp_path):
+        """Cerrar el router vuelca los accesos en buffer de la caché compartida al índice."""
+        async def run():
+            router = EgressRouter()
+            cache = HttpCache(tmp_path, max_bytes=10_000_000, fresh_seconds=60)
+            router.tor.cache = router.direct.cache = cache
+            await cache.store("https://a.es/", b"<html></html>", None, None, None)
+            await asyncio.sleep(0.01)
+            accessed_at = time.time()
+            await cache.lookup("https://a.es/")  # Acceso en buffer, aún sin escribir
+            await router.close()
+            return accessed_at
+
+        accessed_at = asyncio.run(run())
+        with sqlite3.connect(tmp_path / "index.sqlite") as db:
+            (last_access,) = db.execute(
+                "SELECT last_access FROM entries WHERE url = ?", ("https://a.es/",)
+            ).fetchone()
+        assert last_access >= accessed_at
@@ -0,0 +1,148 @@
+"""Tests de la exportación masiva por keyset."""
+import asyncio
+import csv
+import json
+import threading
+import time
+
+import pytest
+
+from src.config import ConfigError
+from src.export import ExportFilters, JsonlExport, WRITERS, export, format_for, key_ranges, pq
+
+OPS = {
+    "eq": lambda a, b: a == b,
+    "in_": lambda a, b: a in b,
+    "gt": lambda a, b: a is not None and a > b,
+    "gte": lambda a, b: a is not None and a >= b,
+    "lt": lambda a, b: a is not None and a < b,
+    "lte": lambda a, b: a is not None and a <= b,
+}
+
+
+class FakeDB:
+    """Tabla en memoria que aplica filtros y keyset como el query builder."""
+
+    def __init__(self, rows, delay: float = 0.0):
+        self.rows = sorted(rows, key=lambda r: r["dominio"])
+        self.delay = delay
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def fetch_page(self, columns, after=None, limit=1000, filters=()):
+        time.sleep(self.delay)
+        with self.lock:
+            self.calls.append((after, list(filters)))
+        selected = columns.split(",")
+        matches = [
+            r for r in self.rows
+            if all(OPS[op](r.get(col), value) for op, col, value in filters)
+            and (after is None or r["dominio"] > after)
+        ]
+        return [{c: r.get(c) for c in selected} for r in matches[:limit]]
+
+
+def _rows(n=500):
+    return [
+        {
+            "dominio": f"{'abcdefghijklmnopqrstuvwxyz0123456789'[i % 36]}{i:05d}.es",
+            "url": f"https://d{i}.es",
+            "emails": [f"info@d{i}.es"],
+            "redes_sociales": {"twitter": f"https://x.com/d{i}"} if i % 2 else {},
+            "score": round(i % 100 / 10, 1),
+            "tier": "ABCD"[i % 4],
+            "nicho_origen": "turismo" if i % 3 == 0 else "salud",
+        }
+        for i in range(n)
+    ]
+
+
+class TestExport:
+    """Rangos concurrentes, filtros, formatos y memoria acotada."""
+
+    def test_key_ranges_cover_everything(self):
+        """Los rangos son contiguos y abiertos en los extremos."""
+        ranges = key_ranges(4)
+        assert len(ranges) == 4
+        assert ranges[0][0] is None and ranges[-1][1] is None
+        assert all(a[1] == b[0] for a, b in zip(ranges, ranges[1:]))
+        assert key_ranges(1) == [(None, None)]
+        assert len(key_ranges(1000)) == 36
+
+    def test_export_jsonl_all_rows(self, tmp_path):
+        """Todas las filas salen una sola vez, con varios rangos y páginas pequeñas."""
+        db = FakeDB(_rows())
+        out = tmp_path / "leads.jsonl"
+
+        written = asyncio.run(export(db, out, "jsonl", columns=["url", "score"], page_size=7,
+                                     concurrency=6))
+
+        lines = [json.loads(line) for line in out.read_text().splitlines()]
+        assert written == len(lines) == 500
+        assert sorted(l["dominio"] for l in lines) == [r["dominio"] for r in db.rows]
+        assert set(lines[0]) == {"dominio", "url", "score"}
+        assert not (tmp_path / "leads.jsonl.part").exists()
+        # Keyset: cada consulta tras la primera de su rango parte del último dominio visto
+        assert sum(1 for after, _ in db.calls if after is None) == 6
+
+    def test_filters(self, tmp_path):
+        """Tier, score y nicho se traducen a filtros de la consulta."""
+        db = FakeDB(_rows())
+        out = tmp_path / "leads.csv"
+        filters = ExportFilters(tiers=["A", "B"], min_score=5.0, nichos=["turismo"])
+
+        asyncio.run(export(db, out, "csv", filters, page_size=50, concurrency=3))
+
+        with open(out, newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+        expected = [r for r in db.rows
+                    if r["tier"] in "AB" and r["score"] >= 5.0 and r["nicho_origen"] == "turismo"]
+        assert sorted(r["dominio"] for r in rows) == [r["dominio"] for r in expected]
+        assert rows[0]["emails"].startswith("info@")
+        assert all(r["redes_sociales"] in ("", "{}") or r["redes_sociales"].startswith("{") for r in rows)
+
+    def test_memory_is_bounded(self, tmp_path, monkeypatch):
+        """Con un escritor lento, las páginas leídas y no escritas no crecen."""
+        db = FakeDB(_rows(2000), delay=0.001)
+        in_flight, written = [], [0]
+
+        class SlowWriter(JsonlExport):
+            def write(self, rows):
+                with db.lock:
+                    in_flight.append(len(db.calls) - written[0])
+                time.sleep(0.005)
+                super().write(rows)
+                written[0] += 1
+
+        monkeypatch.setitem(WRITERS, "jsonl", SlowWriter)
+
+        asyncio.run(export(db, tmp_path / "out.jsonl", "jsonl", page_size=20, concurrency=4))
+
+        # Cola (4) + una página por rango esperando (4) + la que se escribe + consultas vacías finales
+        assert max(in_flight) <= 4 + 4 + 1 + 4
+
+    def test_read_error_removes_partial_file(self, tmp_path):
+        """Si falla una consulta no queda archivo final ni parcial."""
+        class BrokenDB(FakeDB):
+            def fetch_page(self, columns, after=None, limit=1000, filters=()):
+                if after is not None:
+                    raise ConnectionError("timeout")
+                return super().fetch_page(columns, after, limit, filters)
+
+        out = tmp_path / "leads.csv"
+        with pytest.raises(ConnectionError):
+            asyncio.run(export(BrokenDB(_rows()), out, "csv", page_size=5, concurrency=4))
+        assert list(tmp_path.iterdir()) == []
+
+    def test_format_for(self):
+        """El formato se deduce de la extensión."""
+        assert format_for("a.csv") == "csv"
+        assert format_for("a.ndjson") == "jsonl"
+        assert format_for("a.parquet") == "parquet"
+        assert format_for("a.txt") == "csv"
+
+    @pytest.mark.skipif(pq is not None, reason="pyarrow instalado")
+    def test_parquet_without_pyarrow(self, tmp_path):
+        """Sin pyarrow, pedir Parquet es un error de configuración claro."""
+        with pytest.raises(ConfigError, match="pyarrow"):
+            asyncio.run(export(FakeDB(_rows(5)), tmp_path / "a.parquet", "parquet"))
@@ -0,0 +1,139 @@
+"""Tests del feature store de scoring."""
+import random
+
+import numpy as np
+
+from src.batch_scoring import score_features, scoring_columns
+from src.feature_store import (
+    RECORD_DTYPE, FeatureStore, collect, compact, feature_files, load, read_segment,
+)
+from src.scoring import WEIGHTS, Scorer
+from tests.test_batch_scoring import _random_case
+
+
+class TestFeatureStore:
+    """Escritura append-only, carga columnar y compactación."""
+
+    def test_scores_from_store_match_scorer(self, tmp_path):
+        """Puntuar desde el store da lo mismo que el scorer con los datos originales."""
+        rng = random.Random(7)
+        cases = {f"d{i:04d}.es": _random_case(rng) for i in range(500)}
+        store = FeatureStore(tmp_path, "test")
+        for domain, (scraped, ai) in cases.items():
+            assert store.record(domain, scraped, ai)
+        store.close()
+
+        records = load(tmp_path)
+        scores, tiers = score_features(scoring_columns(records))
+
+        scorer = Scorer()
+        expected = [scorer.calculate(*cases[d.decode()]) for d in records["dominio"]]
+        assert scores.tolist() == expected
+        assert tiers.tolist() == [scorer.get_tier(s) for s in expected]
+
+    def test_weight_overrides(self, tmp_path):
+        """Cambiar un peso cambia los scores sin volver a extraer features."""
+        store = FeatureStore(tmp_path, "test")
+        ai = {"sector": "turismo", "tamaño_estimado": "grande", "pain_points": []}
+        store.record("a.es", {"meta": {"title": "Tenerife"}}, ai)
+        store.close()
+        columns = scoring_columns(load(tmp_path))
+
+        base, _ = score_features(columns)
+        boosted, _ = score_features(columns, {"sector_priority": WEIGHTS["sector_priority"] + 2})
+        assert boosted[0] == round(base[0] + 2, 1)
+
+    def test_latest_record_per_domain(self, tmp_path):
+        """Gana el último registro de cada dominio, aunque esté en otro segmento."""
+        first = FeatureStore(tmp_path, "a")
+        first.record("x.es", {"emails": ["a@x.es"]}, None)
+        first.record("y.es", {}, None)
+        first.close()
+        second = FeatureStore(tmp_path, "b")
+        second.record("x.es", {"emails": ["a@x.es", "b@x.es", "c@x.es"]}, {"sector": "ong"})
+        second.flush()
+
+        records = load(tmp_path)  # Incluye el segmento aún abierto
+        assert records["dominio"].tolist() == [b"x.es", b"y.es"]
+        assert records["emails"].tolist() == [3, 0]
+        assert records["has_ai"].tolist() == [True, False]
+
+        second.close()
+        assert len(feature_files(tmp_path, include_open=False)) == 2
+
+    def test_extra_features(self, tmp_path):
+        """Se guardan conteos del análisis que Supabase no persiste."""
+        store = FeatureStore(tmp_path, "test")
+        ai = {
+            "indicadores_calidad": {"tiene_ssl": True, "sitio_profesional": True},
+            "conocimiento_profundo": {"retos_objetivos": ["a", "b"], "financiacion": ["c"]},
+            "oportunidades_detectadas": {"productos_encajan": ["clipping"]},
+            "servicios": ["s"] * 300,
+        }
+        store.record("a.es", {"social": {f"r{i}": "" for i in range(300)}}, ai)
+        store.close()
+
+        row = load(tmp_path)[0]
+        assert row["ssl"] and row["professional"] and not row["contact"]
+        assert (row["challenges"], row["funding"], row["products_fit"]) == (2, 1, 1)
+        assert row["services"] == 255 and row["social"] == 255  # Conteos saturados, no desbordados
+
+    def test_truncated_and_foreign_segments(self, tmp_path):
+        """Un registro a medias se ignora y un archivo ajeno no rompe la carga."""
+        store = FeatureStore(tmp_path, "test")
+        store.record("a.es", {}, None)
+        store.record("b.es", {}, None)
+        store.close()
+        segment = feature_files(tmp_path)[0]
+        with open(segment, "ab") as f:
+            f.write(b"\x00" * (RECORD_DTYPE.itemsize // 2))
+        (tmp_path / "otro.feat").write_bytes(b"no es un segmento")
+
+        assert len(read_segment(segment)) == 2
+        assert load(tmp_path)["dominio"].tolist() == [b"a.es", b"b.es"]
+
+    def test_long_domain_is_skipped(self, tmp_path):
+        """Un dominio que no cabe en el registro no se guarda."""
+        store = FeatureStore(tmp_path, "test")
+        assert not store.record("x" * 200 + ".es", {}, None)
+        store.close()
+        assert len(load(tmp_path)) == 0
+
+    def test_compact(self, tmp_path):
+        """La compactación funde los sellados y respeta los abiertos."""
+        for writer in ("a", "b", "c"):
+            store = FeatureStore(tmp_path, writer)
+            for i in range(10):
+                store.record(f"d{i}.es", {"phones": [writer]}, None)
+            store.close()
+        live = FeatureStore(tmp_path, "live")
+        live.record("nuevo.es", {}, None)
+        live.flush()
+
+        assert compact(tmp_path) == 10
+        assert len(feature_files(tmp_path, include_open=False)) == 1
+        records = load(tmp_path)
+        assert len(records) == 11
+        assert np.all(records["phone"][records["dominio"] != b"nuevo.es"])
+        live.close()
+
+    def test_collect_from_other_machines(self, tmp_path):
+        """Se copian solo los sellados, una vez, y gana el registro más reciente."""
+        machine_a, machine_b, local = tmp_path / "a", tmp_path / "b", tmp_path / "local"
+        store_a = FeatureStore(machine_a, "a_1")
+        store_a.record("x.es", {"emails": ["a@x.es"]}, None)
+        store_a.close()
+        store_b = FeatureStore(machine_b, "b_1")
+        store_b.record("x.es", {"emails": ["a@x.es", "b@x.es"]}, None)
+        store_b.close()
+        pending = FeatureStore(machine_b, "b_2")
+        pending.record("y.es", {}, None)
+        pending.flush()  # Abierto: aún no se copia
+
+        assert collect([machine_a, machine_b], local) == 2
+        assert collect([machine_a, machine_b, local], local) == 0
+        records = load(local)
+        assert records["dominio"].tolist() == [b"x.es"]
+        assert records["emails"].tolist() == [2]
+        assert not list(local.glob("*.tmp"))
+        pending.close()
@@ -0,0 +1,109 @@
+"""Tests de la caché HTTP en disco."""
+import asyncio
+import os
+import sqlite3
+
+os.environ.setdefault("SUPABASE_URL", "https://test.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "test-key")
+os.environ.setdefault("OPENROUTER_API_KEY", "test-api-key")
+os.environ.setdefault("HTTP_CACHE_MAX_MB", "0")
+
+from aiohttp import web
+
+from src.utils.egress import DirectClient
+from src.utils.http_cache import HttpCache
+
+
+class TestHttpCache:
+    """Tests del índice, el almacén por contenido y la revalidación."""
+
+    def test_store_dedup_and_evict(self, tmp_path):
+        """Cuerpos iguales se guardan una vez; el LRU expulsa al superar el tope."""
+        async def run():
+            cache = HttpCache(tmp_path, max_bytes=10_000_000, fresh_seconds=60)
+            await cache.store("https://a.es/", b"<html>igual</html>", '"v1"', None, "utf-8")
+            await cache.store("https://b.es/", b"<html>igual</html>", None, None, "utf-8")
+            assert len(list((tmp_path / "objects").rglob("*"))) == 2  # subdirectorio + objeto
+
+            entry = await cache.lookup("https://a.es/")
+            assert entry.conditional_headers() == {"If-None-Match": '"v1"'}
+            assert await cache.load(entry) == b"<html>igual</html>"
+
+            cache.max_bytes = 1
+            await cache.store("https://c.es/", os.urandom(4096), None, None, None)
+            assert await cache.lookup("https://a.es/") is None
+            cache.close()
+
+        asyncio.run(run())
+
+    def test_running_total_and_batched_access(self, tmp_path):
+        """El total de bytes sigue al índice y las lecturas no escriben hasta el lote."""
+        async def run():
+            cache = HttpCache(tmp_path, max_bytes=10_000_000, fresh_seconds=60)
+            for i in range(3):
+                await cache.store(f"https://{i}.es/", os.urandom(1000 + i), None, None, None)
+            await cache.store("https://0.es/", os.urandom(500), None, None, None)  # Sustituye su cuerpo
+            assert cache._total == cache._sync_total()
+
+            index = sqlite3.connect(tmp_path / "index.sqlite")
+            before = index.execute("SELECT last_access FROM entries WHERE url = 'https://1.es/'").fetchone()
+            await cache.lookup("https://1.es/")
+            assert index.execute(
+                "SELECT last_access FROM entries WHERE url = 'https://1.es/'").fetchone() == before
+            cache.close()  # Cerrar vuelca los accesos pendientes
+            after = index.execute("SELECT last_access FROM entries WHERE url = 'https://1.es/'").fetchone()
+            assert after[0] > before[0]
+            index.close()
+
+        asyncio.run(run())
+
+    def test_eviction_uses_pending_accesses(self, tmp_path):
+        """Una URL leída hace poco sobrevive a la expulsión aunque su acceso no se hubiera escrito."""
+        async def run():
+            cache = HttpCache(tmp_path, max_bytes=10_000_000, fresh_seconds=60)
+            await cache.store("https://vieja.es/", os.urandom(4000), None, None, None)
+            await cache.store("https://nueva.es/", os.urandom(4000), None, None, None)
+            await asyncio.sleep(0.01)
+            await cache.lookup("https://vieja.es/")
+
+            cache.max_bytes = 9000
+            await cache.store("https://otra.es/", os.urandom(4000), None, None, None)
+            assert await cache.lookup("https://vieja.es/") is not None
+            assert await cache.lookup("https://nueva.es/") is None
+            assert cache._total <= 9000
+            cache.close()
+
+        asyncio.run(run())
+
+    def test_client_revalidates_with_etag(self, tmp_path):
+        """Segunda petición condicional: el 304 se sirve desde disco."""
+        hits = []
+
+        async def page(request):
+            hits.append(request.headers.get("If-None-Match"))
+            if request.headers.get("If-None-Match") == '"v1"':
+                return web.Response(status=304)
+            return web.Response(text="<html>Canarias</html>", content_type="text/html",
+                                headers={"ETag": '"v1"'})
+
+        async def run():
+            app = web.Application()
+            app.router.add_get("/", page)
+            runner = web.AppRunner(app)
+            await runner.setup()
+            site = web.TCPSite(runner, "127.0.0.1", 0)
+            await site.start()
+            url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}/"
+
+            client = DirectClient()
+            client.cache = HttpCache(tmp_path, max_bytes=10_000_000, fresh_seconds=0)
+            try:
+                assert await client.get(url) == "<html>Canarias</html>"
+                assert await client.get(url) == "<html>Canarias</html>"
+            finally:
+                await client.close()
+                client.cache.close()
+                await runner.cleanup()
+
+        asyncio.run(run())
+        assert hits == [None, '"v1"']
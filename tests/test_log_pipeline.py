@@ -0,0 +1,45 @@
+"""Tests del pipeline de logging (cola, muestreo y JSON)."""
+import json
+import logging
+import queue
+
+from src.utils.log_pipeline import DeferredQueueHandler, JSONFormatter, RateLimitFilter
+
+
+def _record(msg: str, *args, level: int = logging.INFO) -> logging.LogRecord:
+    return logging.LogRecord("src.worker", level, __file__, 1, msg, args, None)
+
+
+class TestLogPipeline:
+    """Tests de muestreo por plantilla, formato diferido y JSON."""
+
+    def test_rate_limit_by_template(self):
+        """Cada plantilla tiene su cupo; los avisos pasan siempre y se cuentan los omitidos."""
+        limiter = RateLimitFilter(rate=0.001, burst=2)
+        passed = [limiter.filter(_record("Procesando: %s", f"https://{i}.es")) for i in range(5)]
+        assert passed == [True, True, False, False, False]
+        assert limiter.filter(_record("Descartado: %s", "https://a.es"))
+        assert limiter.filter(_record("Error con %s", "x", level=logging.WARNING))
+
+        limiter._buckets[("src.worker", "Procesando: %s")][0] = 1  # Token repuesto
+        record = _record("Procesando: %s", "https://6.es")
+        assert limiter.filter(record)
+        assert record.getMessage() == "Procesando: https://6.es [+3 similares omitidos]"
+
+    def test_queue_handler_defers_formatting(self):
+        """El registro se encola sin interpolar: el hilo escritor hace el trabajo."""
+        records = queue.SimpleQueue()
+        handler = DeferredQueueHandler(records)
+        record = _record("Procesando: %s", "https://a.es")
+        handler.handle(record)
+
+        queued = records.get_nowait()
+        assert queued.args == ("https://a.es",)
+        assert not hasattr(queued, "message")
+
+    def test_json_formatter(self):
+        """Una línea JSON válida con nivel, máquina y mensaje interpolado."""
+        line = JSONFormatter("m1").format(_record("Análisis exitoso con %s", "modelo/ñ"))
+        data = json.loads(line)
+        assert data["msg"] == "Análisis exitoso con modelo/ñ"
+        assert data["machine"] == "m1" and data["level"] == "INFO"
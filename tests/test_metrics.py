@@ -0,0 +1,61 @@
+"""Tests del subsistema de métricas."""
+import asyncio
+
+import pytest
+
+from src.utils.metrics import MetricsRegistry, start_metrics_server
+
+
+class TestMetrics:
+    """Tests de registro y exposición."""
+
+    def test_render_counter_and_histogram(self):
+        """Serializa contadores e histogramas acumulados con labels."""
+        registry = MetricsRegistry()
+        registry.const_labels["machine"] = "maquina_01"
+        tasks = registry.counter("tasks_total", "Tareas", ["outcome"])
+        latency = registry.histogram("stage_seconds", "Latencia", ["stage"], buckets=(0.1, 1))
+
+        tasks.inc(outcome="saved")
+        tasks.inc(2, outcome="saved")
+        latency.observe(0.05, stage="fetch")
+        latency.observe(0.5, stage="fetch")
+        latency.observe(5, stage="fetch")
+
+        text = registry.render()
+        assert 'tasks_total{machine="maquina_01",outcome="saved"} 3.0' in text
+        assert 'stage_seconds_bucket{machine="maquina_01",stage="fetch",le="0.1"} 1' in text
+        assert 'stage_seconds_bucket{machine="maquina_01",stage="fetch",le="1.0"} 2' in text
+        assert 'stage_seconds_bucket{machine="maquina_01",stage="fetch",le="+Inf"} 3' in text
+        assert 'stage_seconds_count{machine="maquina_01",stage="fetch"} 3' in text
+
+    def test_labels_required(self):
+        """Rechaza labels que no coinciden con la definición."""
+        registry = MetricsRegistry()
+        tasks = registry.counter("tasks_total", "Tareas", ["outcome"])
+        with pytest.raises(ValueError):
+            tasks.inc(stage="fetch")
+
+    def test_histogram_quantile(self):
+        """Interpola cuantiles dentro del bucket."""
+        registry = MetricsRegistry()
+        latency = registry.histogram("stage_seconds", "Latencia", ["stage"], buckets=(1, 2))
+        for _ in range(4):
+            latency.observe(0.5, stage="parse")
+        for _ in range(4):
+            latency.observe(1.5, stage="parse")
+
+        assert latency.quantile(0.5, stage="parse") == pytest.approx(1.0)
+        assert latency.quantile(0.75, stage="parse") == pytest.approx(1.5)
+        assert latency.quantile(0.5, stage="fetch") is None
+
+    def test_server_binds_loopback_by_default(self):
+        """Sin METRICS_HOST el endpoint solo escucha en 127.0.0.1."""
+        async def run():
+            runner = await start_metrics_server(0)
+            try:
+                assert [address[0] for address in runner.addresses] == ["127.0.0.1"]
+            finally:
+                await runner.cleanup()
+
+        asyncio.run(run())
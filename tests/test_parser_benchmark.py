@@ -0,0 +1,29 @@
+"""Tests del micro-benchmark del parser sobre el corpus."""
+from benchmarks.parser import compare, load_corpus, run
+
+
+class TestParserBenchmark:
+    """Tests del harness de medición y detección de regresiones."""
+
+    def test_run_small_page(self):
+        """Mide cada extractor, el parse completo y el scoring."""
+        corpus = {k: v for k, v in load_corpus().items() if k == "small_asociacion"}
+        results = run(corpus, ["html.parser"], repeats=1)
+
+        functions = {r["function"] for r in results}
+        assert {"soup", "parse", "score", "_extract_emails", "_extract_text"} <= functions
+        assert all(r["median_ms"] >= 0 and r["peak_kb"] >= 0 for r in results)
+
+    def test_compare_flags_regression(self):
+        """Marca solo lo que supera el umbral."""
+        base = [
+            {"page": "p", "backend": "lxml", "function": "parse", "median_ms": 10.0, "peak_kb": 100.0},
+            {"page": "p", "backend": "lxml", "function": "score", "median_ms": 1.0, "peak_kb": 1.0},
+        ]
+        current = [
+            {"page": "p", "backend": "lxml", "function": "parse", "median_ms": 13.0, "peak_kb": 100.0},
+            {"page": "p", "backend": "lxml", "function": "score", "median_ms": 1.1, "peak_kb": 5.0},
+        ]
+        regressions = compare(current, base, threshold=0.2)
+        assert [r["key"] for r in regressions] == ["p|lxml|parse"]
+        assert len(compare(current, base, threshold=0.2, memory_threshold=0.5)) == 2
@@ -0,0 +1,102 @@
+"""Tests del recrawl incremental por hash de contenido."""
+import asyncio
+
+import pytest
+
+from src.models import TareaURL
+from src.utils.recrawl import (
+    DAY, SCHEDULE_KEY, RecrawlScheduler, content_fingerprint, estimate_interval,
+)
+from src.utils.task_codec import decode_task
+from src.utils.task_queue import QUEUE_KEY
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+def _scraped(text: str) -> dict:
+    return {"meta": {"title": "Asociación"}, "text_content": text, "emails": [], "phones": []}
+
+
+class TestRecrawl:
+    """Tests de huella, estimación de intervalo y agenda de revisitas."""
+
+    def test_fingerprint_ignores_whitespace_and_case(self):
+        """Espacios y mayúsculas no cuentan como cambio; el texto sí."""
+        base = content_fingerprint(_scraped("Sede en  Las Palmas"))
+        assert content_fingerprint(_scraped("sede en las palmas\n")) == base
+        assert content_fingerprint(_scraped("Sede en Santa Cruz")) != base
+
+    def test_estimate_interval(self):
+        """Sitios estáticos se espacian (sin más que duplicar); los cambiantes se acercan."""
+        kwargs = dict(min_interval=1 * DAY, max_interval=90 * DAY)
+        static = estimate_interval(revisits=4, changes=0, elapsed=56 * DAY, previous=14 * DAY, **kwargs)
+        assert static == 28 * DAY
+        busy = estimate_interval(revisits=4, changes=4, elapsed=56 * DAY, previous=14 * DAY, **kwargs)
+        assert 1 * DAY <= busy < 14 * DAY
+        assert estimate_interval(0, 0, 0, 14 * DAY, **kwargs) == 14 * DAY
+
+    def test_observe_and_promote(self):
+        """Primera visita cambia, repetir el mismo hash no; las vencidas se encolan una vez."""
+        async def run():
+            client = fakeredis.FakeAsyncRedis()
+            scheduler = RecrawlScheduler(client, initial_days=0)
+            tarea = TareaURL(url="https://asociacion.es/", nicho="Cultura")
+            digest = content_fingerprint(_scraped("Sede en Tenerife"))
+
+            assert await scheduler.observe("asociacion.es", digest, tarea) is True
+            assert await scheduler.observe("asociacion.es", digest, tarea) is False
+            assert await scheduler.observe("asociacion.es", "otro", tarea) is True
+
+            await client.zadd(SCHEDULE_KEY, {"asociacion.es": 0})
+            assert await scheduler.promote_due() == 1
+            assert await scheduler.promote_due() == 0
+
+            payload = decode_task(await client.lpop(QUEUE_KEY))
+            assert payload.recrawl is True
+            assert payload.nicho == "Cultura"
+            assert payload.url == "https://asociacion.es/"
+
+        asyncio.run(run())
+
+    def test_changed_is_read_only(self):
+        """Consultar si cambió no guarda el hash: solo ``observe`` confirma la visita."""
+        async def run():
+            client = fakeredis.FakeAsyncRedis()
+            scheduler = RecrawlScheduler(client)
+            tarea = TareaURL(url="https://asociacion.es/")
+
+            assert await scheduler.changed("asociacion.es", "h1") is True
+            assert await scheduler.changed("asociacion.es", "h1") is True
+            assert await client.zcard(SCHEDULE_KEY) == 0
+
+            await scheduler.observe("asociacion.es", "h1", tarea)
+            assert await scheduler.changed("asociacion.es", "h1") is False
+            assert await scheduler.changed("asociacion.es", "h2") is True
+
+        asyncio.run(run())
+
+    def test_seed_schedules_only_unknown_domains(self):
+        """Los dominios guardados sin estado se agendan; su primera revisita cuenta como primera visita."""
+        async def run():
+            client = fakeredis.FakeAsyncRedis()
+            scheduler = RecrawlScheduler(client, initial_days=0)
+            await scheduler.observe("conocido.es", "h1", TareaURL(url="https://conocido.es/"))
+
+            seeded = await scheduler.seed([
+                ("conocido.es", "https://conocido.es/", None),
+                ("antiguo.es", "https://antiguo.es/", "Cultura"),
+            ])
+            assert seeded == 1
+            assert await scheduler.changed("antiguo.es", "h1") is True
+
+            assert await scheduler.promote_due() == 2
+            tareas = [decode_task(t) for t in await client.lrange(QUEUE_KEY, 0, -1)]
+            assert {(t.url, t.nicho) for t in tareas} == {
+                ("https://conocido.es/", None), ("https://antiguo.es/", "Cultura"),
+            }
+
+            assert await scheduler.observe("antiguo.es", "h1", TareaURL(url="https://antiguo.es/")) is True
+            state = await client.hgetall("recrawl_state:antiguo.es")
+            assert state[b"visits"] == b"1" and state[b"nicho"] == b"Cultura"
+
+        asyncio.run(run())
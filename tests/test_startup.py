@@ -0,0 +1,77 @@
+"""Tests de arranque: presupuesto de importación, errores de configuración y --check."""
+import asyncio
+import os
+import subprocess
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+from src.checks import run_checks
+
+ROOT = Path(__file__).resolve().parent.parent
+ENV = {**os.environ, "SUPABASE_URL": "https://test.supabase.co", "SUPABASE_KEY": "test-key"}
+
+# Segundos de importación de src.main (el CLI) con margen para máquinas de CI lentas
+IMPORT_BUDGET = 1.0
+HEAVY_MODULES = ("openai", "supabase", "bs4", "lxml", "aiohttp_socks", "src.worker")
+
+
+def _python(code: str, env: dict = ENV) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, env=env, capture_output=True, text=True, timeout=60,
+    )
+
+
+class TestStartup:
+    """Tests del arranque en frío y del modo de comprobación."""
+
+    def test_cli_import_is_light(self):
+        """Importar el CLI no carga los SDK pesados y cabe en el presupuesto."""
+        result = _python(f"import sys, src.main; print([m for m in {HEAVY_MODULES!r} if m in sys.modules])")
+        assert result.returncode == 0, result.stderr
+        assert result.stdout.strip() == "[]"
+
+        line = next(l for l in result.stderr.splitlines() if l.rstrip().endswith("| src.main"))
+        cumulative_us = int(line.split("|")[1])
+        assert cumulative_us / 1e6 < IMPORT_BUDGET
+
+    def test_missing_variable_raises_config_error(self):
+        """Sin variables obligatorias se lanza ConfigError (no sys.exit) y el CLI sale con 1."""
+        env = {k: v for k, v in ENV.items() if k != "SUPABASE_KEY"}
+        result = _python(
+            "from src.config import ConfigError, get_config\n"
+            "try:\n    get_config()\nexcept ConfigError as e:\n    print('ConfigError', e)",
+            env,
+        )
+        assert "ConfigError Variable de entorno requerida no encontrada: SUPABASE_KEY" in result.stdout
+
+        cli = subprocess.run([sys.executable, "-m", "src.main", "--check"], cwd=ROOT, env=env,
+                             capture_output=True, text=True, timeout=60)
+        assert cli.returncode == 1
+        assert "[FATAL]" in cli.stderr
+
+    def test_checks_run_in_parallel(self):
+        """Las comprobaciones corren a la vez; fallos y timeouts quedan en su resultado."""
+        async def slow(cfg):
+            await asyncio.sleep(0.2)
+            return "ok"
+
+        async def broken(cfg):
+            raise ConnectionError("sin red")
+
+        async def hangs(cfg):
+            await asyncio.sleep(10)
+
+        async def skipped(cfg):
+            return None
+
+        cfg = SimpleNamespace(REQUEST_TIMEOUT=1)
+        checks = {"a": slow, "b": slow, "red": broken, "cuelga": hangs, "nada": skipped}
+        results = {r.name: r for r in asyncio.run(run_checks(cfg, timeout=0.5, checks=checks))}
+
+        assert results["a"].ok and results["b"].ok
+        assert results["red"].detail == "ConnectionError: sin red"
+        assert not results["cuelga"].ok and results["cuelga"].detail == "sin respuesta en 0.5s"
+        assert results["nada"].ok and results["nada"].detail == "omitido"
+        assert max(r.seconds for r in results.values()) < 0.9
@@ -0,0 +1,97 @@
+"""Tests de extracción de datos estructurados (JSON-LD, microdata, OpenGraph)."""
+from src.models import Organizacion
+from src.scraper import Scraper
+from src.structured_data import is_canarias_postal_code
+
+
+JSONLD_PAGE = """
+<html><head>
+<script type="application/ld+json">
+{"@context": "https://schema.org", "@graph": [
+  {"@type": "WebPage", "name": "Inicio"},
+  {"@type": ["NGO"], "name": "Asociación Vecinal Arona",
+   "telephone": "+34 922 000 000", "email": "mailto:info@avarona.org",
+   "sameAs": ["https://www.facebook.com/avarona", "https://instagram.com/avarona"],
+   "address": {"@type": "PostalAddress", "streetAddress": "Calle Real 1",
+               "postalCode": "38640", "addressLocality": "Arona", "addressCountry": "ES"}}
+]}
+</script>
+</head><body><p>Bienvenidos</p></body></html>
+"""
+
+MICRODATA_PAGE = """
+<html><body>
+<div itemscope itemtype="https://schema.org/LocalBusiness">
+  <span itemprop="name">Taller Las Palmas</span>
+  <div itemprop="address" itemscope itemtype="https://schema.org/PostalAddress">
+    <span itemprop="streetAddress">Av. Mesa y López 10</span>
+    <span itemprop="postalCode">35007</span>
+  </div>
+  <a itemprop="telephone" href="tel:928000000">928 000 000</a>
+</div>
+</body></html>
+"""
+
+
+class TestStructuredData:
+    """Tests del extractor de datos estructurados."""
+
+    def test_jsonld_graph(self):
+        """Toma el nodo de organización del @graph, no el WebPage."""
+        structured = Scraper().parse(JSONLD_PAGE, "https://avarona.org")["structured"]
+
+        assert structured["name"] == "Asociación Vecinal Arona"
+        assert structured["postal_codes"] == ["38640"]
+        assert structured["address"]["locality"] == "Arona"
+        assert structured["emails"] == ["info@avarona.org"]
+        assert "+34 922 000 000" in structured["telephones"]
+        assert len(structured["same_as"]) == 2
+
+    def test_microdata_nested_address(self):
+        """La dirección anidada pertenece a su item padre."""
+        structured = Scraper().parse(MICRODATA_PAGE, "https://taller.es")["structured"]
+
+        assert structured["name"] == "Taller Las Palmas"
+        assert structured["postal_codes"] == ["35007"]
+        assert structured["address"]["street"] == "Av. Mesa y López 10"
+
+    def test_opengraph_and_foreign_country(self):
+        """OpenGraph de negocio cuenta; un 35xxx de otro país no."""
+        html = """
+        <html><head>
+            <meta property="og:site_name" content="Club Náutico">
+            <meta property="business:contact_data:postal_code" content="35500">
+            <script type="application/ld+json">
+            {"@type": "Organization", "address": {"postalCode": "35000", "addressCountry": "FR"}}
+            </script>
+        </head><body></body></html>
+        """
+        structured = Scraper().parse(html, "https://club.es")["structured"]
+
+        assert structured["name"] == "Club Náutico"
+        assert structured["postal_codes"] == ["35500"]
+
+    def test_invalid_jsonld_is_ignored(self):
+        """Un bloque JSON-LD roto no rompe el parseo."""
+        html = '<html><head><script type="application/ld+json">{"@type": </script></head></html>'
+        structured = Scraper().parse(html, "https://roto.es")["structured"]
+
+        assert structured["name"] is None
+        assert structured["postal_codes"] == []
+
+    def test_is_canarias_postal_code(self):
+        """Solo las provincias 35 y 38."""
+        assert is_canarias_postal_code("38001")
+        assert is_canarias_postal_code("35600")
+        assert not is_canarias_postal_code("28001")
+        assert not is_canarias_postal_code("3800")
+
+    def test_address_columns_only_when_present(self):
+        """Sin dirección declarada no se envían sus columnas en el upsert."""
+        org = Organizacion(url="https://club.es", dominio="club.es")
+        assert "direccion" not in org.to_supabase_dict()
+        assert "codigo_postal" not in org.to_supabase_dict()
+
+        org = Organizacion(url="https://club.es", dominio="club.es", direccion="Calle Mayor 1", codigo_postal="38001")
+        data = org.to_supabase_dict()
+        assert (data["direccion"], data["codigo_postal"]) == ("Calle Mayor 1", "38001")
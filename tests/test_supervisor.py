@@ -0,0 +1,61 @@
+"""Tests del supervisor multi-proceso."""
+import time
+
+from src.supervisor import MAX_RESTART_DELAY, STABLE_UPTIME, Supervisor
+
+
+class _FakeProcess:
+    def __init__(self, exitcode):
+        self.exitcode = exitcode
+        self.pid = 1234
+
+    def is_alive(self):
+        return False
+
+    def join(self, timeout=None):
+        pass
+
+
+class TestSupervisor:
+    """Tests de agregación y política de reinicio."""
+
+    def test_aggregate_latest_per_pid(self):
+        """Suma la última estadística de cada proceso."""
+        sup = Supervisor(processes=2, workers_per_process=1)
+        sup._stats = {
+            10: {"processed": 5, "errors": 1, "tokens": 100},
+            11: {"processed": 3, "errors": 0, "tokens": 50},
+        }
+        assert sup.aggregate() == {"processed": 8, "errors": 1, "tokens": 150}
+
+    def test_crash_schedules_backoff_restart(self):
+        """Un hijo caído se reprograma con backoff; uno limpio no se reinicia."""
+        sup = Supervisor(processes=2, workers_per_process=1)
+        sup._children[0].process = _FakeProcess(exitcode=1)
+        sup._children[0].restarts = 10
+        sup._children[1].process = _FakeProcess(exitcode=0)
+
+        before = time.monotonic()
+        sup._check_children()
+
+        crashed, clean = sup._children
+        assert crashed.process is None
+        assert before + MAX_RESTART_DELAY <= crashed.restart_at <= time.monotonic() + MAX_RESTART_DELAY
+        assert clean.restart_at == float("inf")
+        assert not sup._stopping
+
+    def test_backoff_resets_after_stable_uptime(self):
+        """Tras un periodo estable el contador vuelve a cero; una caída rápida lo mantiene."""
+        sup = Supervisor(processes=2, workers_per_process=1)
+        stable, flapping = sup._children
+        for child in sup._children:
+            child.process = _FakeProcess(exitcode=1)
+            child.restarts = 10
+        stable.started_at = time.monotonic() - STABLE_UPTIME - 1
+        flapping.started_at = time.monotonic() - 5
+
+        before = time.monotonic()
+        sup._check_children()
+
+        assert stable.restarts == 1 and stable.restart_at <= before + 1 + 0.5
+        assert flapping.restarts == 11 and flapping.restart_at >= before + MAX_RESTART_DELAY
@@ -0,0 +1,51 @@
+"""Tests de la codificación binaria de tareas."""
+import struct
+
+import pytest
+
+from src.models import TareaURL
+from src.utils.task_codec import MAGIC, decode_task, encode_task, task_to_dict, task_url
+from src.utils.task_queue import payload_domain
+
+
+class TestTaskCodec:
+    """Tests de ida y vuelta, compatibilidad con JSON y versión."""
+
+    def test_round_trip(self):
+        """Todos los campos sobreviven, incluido nicho vacío frente a None."""
+        for tarea in (
+            TareaURL(url="https://www.asociación.es/quiénes", nicho="Cultura", prioridad=-3, nivel=1,
+                     reintentos=2, recrawl=True),
+            TareaURL(url="https://club.es", nicho=""),
+            TareaURL(url="https://club.es"),
+        ):
+            decoded = decode_task(encode_task(tarea))
+            assert task_to_dict(decoded) == task_to_dict(tarea)
+
+    def test_smaller_than_json(self):
+        """El payload binario ocupa menos que el JSON de Pydantic."""
+        tarea = TareaURL(url="https://asociacion.es/", nicho="Deporte")
+        assert len(encode_task(tarea)) < len(tarea.model_dump_json()) / 2
+
+    def test_legacy_json_still_decodes(self):
+        """Las tareas JSON ya encoladas (o de productores antiguos) se leen validadas."""
+        legacy = TareaURL(url="https://www.club.es/x", nicho="Deporte").model_dump_json()
+        assert decode_task(legacy).nicho == "Deporte"
+        assert task_url(legacy) == "https://www.club.es/x"
+        assert payload_domain(legacy) == payload_domain(encode_task(TareaURL(url="https://club.es")))
+
+    def test_out_of_range_falls_back_to_json(self):
+        """Valores fuera del formato binario se codifican como JSON."""
+        payload = encode_task(TareaURL(url="https://club.es", prioridad=100_000))
+        assert payload[0] != MAGIC
+        assert decode_task(payload).prioridad == 100_000
+
+    def test_unknown_version_rejected(self):
+        """Una versión futura no se interpreta a ciegas."""
+        payload = bytearray(encode_task(TareaURL(url="https://club.es")))
+        payload[1] = 99
+        with pytest.raises(ValueError):
+            decode_task(bytes(payload))
+        assert payload_domain(bytes(payload)) is None
+        with pytest.raises(ValueError):
+            decode_task(struct.pack("<B", MAGIC))
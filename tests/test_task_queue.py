@@ -0,0 +1,162 @@
+"""Tests de la cola de tareas con deduplicación atómica."""
+import asyncio
+import pytest
+
+from src.models import TareaURL
+from src.utils.task_codec import decode_task, encode_task
+from src.utils.task_queue import (
+    DEAD_LETTER_KEY, DOMAIN_QUEUE_PREFIX, INFLIGHT_KEY, QUEUE_KEY, RETRY_KEY, SEEN_KEY,
+    TaskQueue, canonical_domain, payload_domain,
+)
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")
+
+
+class TestTaskQueue:
+    """Tests del encolado por lotes."""
+
+    def test_canonical_domain(self):
+        """Normaliza mayúsculas, www y puerto."""
+        assert canonical_domain("https://WWW.Empresa.es:443/contacto") == "empresa.es"
+        assert canonical_domain("empresa.es") == "empresa.es"
+        assert canonical_domain("/ruta/relativa") is None
+
+    def test_enqueue_batch_dedup(self):
+        """Filtra duplicados del lote, vistos y en vuelo."""
+        async def run():
+            client = fakeredis.FakeAsyncRedis()
+            queue = TaskQueue(client)
+            await client.sadd(SEEN_KEY, "vista.es")
+
+            accepted = await queue.enqueue_batch([
+                "https://nueva.es",
+                "https://www.nueva.es/otra",
+                "https://vista.es",
+                "https://otra.es",
+            ])
+            assert accepted == 2
+            assert await client.llen(QUEUE_KEY) == 2
+
+            # Ya en vuelo: no se vuelve a encolar
+            assert await queue.enqueue_batch(["https://otra.es/pagina"]) == 0
+
+            await queue.mark_done("https://otra.es")
+            assert await client.sismember(SEEN_KEY, "otra.es")
+            assert not await client.sismember(INFLIGHT_KEY, "otra.es")
+
+        asyncio.run(run())
+
+    def test_retry_backoff_and_promotion(self):
+        """Incrementa reintentos, espera al vencimiento y vuelve a la cola."""
+        async def run():
+            client = fakeredis.FakeAsyncRedis()
+            queue = TaskQueue(client, max_retries=2, retry_base_delay=0.0)
+            tarea = TareaURL(url="https://caida.es", nivel=0)
+
+            assert await queue.schedule_retry(tarea, "timeout")
+            assert await client.zcard(RETRY_KEY) == 1
+            assert await queue.promote_due() == 1
+            assert await client.zcard(RETRY_KEY) == 0
+
+            promoted = decode_task(await client.lpop(QUEUE_KEY))
+            assert promoted.reintentos == 1
+
+            # No vencida todavía: no se promueve
+            slow = TaskQueue(client, retry_base_delay=3600.0)
+            await slow.schedule_retry(promoted, "timeout")
+            assert await slow.promote_due() == 0
+
+        asyncio.run(run())
+
+    def test_backoff_grows_exponentially(self):
+        """El retraso se duplica por intento hasta el máximo."""
+        queue = TaskQueue(fakeredis.FakeAsyncRedis(), retry_base_delay=10.0, retry_max_delay=50.0)
+        assert 8 <= queue.retry_delay(1) <= 12
+        assert 32 <= queue.retry_delay(3) <= 48
+        assert queue.retry_delay(10) <= 60
+
+    def test_dead_letter_and_requeue(self):
+        """Agotados los reintentos va a dead letters; requeue la devuelve a cero."""
+        async def run():
+            client = fakeredis.FakeAsyncRedis()
+            queue = TaskQueue(client, max_retries=1, retry_base_delay=0.0)
+            tarea = TareaURL(url="https://www.muerta.es/x", reintentos=1)
+
+            assert not await queue.schedule_retry(tarea, "ConnectError")
+            entries = await queue.list_dead_letters()
+            assert [e["dominio"] for e in entries] == ["muerta.es"]
+            assert entries[0]["error"] == "ConnectError"
+
+            assert await queue.requeue_dead_letters(["otra.es"]) == 0
+            assert await queue.requeue_dead_letters() == 1
+            assert await client.hlen(DEAD_LETTER_KEY) == 0
+            requeued = decode_task(await client.lpop(QUEUE_KEY))
+            assert requeued.reintentos == 0
+
+        asyncio.run(run())
+
+    def test_registrable_domain(self):
+        """Agrupa subdominios y respeta sufijos de dos niveles."""
+        from src.utils.task_queue import registrable_domain
+        assert registrable_domain("cultura.gobiernodecanarias.org") == "gobiernodecanarias.org"
+        assert registrable_domain("tienda.empresa.com.es") == "empresa.com.es"
+        assert registrable_domain("empresa.es") == "empresa.es"
+
+    def test_pop_respects_domain_bucket_and_fairness(self):
+        """Un dominio con ráfaga agotada espera; otros dominios salen mientras tanto."""
+        async def run():
+            client = fakeredis.FakeAsyncRedis()
+            queue = TaskQueue(client, domain_rate=0.01, domain_burst=1)
+            for url in ["https://a.grande.es/1", "https://b.grande.es/2", "https://pequena.es/"]:
+                await client.rpush(QUEUE_KEY, TareaURL(url=url).model_dump_json())
+
+            first, _ = await queue.pop()
+            second, _ = await queue.pop()
+            hosts = {canonical_domain(str(TareaURL.model_validate_json(p).url))
+                     for p in (first, second)}
+            assert hosts == {"a.grande.es", "pequena.es"}
+            assert await client.llen(QUEUE_KEY) == 0
+
+            # grande.es sin token: nada listo, con la espera hasta su próximo token
+            payload, wait = await queue.pop()
+            assert payload is None
+            assert 0 < wait <= 100
+
+        asyncio.run(run())
+
+    def test_intake_script_matches_payload_domain(self):
+        """El reparto en Lua agrupa igual que payload_domain y descarta lo ilegible."""
+        async def run():
+            client = fakeredis.FakeAsyncRedis()
+            queue = TaskQueue(client)
+            urls = [
+                "https://www.Club.es/", "http://cultura.gobiernodecanarias.org:8080/a?b=c",
+                "https://tienda.empresa.com.es/x", "https://user@sub.sitio.co.uk/#frag",
+                "https://192.168.1.10/panel", "https://localhost/", "https://a.b.c.d.org/",
+            ]
+            payloads = [encode_task(TareaURL(url=url, nicho="ñ" * 300)) for url in urls]
+            payloads.append(TareaURL(url="https://legado.es/").model_dump_json().encode())
+            await client.rpush(QUEUE_KEY, *payloads, b"basura", b"\xa5\x09")
+
+            assert await queue.pump_intake() == len(payloads)
+            assert await client.llen(QUEUE_KEY) == 0
+            for payload in payloads:
+                assert payload in await client.lrange(DOMAIN_QUEUE_PREFIX + payload_domain(payload), 0, -1)
+
+        asyncio.run(run())
+
+    def test_secondary_fetches_share_domain_bucket(self):
+        """Los tokens de peticiones secundarias salen del mismo bucket que la cola."""
+        async def run():
+            client = fakeredis.FakeAsyncRedis()
+            queue = TaskQueue(client, domain_rate=0.01, domain_burst=2)
+            await client.rpush(QUEUE_KEY, encode_task(TareaURL(url="https://a.sitio.es/")))
+
+            assert await queue.take_token("https://sitio.es/robots.txt") == 0
+            assert (await queue.pop())[0] is not None  # Último token de la ráfaga
+            wait = await queue.take_token("https://b.sitio.es/sitemap.xml")
+            assert 0 < wait <= 100
+            assert await queue.take_token("https://otro.es/") == 0
+
+        asyncio.run(run())
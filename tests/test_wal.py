@@ -0,0 +1,88 @@
+"""Tests del write-ahead log local."""
+import csv
+import os
+import subprocess
+import sys
+import time
+
+from src.utils.wal import STALE_SEGMENT_SECONDS, WriteAheadLog, legacy_backups, migrate_legacy_backups
+
+
+class TestWriteAheadLog:
+    """Tests de escritura, rotación y manifiesto."""
+
+    def test_append_rotate_and_count(self, tmp_path):
+        """Rota segmentos y cuenta pendientes desde el manifiesto."""
+        wal = WriteAheadLog(tmp_path, "test", segment_max_bytes=200)
+        for i in range(10):
+            wal.append({"dominio": f"org{i}.es", "emails": [f"info@org{i}.es"]})
+        wal.close()
+
+        segments = wal.segments()
+        assert len(segments) > 1
+        assert wal.pending_count() == 10
+
+        records = [r for seg in segments for r in wal.iter_records(seg)]
+        assert records[0]["emails"] == ["info@org0.es"]  # Listas sin aplanar
+        assert len(records) == 10
+
+    def test_discard_updates_count(self, tmp_path):
+        """Los segmentos descartados dejan de contar como pendientes."""
+        wal = WriteAheadLog(tmp_path, "test")
+        wal.append({"dominio": "a.es"})
+        wal.append({"dominio": "b.es"})
+
+        # El segmento abierto no se ofrece para replay salvo que se pida
+        assert wal.segments() == []
+        wal.close()
+
+        other = WriteAheadLog(tmp_path, "replay")
+        assert other.pending_count() == 2
+        for segment in other.segments():
+            other.discard(segment)
+        assert other.pending_count() == 0
+
+    def test_seal_orphans_of_dead_writers(self, tmp_path):
+        """Un segmento abierto de un proceso muerto se sella; el de uno vivo no se toca."""
+        dead = subprocess.run([sys.executable, "-c", "import os; print(os.getpid())"],
+                              capture_output=True, text=True, check=True)
+        crashed = WriteAheadLog(tmp_path, f"m1_{dead.stdout.strip()}")
+        crashed.append({"dominio": "caido.es"})
+        crashed.sync()  # Sin close(): el proceso cayó con el segmento abierto
+        running = WriteAheadLog(tmp_path, f"m1_{os.getppid()}")
+        running.append({"dominio": "vivo.es"})
+        remote = WriteAheadLog(tmp_path, "m2_1")
+        remote.append({"dominio": "remoto.es"})
+        remote.sync()
+        stale = time.time() - STALE_SEGMENT_SECONDS - 1
+        os.utime(remote._segment, (stale, stale))
+
+        replay = WriteAheadLog(tmp_path, f"m1_{os.getpid()}")
+        assert replay.seal_orphans() == 2
+        records = [r["dominio"] for seg in replay.segments() for r in replay.iter_records(seg)]
+        assert sorted(records) == ["caido.es", "remoto.es"]
+        # El manifiesto del escritor caído sigue al segmento sellado
+        assert list(crashed._read_manifest(crashed._manifest_path)) == [crashed._segment.name[:-len(".part")]]
+        assert running._segment.exists()
+
+    def test_migrate_legacy_csv_once(self, tmp_path):
+        """Los backups CSV antiguos pasan al WAL con sus tipos y no se migran dos veces."""
+        row = {
+            "dominio": "club.es", "emails": "['info@club.es']", "redes_sociales": "{'x': 'https://x.com/club'}",
+            "titulo": "", "score": "7.5", "tamaño": "pequeña",
+        }
+        with open(tmp_path / "backup_20240101_120000.csv", "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=list(row))
+            writer.writeheader()
+            writer.writerow(row)
+
+        wal = WriteAheadLog(tmp_path, "replay")
+        assert migrate_legacy_backups(wal) == 1
+        assert migrate_legacy_backups(wal) == 0
+        assert legacy_backups(tmp_path) == []
+        assert (tmp_path / "backup_20240101_120000.csv.migrated").exists()
+
+        [record] = [r for seg in wal.segments() for r in wal.iter_records(seg)]
+        assert record["emails"] == ["info@club.es"]
+        assert record["redes_sociales"] == {"x": "https://x.com/club"}
+        assert record["titulo"] is None and record["score"] == 7.5 and record["tamaño"] == "pequeña"
@@ -0,0 +1,36 @@
+"""Tests del archivo WARC."""
+import asyncio
+
+from src.utils.warc import WarcWriter, iter_responses, warc_files
+
+
+class TestWarc:
+    """Tests de escritura, rotación y lectura en streaming."""
+
+    def test_roundtrip_and_rotation(self, tmp_path):
+        """Lo escrito se relee igual; al rotar el archivo anterior queda sellado."""
+        async def run():
+            writer = WarcWriter(tmp_path, "test", max_bytes=1)
+            body = "<html>Asociación de Tenerife</html>".encode("latin-1")
+            await writer.write_response(
+                "https://a.es/", 200, "OK",
+                [("Content-Type", "text/html; charset=latin-1"), ("Content-Encoding", "gzip")],
+                body, fields={"X-Nicho": "ong"},
+            )
+            await writer.write_response("https://b.es/", 404, "Not Found", [], b"no")
+            writer.close()
+
+        asyncio.run(run())
+
+        files = warc_files(tmp_path)
+        assert len(files) == 2
+        records = list(iter_responses(files))
+        assert [r.url for r in records] == ["https://a.es/", "https://b.es/"]
+
+        first = records[0]
+        assert first.status == 200
+        assert first.text() == "<html>Asociación de Tenerife</html>"
+        assert first.fields == {"X-Nicho": "ong"}
+        # El cuerpo ya está decodificado: no se arrastra Content-Encoding
+        assert "content-encoding" not in first.headers
+        assert records[1].status == 404
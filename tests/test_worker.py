@@ -0,0 +1,214 @@
+"""Tests del pipeline del worker con clientes sustitutos (sin red ni Redis)."""
+import asyncio
+import os
+import time
+
+import aiohttp
+import pytest
+from yarl import URL
+
+os.environ.setdefault("SUPABASE_URL", "https://test.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "test-key")
+os.environ.setdefault("OPENROUTER_API_KEY", "test-api-key")
+os.environ.setdefault("HTTP_CACHE_MAX_MB", "0")
+os.environ.setdefault("FEATURE_DIR", "")
+
+from src.components import Components
+from src.models import TareaURL
+from src.utils.circuit_breaker import OPEN_PREFIX, HostCircuitBreaker
+from src.utils.recrawl import RecrawlScheduler
+from src.utils.task_codec import decode_task, encode_task
+from src.utils.task_queue import DEAD_LETTER_KEY, INFLIGHT_KEY, QUEUE_KEY, RETRY_KEY, SEEN_KEY, TaskQueue
+from src.worker import Worker
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")
+
+
+class FakeDB:
+    def __init__(self):
+        self.saved = []
+        self.errors = []
+
+    async def check_domain_exists(self, domain):
+        return False
+
+    async def log_error(self, url, error_type, message):
+        self.errors.append((url, error_type))
+
+    async def upsert_organizacion(self, org):
+        self.saved.append(org)
+        return True
+
+
+class FakeDiscovery:
+    def __init__(self, candidates):
+        self.candidates = candidates
+        self.calls = []
+
+    async def discover(self, url, internal_links=None):
+        self.calls.append(url)
+        return self.candidates
+
+
+class FakeRouter:
+    def __init__(self, pages):
+        self.pages = pages
+        self.calls = []
+
+    async def get(self, url, **kwargs):
+        self.calls.append(url)
+        return self.pages[url]
+
+
+def _page(text: str, **extra) -> dict:
+    return {
+        "text_content": text, "meta": {"title": text[:20]}, "emails": [], "phones": [],
+        "social": {}, "external_links": [], "internal_links": [], "structured": {}, **extra,
+    }
+
+
+def _worker(discovery=None, router=None) -> Worker:
+    worker = Worker(Components(1))
+    worker.db = FakeDB()
+    worker.discovery = discovery
+    worker.site_client = router
+    return worker
+
+
+class FailingRouter:
+    def __init__(self, exc):
+        self.exc = exc
+
+    async def get(self, url, **kwargs):
+        raise self.exc
+
+
+def _queue_worker(exc, max_retries=3):
+    worker = _worker()
+    worker.redis = fakeredis.FakeAsyncRedis()
+    worker.queue = TaskQueue(worker.redis, max_retries=max_retries)
+    worker.breaker = HostCircuitBreaker(worker.redis)
+    worker.tor = FailingRouter(exc)
+    return worker
+
+
+class TestWorkerPipeline:
+    """Orden de las etapas de red respecto al filtro geográfico."""
+
+    def test_discovery_only_after_geo_filter(self):
+        """Un dominio descartado no gasta fetches de robots, sitemaps ni páginas internas."""
+        discovery = FakeDiscovery(["https://a.es/contacto"])
+        html = "<html><body>Contacto: info@a.es, Santa Cruz de Tenerife</body></html>"
+        router = FakeRouter({"https://a.es/contacto": html})
+        worker = _worker(discovery, router)
+
+        async def run():
+            fuera = await worker.process_page(TareaURL(url="https://b.es"), _page("empresa en Madrid"),
+                                              discover=False, analyze=False)
+            dentro = await worker.process_page(TareaURL(url="https://a.es"), _page("asociación de Canarias"),
+                                               discover=False, analyze=False)
+            return fuera, dentro
+
+        fuera, dentro = asyncio.run(run())
+
+        assert not fuera and dentro
+        assert discovery.calls == ["https://a.es/"]
+        assert router.calls == ["https://a.es/contacto"]
+        assert worker.db.saved[0].emails == ["info@a.es"]  # Datos de la página interna incluidos
+
+    def test_failed_fetch_is_not_marked_done(self):
+        """Con un reintento pendiente el dominio sigue en vuelo y no cuenta como procesado."""
+        worker = _queue_worker(asyncio.TimeoutError())
+
+        async def run():
+            await worker.redis.sadd(INFLIGHT_KEY, "a.es")
+            await worker._run_task(encode_task(TareaURL(url="https://a.es")))
+            return (await worker.redis.smembers(SEEN_KEY), await worker.redis.smembers(INFLIGHT_KEY),
+                    await worker.redis.zcard(RETRY_KEY))
+
+        seen, inflight, retries = asyncio.run(run())
+        assert seen == set() and inflight == {b"a.es"} and retries == 1
+
+    def test_terminal_failures_are_dead_lettered_and_done(self):
+        """Un 4xx o un error con los reintentos agotados termina en dead letters y se marca."""
+        not_found = aiohttp.ClientResponseError(
+            aiohttp.RequestInfo(URL("https://a.es/"), "GET", {}, URL("https://a.es/")), (), status=404,
+        )
+
+        async def run(worker, url, reintentos=0):
+            await worker._run_task(encode_task(TareaURL(url=url, reintentos=reintentos)))
+            return (await worker.redis.smembers(SEEN_KEY), await worker.redis.smembers(INFLIGHT_KEY),
+                    await worker.redis.hkeys(DEAD_LETTER_KEY))
+
+        assert asyncio.run(run(_queue_worker(not_found), "https://a.es")) == ({b"a.es"}, set(), [b"a.es"])
+
+        worker = _queue_worker(None, max_retries=1)
+
+        async def broken(domain):
+            raise RuntimeError("supabase caído")
+
+        worker.db.check_domain_exists = broken
+        assert asyncio.run(run(worker, "https://b.es", reintentos=1)) == ({b"b.es"}, set(), [b"b.es"])
+        assert worker.errors == 1
+
+    def test_open_circuit_defers_until_ttl(self, monkeypatch):
+        """Con el circuito abierto la tarea se aplaza sin red y vuelve a la cola al expirar."""
+        worker = _queue_worker(AssertionError("no debe haber fetch"))
+
+        async def run():
+            await worker.redis.set(OPEN_PREFIX + "a.es", "timeout", ex=600)
+            await worker.redis.sadd(INFLIGHT_KEY, "a.es")
+            await worker._run_task(encode_task(TareaURL(url="https://a.es")))
+            state = (await worker.redis.smembers(SEEN_KEY), await worker.redis.smembers(INFLIGHT_KEY),
+                     await worker.redis.hkeys(DEAD_LETTER_KEY))
+            [(_, due)] = await worker.redis.zrange(RETRY_KEY, 0, -1, withscores=True)
+            early = await worker.queue.promote_due()
+
+            now = time.time()
+            monkeypatch.setattr(time, "time", lambda: now + 601)
+            late = await worker.queue.promote_due()
+            return state, due - now, early, late, await worker.redis.lrange(QUEUE_KEY, 0, -1)
+
+        state, wait, early, late, queued = asyncio.run(run())
+        assert state == (set(), {b"a.es"}, [])
+        assert 590 <= wait <= 600
+        assert early == 0 and late == 1
+        [tarea] = [decode_task(t) for t in queued]
+        assert tarea.url == "https://a.es/" and tarea.reintentos == 0
+
+    def test_terminal_circuit_is_dead_lettered(self):
+        """Un circuito abierto por DNS no se aplaza: dead letter y dominio terminado."""
+        worker = _queue_worker(AssertionError("no debe haber fetch"))
+
+        async def run():
+            await worker.redis.set(OPEN_PREFIX + "a.es", "dns", ex=600)
+            await worker._run_task(encode_task(TareaURL(url="https://a.es")))
+            return (await worker.redis.smembers(SEEN_KEY), await worker.redis.hkeys(DEAD_LETTER_KEY),
+                    await worker.redis.zcard(RETRY_KEY))
+
+        assert asyncio.run(run()) == ({b"a.es"}, [b"a.es"], 0)
+
+    def test_recrawl_hash_committed_only_after_upsert(self):
+        """Si la escritura falla, el reintento vuelve a ver el contenido como cambiado."""
+        worker = _worker()
+        worker.recrawl = RecrawlScheduler(fakeredis.FakeAsyncRedis())
+        tarea = TareaURL(url="https://a.es", recrawl=True)
+        page = _page("asociación de Canarias")
+
+        async def broken(org):
+            raise RuntimeError("supabase caído")
+
+        async def run():
+            upsert = worker.db.upsert_organizacion
+            worker.db.upsert_organizacion = broken
+            with pytest.raises(RuntimeError):
+                await worker.process_page(tarea, dict(page), discover=False, analyze=False)
+            worker.db.upsert_organizacion = upsert
+            primera = await worker.process_page(tarea, dict(page), discover=False, analyze=False)
+            repetida = await worker.process_page(tarea, dict(page), discover=False, analyze=False)
+            return primera, repetida
+
+        primera, repetida = asyncio.run(run())
+        assert primera and not repetida
+        assert len(worker.db.saved) == 1